@@ -0,0 +1,134 @@
+"""
+Azure Maps 로컬 스텁 서버 (오프라인 테스트/벤치마크용)
+
+Route Directions / Route Matrix(sync) 응답 형식을 흉내내며,
+거리는 직선 거리 × 1.3, 시간은 평균 25km/h로 계산합니다.
+
+사용법:
+    python azure_maps_stub_server.py --port 8765 --latency-ms 80
+
+    # 다른 터미널에서
+    AZURE_MAPS_BASE_URL=http://127.0.0.1:8765 USE_AZURE_MAPS=true \\
+    AZURE_MAPS_SUBSCRIPTION_KEY=stub python server.py
+
+    # 요청 횟수 확인
+    curl http://127.0.0.1:8765/stats
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DETOUR_FACTOR = 1.3
+SPEED_KMH = 25.0
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+    return 6371.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _route_summary(lat1: float, lon1: float, lat2: float, lon2: float) -> dict:
+    km = _haversine_km(lat1, lon1, lat2, lon2) * DETOUR_FACTOR
+    return {
+        "lengthInMeters": int(km * 1000),
+        "travelTimeInSeconds": int(km / SPEED_KMH * 3600)
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+    counters = {"directions": 0, "matrix": 0, "matrix_cells": 0}
+    counters_lock = threading.Lock()
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            with self.counters_lock:
+                return self._send_json(200, dict(self.counters))
+
+        if url.path != "/route/directions/json":
+            return self._send_json(404, {"error": "not found"})
+
+        time.sleep(self.latency_ms / 1000)
+        query = parse_qs(url.query).get("query", [""])[0]
+        try:
+            (lat1, lon1), (lat2, lon2) = [map(float, p.split(",")) for p in query.split(":")]
+        except ValueError:
+            return self._send_json(400, {"error": "invalid query"})
+
+        with self.counters_lock:
+            self.counters["directions"] += 1
+        self._send_json(200, {"routes": [{"summary": _route_summary(lat1, lon1, lat2, lon2)}]})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/route/matrix/sync/json":
+            return self._send_json(404, {"error": "not found"})
+
+        time.sleep(self.latency_ms / 1000)
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        origins = body.get("origins", {}).get("coordinates", [])
+        destinations = body.get("destinations", {}).get("coordinates", [])
+
+        matrix = [
+            [
+                {
+                    "statusCode": 200,
+                    "response": {"routeSummary": _route_summary(o[1], o[0], d[1], d[0])}
+                }
+                for d in destinations
+            ]
+            for o in origins
+        ]
+
+        with self.counters_lock:
+            self.counters["matrix"] += 1
+            self.counters["matrix_cells"] += len(origins) * len(destinations)
+        self._send_json(200, {"matrix": matrix, "summary": {
+            "successfulRoutes": len(origins) * len(destinations),
+            "totalRoutes": len(origins) * len(destinations)
+        }})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # 동시 요청이 몰려도 연결이 backlog에서 밀려 재시도 지연(1초)이 생기지 않도록
+    request_queue_size = 128
+
+
+def run_stub_server(host: str = "127.0.0.1", port: int = 8765, latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """스텁 서버를 백그라운드 스레드로 실행하고 서버 객체 반환 (종료: server.shutdown())"""
+    StubHandler.latency_ms = latency_ms
+    server = StubServer((host, port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Azure Maps 로컬 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="응답마다 추가할 지연 시간 (ms)")
+    args = parser.parse_args()
+
+    StubHandler.latency_ms = args.latency_ms
+    print(f"🧪 Azure Maps 스텁 서버 실행: http://{args.host}:{args.port} (지연 {args.latency_ms}ms)")
+    StubServer((args.host, args.port), StubHandler).serve_forever()
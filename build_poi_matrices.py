@@ -0,0 +1,63 @@
+"""
+여행지별 POI 거리 행렬 사전 계산 스크립트
+
+DB의 POI 전체에 대해 교통수단별 거리/시간 행렬을 계산해
+POI_MATRIX_DIR(기본: ./poi_matrices)에 .npy 파일로 저장합니다.
+서버는 다음 요청부터 새 빌드를 메모리 매핑으로 읽습니다 (재시작 불필요).
+
+사용법:
+    python build_poi_matrices.py                       # 모든 여행지
+    python build_poi_matrices.py --destination 서울 --destination 제주
+    python build_poi_matrices.py --haversine-only      # Azure Maps 호출 없이 직선 거리 기반
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from services.destinations import DESTINATION_MAP, normalize_destination
+from services.distance_cache import DistanceCache
+from services.poi_distance_matrix import DEFAULT_MATRIX_DIR, MATRIX_MODES, build_poi_distance_matrix
+from services.route_optimizer import RouteOptimizer
+from services.search_service import SearchService
+
+
+def build(destinations, modes, root, haversine_only):
+    search_service = SearchService()
+    # 빌드용 캐시는 따로 사용 (서버 캐시/영속 저장소를 채우지 않도록)
+    optimizer = RouteOptimizer(cache=DistanceCache(max_entries=1))
+    # 이전 빌드 값을 다시 읽지 않고 새로 계산
+    optimizer.poi_matrices = None
+    if haversine_only:
+        optimizer.use_azure_maps = False
+
+    for destination in destinations:
+        started = time.time()
+        places = asyncio.run(search_service._query_from_database(destination))
+        places = [p for p in places if p.get('id') is not None]
+        if not places:
+            print(f"⚠️  {destination}: POI가 없어 건너뜁니다.")
+            continue
+
+        path = build_poi_distance_matrix(destination, places, optimizer, root=root, modes=modes)
+        print(f"✅ {destination}: {len(places)}개 POI × {len(modes)}개 교통수단 "
+              f"({time.time() - started:.1f}초) → {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여행지별 POI 거리 행렬 사전 계산")
+    parser.add_argument("--destination", action="append",
+                        help="여행지 (여러 번 지정 가능, 생략 시 전체)")
+    parser.add_argument("--modes", default=",".join(MATRIX_MODES),
+                        help="교통수단 (쉼표 구분, 기본: walk,public,car)")
+    parser.add_argument("--out", default=os.getenv("POI_MATRIX_DIR", DEFAULT_MATRIX_DIR),
+                        help="출력 디렉토리 (기본: POI_MATRIX_DIR 또는 ./poi_matrices)")
+    parser.add_argument("--haversine-only", action="store_true",
+                        help="Azure Maps를 쓰지 않고 직선 거리로만 계산")
+    args = parser.parse_args()
+
+    # 서버가 조회하는 디렉토리 이름과 같도록 지역명으로 정규화 (예: 제주도 → 제주)
+    destinations = list(dict.fromkeys(
+        normalize_destination(d) for d in (args.destination or sorted(set(DESTINATION_MAP.values())))
+    ))
+    build(destinations, [m.strip() for m in args.modes.split(",") if m.strip()], args.out, args.haversine_only)
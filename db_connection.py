@@ -1,10 +1,20 @@
 """
 PostgreSQL 데이터베이스 연결 설정
+
+- engine / get_db_session: 동기 세션 (스크립트: init_db.py, 마이그레이션 등)
+- get_async_db_session: 비동기 세션 (asyncpg, API 요청 처리)
+  DB가 응답하는 동안 이벤트 루프를 막지 않으므로 다른 요청이 멈추지 않음
 """
+import asyncio
 import os
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
+from services.serialization import dumps_str
 
 load_dotenv()
 
@@ -14,11 +24,22 @@ DATABASE_URL = os.getenv(
     f"postgresql://{os.getenv('DATABASE_USER')}:{os.getenv('DATABASE_PASSWORD')}@{os.getenv('DATABASE_HOST')}:{os.getenv('DATABASE_PORT')}/{os.getenv('DATABASE_NAME')}"
 )
 
+# 커넥션 풀 설정 (동기/비동기 엔진 공통, 프로세스당)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # 유지하는 연결 수
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # 부족할 때 추가로 여는 연결 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # 연결을 기다리는 최대 시간 (초)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 연결 재생성 주기 (초)
+
 # SQLAlchemy 엔진 생성
 engine = create_engine(
     DATABASE_URL,
     echo=False,
-    pool_pre_ping=True  # 연결 상태 확인
+    pool_pre_ping=True,  # 연결 상태 확인
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    json_serializer=dumps_str  # JSON 컬럼의 datetime/numpy 값을 저장 시 바로 변환
 )
 
 # 세션 팩토리
@@ -28,6 +49,108 @@ def get_db_session():
     """데이터베이스 세션 반환"""
     return SessionLocal()
 
+
+def _async_database_url():
+    """
+    비동기 드라이버(asyncpg) URL과 연결 옵션
+
+    ASYNC_DATABASE_URL이 있으면 그대로 사용, 없으면 DATABASE_URL의 드라이버만 asyncpg로 변경
+    (asyncpg는 sslmode 쿼리 파라미터 대신 ssl 연결 옵션을 사용)
+    """
+    url = os.getenv("ASYNC_DATABASE_URL")
+    if url:
+        return make_url(url), {}
+
+    url = make_url(DATABASE_URL)
+    connect_args = {}
+    if url.drivername.startswith("postgresql"):
+        url = url.set(drivername="postgresql+asyncpg")
+        if "sslmode" in url.query:
+            connect_args["ssl"] = url.query["sslmode"]
+            url = url.difference_update_query(["sslmode"])
+    return url, connect_args
+
+
+# 비동기 엔진
+# asyncpg 연결은 만든 이벤트 루프에서만 쓸 수 있으므로
+# - 서버 이벤트 루프(init_async_db에서 등록): 커넥션 풀 사용
+# - 그 외 루프(스레드에서 asyncio.run으로 실행하는 도구/스크립트): 풀 없이 세션마다 연결
+_async_engine: Optional[AsyncEngine] = None
+_async_engine_loop: Optional[asyncio.AbstractEventLoop] = None
+_unpooled_async_engine: Optional[AsyncEngine] = None
+
+
+def _create_async_engine(pooled: bool) -> AsyncEngine:
+    url, connect_args = _async_database_url()
+    options = dict(
+        echo=False,
+        connect_args=connect_args,
+        json_serializer=dumps_str
+    )
+    if pooled:
+        options.update(
+            pool_pre_ping=True,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE
+        )
+    else:
+        options["poolclass"] = NullPool
+    return create_async_engine(url, **options)
+
+
+async def init_async_db():
+    """현재(서버) 이벤트 루프용 풀 엔진 생성 (서버 시작 시)"""
+    global _async_engine, _async_engine_loop
+    if _async_engine is None:
+        _async_engine = _create_async_engine(pooled=True)
+        _async_engine_loop = asyncio.get_running_loop()
+        print(f"✅ 비동기 DB 커넥션 풀 준비 (pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW})")
+
+
+async def close_async_db():
+    """비동기 엔진 정리 (서버 종료 시)"""
+    global _async_engine, _async_engine_loop, _unpooled_async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _unpooled_async_engine is not None:
+        await _unpooled_async_engine.dispose()
+    _async_engine, _async_engine_loop, _unpooled_async_engine = None, None, None
+
+
+def get_async_engine() -> AsyncEngine:
+    """현재 이벤트 루프에서 쓸 비동기 엔진"""
+    global _unpooled_async_engine
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _async_engine is not None and loop is _async_engine_loop:
+        return _async_engine
+    if _unpooled_async_engine is None:
+        _unpooled_async_engine = _create_async_engine(pooled=False)
+    return _unpooled_async_engine
+
+
+def get_async_db_session() -> AsyncSession:
+    """비동기 데이터베이스 세션 반환 (사용 후 await session.close())"""
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
+def async_pool_stats() -> dict:
+    """비동기 커넥션 풀 상태 (캐시 통계 / 디버깅용)"""
+    if _async_engine is None:
+        return {"pooled": False}
+    pool = _async_engine.pool
+    return {
+        "pooled": True,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW
+    }
+
 def test_connection():
     """데이터베이스 연결 테스트"""
     try:
@@ -39,4 +162,3 @@ def test_connection():
     except Exception as e:
         print(f"❌ 데이터베이스 연결 실패: {str(e)}")
         return False
-
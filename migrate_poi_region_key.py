@@ -0,0 +1,143 @@
+"""
+pois.region_key 마이그레이션 / 백필 스크립트
+
+여행지 조회가 `address LIKE '%서울%'`(앞에 %가 붙어 인덱스 사용 불가)로
+캐시 미스마다 pois 전체와 태그 조인을 스캔하던 것을 인덱스 조회로 바꿉니다.
+- pois.region_key 컬럼 추가 후 주소의 시/도로 백필 (services.destinations.region_key_sql)
+- 주소가 바뀌거나 새 POI가 추가되면 트리거가 region_key를 채움
+- 마지막에 region_key 인덱스 생성 → 서버는 이 인덱스가 유효하면 region_key로 조회 (재시작 불필요)
+- 지원 지역 외 여행지의 LIKE 검색용 trigram 인덱스(pg_trgm), 태그 조인용 인덱스도 함께 생성
+
+여러 번 실행해도 안전합니다 (DESTINATION_MAP을 바꾼 뒤 다시 실행하면 트리거와 값이 갱신됨).
+
+사용법:
+    python migrate_poi_region_key.py
+    python migrate_poi_region_key.py --batch-size 5000 --skip-trigram
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from db_connection import engine
+from services.destinations import REGIONS, region_key_sql
+
+
+def add_column(conn):
+    conn.execute(text("ALTER TABLE pois ADD COLUMN IF NOT EXISTS region_key VARCHAR(50)"))
+    print("✅ pois.region_key 컬럼 준비")
+
+
+def install_trigger(conn):
+    """새 POI / 주소 변경 시 region_key 자동 계산"""
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION pois_set_region_key() RETURNS trigger AS $$
+        BEGIN
+            NEW.region_key := {region_key_sql('NEW.address')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_pois_region_key ON pois"))
+    conn.execute(text("""
+        CREATE TRIGGER trg_pois_region_key
+        BEFORE INSERT OR UPDATE OF address ON pois
+        FOR EACH ROW EXECUTE FUNCTION pois_set_region_key()
+    """))
+    print("✅ region_key 트리거 설치 (INSERT / 주소 UPDATE)")
+
+
+def backfill(conn, batch_size):
+    """값이 다른 행만 batch_size씩 갱신 (긴 테이블 잠금 방지)"""
+    expression = region_key_sql("address")
+    started = time.time()
+    total = 0
+    while True:
+        result = conn.execute(text(f"""
+            UPDATE pois SET region_key = {expression}
+            WHERE id IN (
+                SELECT id FROM pois
+                WHERE region_key IS DISTINCT FROM ({expression})
+                LIMIT :batch_size
+            )
+        """), {"batch_size": batch_size})
+        if result.rowcount <= 0:
+            break
+        total += result.rowcount
+        print(f"   ... {total}개 갱신")
+    print(f"✅ region_key 백필 완료 ({total}개 갱신, {time.time() - started:.1f}초)")
+
+    rows = conn.execute(text("""
+        SELECT COALESCE(region_key, '(없음)'), COUNT(*)
+        FROM pois GROUP BY region_key ORDER BY COUNT(*) DESC
+    """)).fetchall()
+    for region, count in rows:
+        print(f"   - {region}: {count}개")
+
+
+def create_indexes(conn, trigram):
+    """인덱스 생성 (CONCURRENTLY: 서버 운영 중에도 쓰기 잠금 없음)"""
+    # 이전 실행이 중단되어 남은 INVALID 인덱스는 다시 생성
+    conn.execute(text("""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = 'idx_pois_region_key' AND NOT i.indisvalid
+            ) THEN
+                DROP INDEX idx_pois_region_key;
+            END IF;
+        END
+        $$
+    """))
+    conn.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poi_tag_association_poi_id "
+        "ON poi_tag_association (poi_id)"
+    ))
+    print("✅ idx_poi_tag_association_poi_id (태그 조인)")
+
+    if trigram:
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pois_address_trgm "
+                "ON pois USING gin (address gin_trgm_ops)"
+            ))
+            print("✅ idx_pois_address_trgm (지원 지역 외 여행지의 주소 LIKE 검색)")
+        except Exception as e:
+            print(f"⚠️  trigram 인덱스 생성 건너뜀 (pg_trgm 확장 권한 필요): {str(e)}")
+
+    # 서버는 이 인덱스가 유효해지면 region_key 조회로 전환하므로 마지막에 생성
+    conn.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pois_region_key ON pois (region_key)"
+    ))
+    print("✅ idx_pois_region_key (여행지 조회)")
+
+
+def migrate(batch_size=2000, trigram=True):
+    print(f"🔄 pois.region_key 마이그레이션 (지역: {', '.join(REGIONS)})")
+    try:
+        with engine.begin() as conn:
+            add_column(conn)
+            install_trigger(conn)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            backfill(conn, batch_size)
+            create_indexes(conn, trigram)
+        return True
+    except Exception as e:
+        print(f"❌ 마이그레이션 실패: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pois.region_key 마이그레이션 / 백필")
+    parser.add_argument("--batch-size", type=int, default=2000,
+                        help="백필 UPDATE 한 번에 갱신할 행 수 (기본: 2000)")
+    parser.add_argument("--skip-trigram", action="store_true",
+                        help="pg_trgm 주소 인덱스를 만들지 않음")
+    args = parser.parse_args()
+
+    if migrate(batch_size=args.batch_size, trigram=not args.skip_trigram):
+        print("\n✅ 완료! 실행 중인 서버는 다음 캐시 미스부터 region_key 인덱스로 조회합니다.")
+    else:
+        print("\n❌ 마이그레이션에 실패했습니다. .env 파일의 DATABASE 설정을 확인하세요.")
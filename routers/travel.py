@@ -1,15 +1,19 @@
 """
 Travel API Router - 여행 플랜 생성 API 엔드포인트
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-from tools.travel_tools import generate_travel_itinerary
+from typing import Dict, Optional, List
+from tools.travel_tools import generate_travel_itinerary_async, search_service, stream_travel_itinerary
 from auth.auth import get_user_id_from_header
-from db_connection import get_db_session
+from db_connection import async_pool_stats, get_async_db_session
 from services.user_plan_service import UserPlanService
-import json
-from datetime import datetime
+from services.distance_cache import get_distance_cache
+from services.single_flight import single_flight_stats
+from services.compute_pool import compute_pool_stats
+from services.plan_encoding import RESPONSE_FORMATS, encode_day, encode_plan, expand_itinerary, parse_fields
+from services.serialization import dumps_str, negotiated_response, serialization_backend
 
 
 class TravelPlanRequest(BaseModel):
@@ -24,19 +28,6 @@ class TravelPlanRequest(BaseModel):
     include_debug: bool = True  # 기본값을 True로 변경 (점수/클러스터링 포함)
 
 
-def convert_datetime_to_str(obj):
-    """
-    datetime 객체를 문자열로 변환 (JSON 직렬화 가능하게)
-    """
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    elif isinstance(obj, dict):
-        return {k: convert_datetime_to_str(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_datetime_to_str(item) for item in obj]
-    return obj
-
-
 def calculate_budget_level(budget_str: str, duration_days: int) -> int:
     """
     여행 기간과 예산 문자열을 기반으로 price_level 계산
@@ -107,6 +98,25 @@ def calculate_budget_level(budget_str: str, duration_days: int) -> int:
 router = APIRouter()
 
 
+def _check_response_format(response_format: str):
+    """format 쿼리 파라미터 검증 (full / normalized)"""
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format은 {', '.join(RESPONSE_FORMATS)} 중 하나여야 합니다."
+        )
+
+
+def _request_itinerary(itinerary: Optional[List[dict]], places: Optional[Dict[str, dict]]) -> Optional[List[dict]]:
+    """요청의 현재 일정 (format=normalized 응답을 그대로 보낸 경우 places 테이블로 복원)"""
+    if not itinerary:
+        return itinerary
+    try:
+        return expand_itinerary(itinerary, places)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/destinations")
 async def get_destinations():
     """
@@ -129,10 +139,39 @@ async def get_travel_types():
     }
 
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    거리 캐시 통계 조회
+
+    응답:
+    - entries / max_entries, bytes / max_bytes: 현재 사용량과 상한
+    - hits, misses, hit_rate: 조회 결과
+    - evictions: LRU로 제거된 항목 수
+    - expirations: TTL 만료로 제거된 항목 수
+    - by_method: 계산 방식(haversine, azure_maps)별 hit/저장/항목 수
+    - single_flight: 동시 중복 요청 병합 (leaders: 직접 계산, coalesced: 결과 공유, in_flight: 진행 중)
+    - compute_pool: 경로 계산 오프로드 (offloaded: 프로세스 풀, inline: 인라인, failures: 풀 오류)
+    - serialization: 응답 직렬화 구현 (json: orjson/json, msgpack: 사용 가능 여부)
+    - db_pool: 비동기 DB 커넥션 풀 (size, checked_out: 사용 중, overflow: 추가 연결)
+    - place_loads: 여행지 장소 로드 (leaders: DB 조회, coalesced: 같은 여행지 동시 로드 병합)
+    """
+    stats = get_distance_cache().stats()
+    stats["single_flight"] = single_flight_stats()
+    stats["compute_pool"] = compute_pool_stats()
+    stats["serialization"] = serialization_backend()
+    stats["db_pool"] = async_pool_stats()
+    stats["place_loads"] = search_service.load_stats()
+    return stats
+
+
 @router.post("/plans")
 async def create_itinerary_json(
     request: TravelPlanRequest,
-    user_id: str = Depends(get_user_id_from_header)
+    http_request: Request,
+    user_id: str = Depends(get_user_id_from_header),
+    response_format: str = Query("full", alias="format"),
+    fields: Optional[str] = None
 ):
     """
     여행 일정을 JSON 형식으로 반환하고 저장 (프론트엔드용)
@@ -146,6 +185,10 @@ async def create_itinerary_json(
     - **requirements**: 추가 요구사항 (예: ["임신", "적게 걷기"])
     - **budget_level**: (선택) 직접 지정할 예산 등급. 미지정 시 자동 계산
     - **include_debug**: (선택) True면 상세한 디버그 정보 포함 (클러스터링, 점수 등)
+    - **format** (쿼리): full(기본, 일정 항목마다 장소 전체) 또는 normalized(places 테이블 + place_id 참조)
+    - **fields** (쿼리): 장소에 남길 필드 (예: name,latitude,longitude, "*"이면 전체)
+      normalized 형식이면 저장되는 plan_data도 같은 형식으로 줄어듦
+    - Accept: application/msgpack이면 MessagePack으로 응답 (msgpack 설치 시)
     
     Budget Level 기준 (일인 1일):
     - level 1: 5만원 이하 (저렴)
@@ -161,6 +204,7 @@ async def create_itinerary_json(
     - itinerary: 날짜별 일정 (각 날짜마다 schedule, summary 포함)
     - debug_info: (include_debug=true일 때만) 상세 정보
     """
+    _check_response_format(response_format)
     db_session = None
     try:
         # budget_level이 미지정되면 자동으로 계산
@@ -168,23 +212,25 @@ async def create_itinerary_json(
         if budget_level is None:
             budget_level = calculate_budget_level(request.budget, request.duration_days)
         
-        # AI 플랜 생성
-        result = generate_travel_itinerary.invoke({
-            "destination": request.destination,
-            "travel_styles": request.travel_styles,
-            "duration_days": request.duration_days,
-            "requirements": request.requirements,
-            "budget_level": budget_level,
-            "include_debug": request.include_debug
-        })
+        # AI 플랜 생성 (이벤트 루프에서 직접 실행, 도구의 동기 래퍼는 완료까지 루프를 막음)
+        result = await generate_travel_itinerary_async(
+            destination=request.destination,
+            travel_styles=request.travel_styles,
+            duration_days=request.duration_days,
+            requirements=request.requirements,
+            budget_level=budget_level,
+            include_debug=request.include_debug
+        )
         
         # 데이터베이스에 플랜 저장
-        db_session = get_db_session()
+        db_session = get_async_db_session()
         
-        # JSON 직렬화 가능하도록 datetime 변환
-        serializable_result = convert_datetime_to_str(result) if isinstance(result, dict) else {"raw_result": str(result)}
+        # datetime 등은 응답/DB 직렬화 단계에서 바로 변환 (services.serialization)
+        serializable_result = result if isinstance(result, dict) else {"raw_result": str(result)}
+        # 요청한 형식으로 변환 (normalized면 장소를 places 테이블에 한 번만 담음)
+        serializable_result = encode_plan(serializable_result, response_format, parse_fields(fields))
         
-        saved_plan = UserPlanService.save_plan(
+        saved_plan = await UserPlanService.save_plan(
             db_session=db_session,
             user_id=user_id,
             destination=request.destination,
@@ -198,7 +244,7 @@ async def create_itinerary_json(
         
         # 결과가 Dict인지 확인하고 반환
         if isinstance(result, dict):
-            return {
+            return negotiated_response(http_request, {
                 "success": True,
                 "plan_id": saved_plan.plan_id,
                 "user_id": user_id,
@@ -206,16 +252,16 @@ async def create_itinerary_json(
                 "duration_days": request.duration_days,
                 "data": serializable_result,
                 "message": "여행 일정이 성공적으로 생성되고 저장되었습니다."
-            }
+            })
         else:
             # 예상치 못한 형식이면 에러 처리
-            return {
+            return negotiated_response(http_request, {
                 "success": False,
                 "plan_id": saved_plan.plan_id,
                 "user_id": user_id,
                 "error": f"예상치 못한 응답 형식: {type(result)}",
                 "data": serializable_result
-            }
+            })
     except Exception as e:
         import traceback
         print(f"Error in /travel/plans: {str(e)}")
@@ -226,7 +272,103 @@ async def create_itinerary_json(
         )
     finally:
         if db_session:
-            db_session.close()
+            await db_session.close()
+
+
+def _stream_line(event: str, payload: dict, sse: bool) -> str:
+    """스트리밍 이벤트 한 줄 (NDJSON 또는 SSE 형식)"""
+    if sse:
+        return f"event: {event}\ndata: {dumps_str(payload)}\n\n"
+    return dumps_str({"event": event, **payload}) + "\n"
+
+
+@router.post("/plans/stream")
+async def create_itinerary_stream(
+    request: TravelPlanRequest,
+    http_request: Request,
+    user_id: str = Depends(get_user_id_from_header),
+    response_format: str = Query("full", alias="format"),
+    fields: Optional[str] = None
+):
+    """
+    여행 일정을 일자별로 스트리밍하고 저장 (POST /travel/plans의 스트리밍 버전)
+
+    ⭐ 인증 필수: X-User-ID 헤더가 필요합니다
+
+    1일차가 준비되는 즉시 보내므로 프론트엔드는 나머지 일자를 기다리지 않고 먼저 렌더링할 수 있습니다.
+    기본은 NDJSON(한 줄에 이벤트 하나), `Accept: text/event-stream`이면 SSE 형식으로 보냅니다.
+
+    이벤트 (순서대로):
+    - plan: {destination, duration_days, total_places, user_id}
+    - day: {day, data: 하루 일정} (일자 순서대로, format=normalized면 그 날의 places 테이블 포함)
+    - debug: {debug_info} (include_debug=true일 때만)
+    - saved: {plan_id, message}
+    - error: {error} (오류 발생 시, 이후 이벤트 없음)
+    """
+    _check_response_format(response_format)
+    place_fields = parse_fields(fields)
+    budget_level = request.budget_level
+    if budget_level is None:
+        budget_level = calculate_budget_level(request.budget, request.duration_days)
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    async def events():
+        db_session = None
+        try:
+            async for event, payload in stream_travel_itinerary(
+                request.destination,
+                request.travel_styles,
+                request.duration_days,
+                request.requirements,
+                budget_level,
+                request.include_debug
+            ):
+                if event == "plan":
+                    yield _stream_line("plan", {**payload, "user_id": user_id}, sse)
+                elif event == "day":
+                    yield _stream_line("day", {
+                        "day": payload.get("day"),
+                        **encode_day(payload, response_format, place_fields)
+                    }, sse)
+                elif event == "error":
+                    yield _stream_line("error", payload, sse)
+                    return
+                elif event == "done":
+                    if "debug_info" in payload:
+                        yield _stream_line("debug", {"debug_info": payload["debug_info"]}, sse)
+
+                    # 모든 일자가 끝나면 POST /travel/plans와 같은 형식으로 저장
+                    db_session = get_async_db_session()
+                    saved_plan = await UserPlanService.save_plan(
+                        db_session=db_session,
+                        user_id=user_id,
+                        destination=request.destination,
+                        duration_days=request.duration_days,
+                        start_date=request.start_date,
+                        travel_styles=request.travel_styles,
+                        budget=request.budget,
+                        requirements=request.requirements,
+                        plan_data=encode_plan(payload, response_format, place_fields)
+                    )
+                    yield _stream_line("saved", {
+                        "plan_id": saved_plan.plan_id,
+                        "message": "여행 일정이 성공적으로 생성되고 저장되었습니다."
+                    }, sse)
+        except Exception as e:
+            import traceback
+            print(f"Error in /travel/plans/stream: {str(e)}")
+            print(traceback.format_exc())
+            yield _stream_line("error", {"error": f"일정 생성 중 오류 발생: {str(e)}"}, sse)
+        finally:
+            if db_session:
+                await db_session.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # 프록시가 버퍼링하지 않고 바로 전달하도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 class UpdateHotelRequest(BaseModel):
@@ -239,6 +381,9 @@ class UpdateHotelRequest(BaseModel):
     new_hotel: dict
     requirements: list[str] = []
     budget_level: Optional[int] = None
+    itinerary: Optional[List[dict]] = None  # 현재 일정 (있으면 숙소 구간만 재계산)
+    places: Optional[Dict[str, dict]] = None  # itinerary가 normalized 형식이면 그 응답의 places 테이블
+    reoptimize: bool = False  # True면 새 숙소 기준으로 일자별 경로 개선
 
 @router.get("/plans")
 async def get_user_plans(
@@ -262,8 +407,8 @@ async def get_user_plans(
     """
     db_session = None
     try:
-        db_session = get_db_session()
-        plans, total_count = UserPlanService.get_user_plans(
+        db_session = get_async_db_session()
+        plans, total_count = await UserPlanService.get_user_plans(
             db_session=db_session,
             user_id=user_id,
             limit=limit,
@@ -297,13 +442,25 @@ async def get_user_plans(
         )
     finally:
         if db_session:
-            db_session.close()
+            await db_session.close()
+
+
+def _encode_stored_plan(plan_data, response_format: Optional[str], fields: Optional[str]):
+    """저장된 plan_data를 요청한 형식으로 변환 (둘 다 생략하면 저장된 그대로)"""
+    if not isinstance(plan_data, dict) or (response_format is None and fields is None):
+        return plan_data
+    if response_format is None:
+        response_format = "normalized" if plan_data.get("format") == "normalized" else "full"
+    return encode_plan(plan_data, response_format, parse_fields(fields))
 
 
 @router.get("/plans/{plan_id}")
 async def get_plan_detail(
     plan_id: str,
-    user_id: str = Depends(get_user_id_from_header)
+    http_request: Request,
+    user_id: str = Depends(get_user_id_from_header),
+    response_format: Optional[str] = Query(None, alias="format"),
+    fields: Optional[str] = None
 ):
     """
     저장된 여행 플랜을 상세 조회합니다.
@@ -311,6 +468,8 @@ async def get_plan_detail(
     ⭐ 인증 필수: X-User-ID 헤더가 필요합니다
     
     - **plan_id**: 플랜의 고유 ID
+    - **format** (쿼리, 선택): full 또는 normalized (생략하면 저장된 형식 그대로)
+    - **fields** (쿼리, 선택): 장소에 남길 필드
     
     응답:
     - plan_id: 플랜 ID
@@ -321,10 +480,12 @@ async def get_plan_detail(
     - created_at: 생성 시간
     - updated_at: 업데이트 시간
     """
+    if response_format is not None:
+        _check_response_format(response_format)
     db_session = None
     try:
-        db_session = get_db_session()
-        plan = UserPlanService.get_plan_by_id(
+        db_session = get_async_db_session()
+        plan = await UserPlanService.get_plan_by_id(
             db_session=db_session,
             plan_id=plan_id,
             user_id=user_id
@@ -336,7 +497,7 @@ async def get_plan_detail(
                 detail="해당 플랜을 찾을 수 없습니다."
             )
         
-        return {
+        return negotiated_response(http_request, {
             "success": True,
             "plan_id": plan.plan_id,
             "user_id": plan.user_id,
@@ -346,10 +507,10 @@ async def get_plan_detail(
             "travel_styles": plan.travel_styles,
             "budget": plan.budget,
             "requirements": plan.requirements,
-            "plan_data": plan.plan_data,
+            "plan_data": _encode_stored_plan(plan.plan_data, response_format, fields),
             "created_at": plan.created_at.isoformat(),
             "updated_at": plan.updated_at.isoformat()
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -359,7 +520,7 @@ async def get_plan_detail(
         )
     finally:
         if db_session:
-            db_session.close()
+            await db_session.close()
 
 
 @router.put("/plans/{plan_id}")
@@ -381,8 +542,8 @@ async def update_plan(
     """
     db_session = None
     try:
-        db_session = get_db_session()
-        updated_plan = UserPlanService.update_plan(
+        db_session = get_async_db_session()
+        updated_plan = await UserPlanService.update_plan(
             db_session=db_session,
             plan_id=plan_id,
             user_id=user_id,
@@ -411,7 +572,7 @@ async def update_plan(
         )
     finally:
         if db_session:
-            db_session.close()
+            await db_session.close()
 
 
 @router.delete("/plans/{plan_id}")
@@ -431,8 +592,8 @@ async def delete_plan(
     """
     db_session = None
     try:
-        db_session = get_db_session()
-        success = UserPlanService.delete_plan(
+        db_session = get_async_db_session()
+        success = await UserPlanService.delete_plan(
             db_session=db_session,
             plan_id=plan_id,
             user_id=user_id
@@ -458,12 +619,13 @@ async def delete_plan(
         )
     finally:
         if db_session:
-            db_session.close()
+            await db_session.close()
 
 
 @router.post("/plans/update-hotel")
 async def update_hotel_and_recalculate(
     request: UpdateHotelRequest,
+    http_request: Request,
     user_id: str = Depends(get_user_id_from_header)
 ):
     """
@@ -480,6 +642,10 @@ async def update_hotel_and_recalculate(
     - **new_hotel**: 새로운 호텔 정보 (name, latitude, longitude 포함)
     - **requirements**: 추가 요구사항
     - **budget_level**: 예산 등급
+    - **itinerary**: (선택) 현재 일정. 보내면 일자별 장소 배정과 순서를 유지하고
+      숙소 출발/복귀 구간만 새로 계산 (빠른 경로)
+    - **places**: (선택) itinerary가 format=normalized 응답이면 그 응답의 places 테이블
+    - **reoptimize**: (선택) itinerary와 함께 True면 새 숙소 기준으로 일자별 경로 개선
     
     응답:
     - 선택된 장소들은 유지됨 ✅
@@ -492,32 +658,46 @@ async def update_hotel_and_recalculate(
     변경: 신라 호텔 → 경복궁 → 명동 → 신라 호텔
     (경복궁, 명동은 유지 + 거리/시간만 재계산)
     """
+    itinerary = _request_itinerary(request.itinerary, request.places)
     try:
-        from services.itinerary_service import ItineraryService
+        from services.itinerary_service import get_itinerary_service
         
         budget_level = request.budget_level
         if budget_level is None:
             budget_level = calculate_budget_level(request.budget, request.duration_days)
         
         # 이동 거리/시간 재계산 (선택된 장소는 유지)
-        itinerary_service = ItineraryService()
+        itinerary_service = get_itinerary_service()
         
-        # ⭐ selected_places의 장소들은 변경되지 않음
-        # 새 호텔만 기준점으로 사용해서 거리/시간/경로만 재계산
-        recalculated_itinerary = await itinerary_service.create_itinerary_async(
-            places=request.selected_places,  # 선택된 장소들 유지 ✅
-            duration_days=request.duration_days,
-            alternative_places=[]
-        )
+        if itinerary:
+            # 빠른 경로: 일자별 배정/순서 유지, 숙소 구간만 재계산
+            recalculated_itinerary = await itinerary_service.swap_hotel(
+                itinerary,
+                request.new_hotel,
+                reoptimize=request.reoptimize
+            )
+        else:
+            # ⭐ selected_places의 장소들은 변경되지 않음
+            # 기존 숙소를 빼고 새 숙소를 기준점으로 넣어 거리/시간/경로만 재계산
+            new_hotel = {**request.new_hotel, "type": request.new_hotel.get("type") or "숙박"}
+            places = [
+                p for p in request.selected_places
+                if p.get("type") not in ["hotel", "숙박"]
+            ] + [new_hotel]
+            recalculated_itinerary = await itinerary_service.create_itinerary_async(
+                places=places,  # 선택된 장소들 유지 ✅
+                duration_days=request.duration_days,
+                alternative_places=[]
+            )
         
-        return {
+        return negotiated_response(http_request, {
             "destination": request.destination,
             "duration_days": request.duration_days,
             "total_places": len(request.selected_places),
             "hotel": request.new_hotel,
             "itinerary": recalculated_itinerary,
             "message": "호텔이 변경되었으며, 선택된 장소들은 유지되고 이동 경로만 재계산되었습니다."
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -532,10 +712,13 @@ class ReplacePlaceRequest(BaseModel):
     new_place: dict
     all_places: list[dict]
     duration_days: int
+    itinerary: Optional[List[dict]] = None  # 현재 일정 (있으면 해당 Day만 증분 재계산)
+    places: Optional[Dict[str, dict]] = None  # itinerary가 normalized 형식이면 그 응답의 places 테이블
 
 @router.post("/plans/replace-place")
 async def replace_place_and_recalculate(
     request: ReplacePlaceRequest,
+    http_request: Request,
     user_id: str = Depends(get_user_id_from_header)
 ):
     """
@@ -551,6 +734,9 @@ async def replace_place_and_recalculate(
     - **new_place**: 새로운 장소 정보 (name, latitude, longitude, type 포함)
     - **all_places**: 현재 선택된 모든 장소들
     - **duration_days**: 전체 여행 기간
+    - **itinerary**: (선택) 현재 일정. 보내면 다른 Day는 그대로 두고
+      해당 Day에서 old_place를 빼고 new_place를 가장 가까운 위치에 삽입 (빠른 경로)
+    - **places**: (선택) itinerary가 format=normalized 응답이면 그 응답의 places 테이블
     
     응답:
     - 해당 Day만 재계산된 일정
@@ -562,8 +748,9 @@ async def replace_place_and_recalculate(
     기존 Day 2: 숙소 → 경복궁 → 명동 → 남산타워 → 숙소
     변경 Day 2: 숙소 → 경복궁 → 동대문 → 남산타워 → 숙소
     """
+    itinerary = _request_itinerary(request.itinerary, request.places)
     try:
-        from services.itinerary_service import ItineraryService
+        from services.itinerary_service import get_itinerary_service
         
         # 장소 교체 (old_place 제거, new_place 추가)
         updated_places = []
@@ -574,27 +761,39 @@ async def replace_place_and_recalculate(
             else:
                 updated_places.append(place)
         
-        # 전체 일정 재계산
-        itinerary_service = ItineraryService()
-        recalculated_itinerary = await itinerary_service.create_itinerary_async(
-            places=updated_places,
-            duration_days=request.duration_days,
-            alternative_places=[]
-        )
-        
-        # 해당 Day만 응답
-        day_schedule = None
-        if request.day <= len(recalculated_itinerary):
-            day_schedule = recalculated_itinerary[request.day - 1]
+        itinerary_service = get_itinerary_service()
+        if itinerary and 1 <= request.day <= len(itinerary):
+            # 증분 재계산: 해당 Day만 (Cheapest Insertion + 구간 재계산)
+            day_schedule = await itinerary_service.replace_place_in_day(
+                itinerary[request.day - 1],
+                request.old_place,
+                request.new_place
+            )
+            recalculated_itinerary = list(itinerary)
+            recalculated_itinerary[request.day - 1] = day_schedule
+        else:
+            # 현재 일정이 없으면 전체 일정 재계산
+            recalculated_itinerary = await itinerary_service.create_itinerary_async(
+                places=updated_places,
+                duration_days=request.duration_days,
+                alternative_places=[]
+            )
+            
+            # 해당 Day만 응답
+            day_schedule = None
+            if request.day <= len(recalculated_itinerary):
+                day_schedule = recalculated_itinerary[request.day - 1]
         
-        return {
+        return negotiated_response(http_request, {
             "day": request.day,
             "old_place": request.old_place,
             "new_place": request.new_place,
             "day_schedule": day_schedule,
             "message": f"Day {request.day}의 장소가 변경되었으며, 해당 날짜 일정이 재계산되었습니다.",
             "updated_itinerary": recalculated_itinerary
-        }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
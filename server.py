@@ -1,18 +1,47 @@
 """
 FastAPI Server - LangGraph 기반 여행 플랜 API
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import chat, travel
+from services.distance_cache import flush_distance_cache, warm_up_distance_cache
+from services.compute_pool import shutdown_compute_pool, warm_up_compute_pool
+from services.azure_maps_client import close_async_azure_maps_client, init_async_azure_maps_client
+from services.serialization import FastJSONResponse
+from db_connection import close_async_db, init_async_db
 import uvicorn
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작 시 초기화 작업"""
+    # 영속 거리 캐시(DISTANCE_CACHE_DB_PATH)에서 인기 구간 미리 로드
+    warm_up_distance_cache()
+    # 경로 계산 프로세스 풀 워커 미리 시작 (COMPUTE_POOL_WORKERS=0이면 생략)
+    warm_up_compute_pool()
+    # 서버 이벤트 루프용 비동기 DB 커넥션 풀 (DB_POOL_SIZE / DB_MAX_OVERFLOW)
+    await init_async_db()
+    # 서버 이벤트 루프용 Azure Maps 비동기 커넥션 풀 (AZURE_MAPS_POOL_SIZE)
+    await init_async_azure_maps_client()
+    yield
+    # 경로 계산 프로세스 풀 워커 정리
+    shutdown_compute_pool()
+    # 영속 거리 캐시에 아직 기록하지 않은 값 저장
+    flush_distance_cache()
+    await close_async_db()
+    await close_async_azure_maps_client()
+
+
 # FastAPI 앱 생성
 app = FastAPI(
     title="Travel Planner API",
     description="LangGraph 기반 여행 플랜 생성 API - 맞춤형 여행 장소 추천",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,  # orjson이 있으면 orjson으로 렌더링
+    lifespan=lifespan
 )
 
 # CORS 설정
@@ -0,0 +1,411 @@
+"""
+Azure Maps HTTP 클라이언트 - Route Directions / Route Matrix
+
+하나의 requests.Session(커넥션 풀)을 재사용하여 요청마다 TCP/TLS 연결을 새로 맺지 않음
+AsyncAzureMapsClient는 httpx 비동기 커넥션 풀 + 동시 요청 수 제한 + 재시도(429/5xx)를 제공
+AZURE_MAPS_BASE_URL로 로컬 스텁 서버를 지정하면 오프라인 테스트/벤치마크 가능
+(azure_maps_stub_server.py 참고)
+"""
+import os
+import asyncio
+import random
+import weakref
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# 교통수단 매핑
+TRAVEL_MODE_MAP = {
+    "car": "car",
+    "public": "publicTransit",
+    "walk": "pedestrian"
+}
+
+# Route Matrix 동기 요청 1회당 최대 셀 수 (origins × destinations)
+MATRIX_MAX_CELLS = 100
+
+# 재시도 대상 HTTP 상태 코드 (쿼터 초과, 서버 오류)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+Coord = Tuple[float, float]  # (lat, lon)
+
+
+def _common_params(subscription_key: Optional[str], mode: str) -> Dict[str, str]:
+    return {
+        "api-version": "1.0",
+        "subscription-key": subscription_key,
+        "travelMode": TRAVEL_MODE_MAP.get(mode, "car"),
+        "traffic": "true",
+        "departAt": datetime.now().isoformat()
+    }
+
+
+def _matrix_body(origins: Sequence[Coord], destinations: Sequence[Coord]) -> Dict[str, Any]:
+    return {
+        # GeoJSON 순서: [lon, lat]
+        "origins": {"type": "MultiPoint", "coordinates": [[lon, lat] for lat, lon in origins]},
+        "destinations": {"type": "MultiPoint", "coordinates": [[lon, lat] for lat, lon in destinations]}
+    }
+
+
+def _matrix_blocks(n_origins: int, n_destinations: int):
+    """MATRIX_MAX_CELLS 이하로 나눈 (행 시작, 행 끝, 열 시작, 열 끝) 블록들"""
+    cols = min(n_destinations, MATRIX_MAX_CELLS)
+    rows = max(1, MATRIX_MAX_CELLS // cols)
+    for r0 in range(0, n_origins, rows):
+        for c0 in range(0, n_destinations, cols):
+            yield r0, min(r0 + rows, n_origins), c0, min(c0 + cols, n_destinations)
+
+
+def _summary_to_result(summary: Dict) -> Dict[str, float]:
+    return {
+        # 거리 (미터 -> km)
+        "distance_km": round(summary["lengthInMeters"] / 1000, 2),
+        # 소요 시간 (초 -> 분)
+        "time_minutes": round(summary["travelTimeInSeconds"] / 60),
+        "method": "azure_maps"
+    }
+
+
+def _parse_matrix(data: Dict, n_origins: int, n_destinations: int) -> List[List[Dict[str, float]]]:
+    block = [[{"method": "error"} for _ in range(n_destinations)] for _ in range(n_origins)]
+    for i, row in enumerate(data.get("matrix", [])[:n_origins]):
+        for j, cell in enumerate(row[:n_destinations]):
+            if cell.get("statusCode") == 200 and "response" in cell:
+                block[i][j] = _summary_to_result(cell["response"]["routeSummary"])
+    return block
+
+
+class AzureMapsClient:
+    """커넥션 풀을 사용하는 Azure Maps Route API 클라이언트"""
+
+    def __init__(
+        self,
+        subscription_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 10,
+        pool_size: int = int(os.getenv("AZURE_MAPS_POOL_SIZE", "20"))
+    ):
+        self.subscription_key = subscription_key or os.getenv("AZURE_MAPS_SUBSCRIPTION_KEY")
+        self.base_url = (base_url or os.getenv("AZURE_MAPS_BASE_URL", "https://atlas.microsoft.com")).rstrip("/")
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def route_directions(
+        self,
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float,
+        mode: str = "public"
+    ) -> Dict[str, float]:
+        """
+        두 지점 간 경로 (Route Directions API)
+
+        Returns:
+            {"distance_km", "time_minutes", "method": "azure_maps"} 또는 {"method": "error"}
+        """
+        params = _common_params(self.subscription_key, mode)
+        params["query"] = f"{lat1},{lon1}:{lat2},{lon2}"
+
+        try:
+            response = self.session.get(
+                f"{self.base_url}/route/directions/json",
+                params=params,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("routes"):
+                return _summary_to_result(data["routes"][0]["summary"])
+            # routes가 없는 경우
+            return {"method": "error"}
+        except Exception as e:
+            print(f"Azure Maps API Error: {e}")
+            return {"method": "error"}
+
+    def route_matrix(
+        self,
+        origins: Sequence[Coord],
+        destinations: Sequence[Coord],
+        mode: str = "public"
+    ) -> List[List[Dict[str, float]]]:
+        """
+        출발지 × 도착지 경로 행렬 (Route Matrix API, 동기 모드)
+
+        셀 수가 MATRIX_MAX_CELLS를 넘으면 여러 요청으로 나눠 보냄
+
+        Returns:
+            result[i][j]: origins[i] → destinations[j] 결과
+            (실패한 셀은 {"method": "error"})
+        """
+        result = [[{"method": "error"} for _ in destinations] for _ in origins]
+        if not origins or not destinations:
+            return result
+
+        for r0, r1, c0, c1 in _matrix_blocks(len(origins), len(destinations)):
+            block = self._route_matrix_block(origins[r0:r1], destinations[c0:c1], mode)
+            for i, row in enumerate(block):
+                result[r0 + i][c0:c1] = row
+
+        return result
+
+    def _route_matrix_block(
+        self,
+        origins: Sequence[Coord],
+        destinations: Sequence[Coord],
+        mode: str
+    ) -> List[List[Dict[str, float]]]:
+        """MATRIX_MAX_CELLS 이하 크기의 행렬 요청 1회"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/route/matrix/sync/json",
+                params=_common_params(self.subscription_key, mode),
+                json=_matrix_body(origins, destinations),
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return _parse_matrix(response.json(), len(origins), len(destinations))
+        except Exception as e:
+            print(f"Azure Maps Route Matrix API Error: {e}")
+            return [[{"method": "error"} for _ in destinations] for _ in origins]
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncAzureMapsClient:
+    """
+    httpx 기반 비동기 Azure Maps 클라이언트
+
+    - 커넥션 풀 재사용 (keep-alive)
+    - Semaphore로 동시 요청 수 제한 (스레드 풀/쿼터 고갈 방지)
+    - 429/5xx/네트워크 오류 시 지수 백오프 + 지터로 재시도 (Retry-After 헤더 우선)
+      Retry-After가 max_retry_delay보다 길면 기다리지 않고 실패 처리 (호출한 쪽은 Haversine으로 폴백)
+    - 요청마다 타임아웃 + 재시도를 포함한 호출 전체 제한 시간(deadline) 적용
+
+    httpx.AsyncClient와 Semaphore는 이벤트 루프에 묶이므로
+    get_async_azure_maps_client()로 루프별 인스턴스를 사용할 것 (루프 종료 시 자동으로 닫힘)
+    """
+
+    def __init__(
+        self,
+        subscription_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = float(os.getenv("AZURE_MAPS_TIMEOUT", "10")),
+        max_concurrency: int = int(os.getenv("AZURE_MAPS_MAX_CONCURRENCY", "10")),
+        max_retries: int = int(os.getenv("AZURE_MAPS_MAX_RETRIES", "3")),
+        backoff_base: float = 0.2,
+        pool_size: int = int(os.getenv("AZURE_MAPS_POOL_SIZE", "20")),
+        max_retry_delay: float = float(os.getenv("AZURE_MAPS_MAX_RETRY_DELAY", "2")),
+        deadline: float = float(os.getenv("AZURE_MAPS_DEADLINE", "15"))
+    ):
+        self.subscription_key = subscription_key or os.getenv("AZURE_MAPS_SUBSCRIPTION_KEY")
+        self.base_url = (base_url or os.getenv("AZURE_MAPS_BASE_URL", "https://atlas.microsoft.com")).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_retry_delay = max_retry_delay
+        self.deadline = deadline
+
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """
+        재시도/동시성 제한이 적용된 요청, 최종 실패 시 예외 발생
+
+        동시성 대기, 요청, 재시도 대기를 모두 합쳐 deadline 안에 끝나지 않으면 TimeoutError
+        """
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + self.deadline
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                break
+
+            retry_after = None
+            try:
+                response = await asyncio.wait_for(self._send(method, path, **kwargs), remaining)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+
+                last_error = httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}", request=response.request, response=response
+                )
+                retry_after = response.headers.get("Retry-After")
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                last_error = e
+            except TimeoutError:
+                last_error = TimeoutError(f"Azure Maps 요청 제한 시간 초과 ({self.deadline}초)")
+                break
+
+            if attempt == self.max_retries:
+                break
+
+            # 지수 백오프 + 지터 (Retry-After가 있으면 우선 적용)
+            delay = min(self.backoff_base * (2 ** attempt) * (0.5 + random.random()), self.max_retry_delay)
+            if retry_after:
+                try:
+                    requested = float(retry_after)
+                except ValueError:
+                    requested = None
+                if requested is not None:
+                    if requested > self.max_retry_delay:
+                        # 오래 기다리라는 응답이면 요청을 붙잡아 두지 않고 바로 실패 처리
+                        break
+                    delay = max(delay, requested)
+            if loop.time() + delay >= give_up_at:
+                break
+            await asyncio.sleep(delay)
+
+        raise last_error or TimeoutError(f"Azure Maps 요청 제한 시간 초과 ({self.deadline}초)")
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        async with self.semaphore:
+            return await self.client.request(
+                method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs
+            )
+
+    async def route_directions(
+        self,
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float,
+        mode: str = "public"
+    ) -> Dict[str, float]:
+        """AzureMapsClient.route_directions의 비동기 버전"""
+        params = _common_params(self.subscription_key, mode)
+        params["query"] = f"{lat1},{lon1}:{lat2},{lon2}"
+
+        try:
+            data = await self._request("GET", "/route/directions/json", params=params)
+            if data.get("routes"):
+                return _summary_to_result(data["routes"][0]["summary"])
+            # routes가 없는 경우
+            return {"method": "error"}
+        except Exception as e:
+            print(f"Azure Maps API Error: {e}")
+            return {"method": "error"}
+
+    async def route_matrix(
+        self,
+        origins: Sequence[Coord],
+        destinations: Sequence[Coord],
+        mode: str = "public"
+    ) -> List[List[Dict[str, float]]]:
+        """AzureMapsClient.route_matrix의 비동기 버전 (블록들을 동시에 요청)"""
+        result = [[{"method": "error"} for _ in destinations] for _ in origins]
+        if not origins or not destinations:
+            return result
+
+        blocks = list(_matrix_blocks(len(origins), len(destinations)))
+        responses = await asyncio.gather(*[
+            self._route_matrix_block(origins[r0:r1], destinations[c0:c1], mode)
+            for r0, r1, c0, c1 in blocks
+        ])
+        for (r0, r1, c0, c1), block in zip(blocks, responses):
+            for i, row in enumerate(block):
+                result[r0 + i][c0:c1] = row
+        return result
+
+    async def _route_matrix_block(
+        self,
+        origins: Sequence[Coord],
+        destinations: Sequence[Coord],
+        mode: str
+    ) -> List[List[Dict[str, float]]]:
+        try:
+            data = await self._request(
+                "POST",
+                "/route/matrix/sync/json",
+                params=_common_params(self.subscription_key, mode),
+                json=_matrix_body(origins, destinations)
+            )
+            return _parse_matrix(data, len(origins), len(destinations))
+        except Exception as e:
+            print(f"Azure Maps Route Matrix API Error: {e}")
+            return [[{"method": "error"} for _ in destinations] for _ in origins]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_azure_maps_client: Optional[AzureMapsClient] = None
+
+# 비동기 클라이언트는 이벤트 루프마다 하나 (httpx 연결은 만든 이벤트 루프에서만 쓸 수 있으므로)
+# 루프가 종료될 때(asyncio.run / loop.shutdown_asyncgens) 커넥션 풀을 닫음
+_async_azure_maps_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAzureMapsClient]" = (
+    weakref.WeakKeyDictionary()
+)
+# 루프 종료 시 클라이언트를 닫는 async generator (루프는 약한 참조만 가지므로 여기서 보관)
+_async_client_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_azure_maps_client() -> AzureMapsClient:
+    """프로세스 전체에서 공유하는 AzureMapsClient 싱글톤 인스턴스 가져오기 (커넥션 풀 공유)"""
+    global _azure_maps_client
+    if _azure_maps_client is None:
+        _azure_maps_client = AzureMapsClient()
+    return _azure_maps_client
+
+
+async def _close_on_loop_shutdown(client: AsyncAzureMapsClient) -> AsyncIterator[None]:
+    """
+    루프 종료 훅
+
+    시작해 둔 async generator는 루프가 shutdown_asyncgens()에서 aclose()하므로
+    finally에서 클라이언트를 닫음 (asyncio.run은 루프를 닫기 전에 항상 호출)
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def get_async_azure_maps_client() -> AsyncAzureMapsClient:
+    """
+    현재 이벤트 루프에서 공유하는 AsyncAzureMapsClient 가져오기
+
+    서버 메인 루프에서는 프로세스 전체가 하나의 커넥션 풀/동시성 제한을 공유함
+    (travel_tools처럼 스레드에서 별도 루프를 돌리는 경우 그 루프 전용 인스턴스를 재사용하고 루프 종료 시 닫음)
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_azure_maps_clients.get(loop)
+    if client is None:
+        client = AsyncAzureMapsClient()
+        _async_azure_maps_clients[loop] = client
+        closer = _close_on_loop_shutdown(client)
+        await closer.__anext__()
+        _async_client_closers[loop] = closer
+    return client
+
+
+async def init_async_azure_maps_client():
+    """현재(서버) 이벤트 루프용 AsyncAzureMapsClient 미리 생성 (서버 시작 시)"""
+    await get_async_azure_maps_client()
+
+
+async def close_async_azure_maps_client():
+    """현재(서버) 이벤트 루프의 AsyncAzureMapsClient 커넥션 풀 정리 (서버 종료 시)"""
+    loop = asyncio.get_running_loop()
+    _async_azure_maps_clients.pop(loop, None)
+    closer = _async_client_closers.pop(loop, None)
+    if closer is not None:
+        await closer.aclose()
@@ -0,0 +1,106 @@
+"""
+클러스터링 엔진 - K-Means++ 초기화 + 벡터화 K-Means
+
+위경도를 평면(km) 좌표로 투영한 뒤 NumPy 유클리드 거리로 할당
+할당 결과가 더 이상 바뀌지 않으면 조기 종료
+"""
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KMEANS_MAX_ITER = 100
+
+
+def project_to_plane(coords: np.ndarray) -> np.ndarray:
+    """
+    위경도 (n, 2) 배열을 평균 위도 기준 등장방형 투영으로 평면 좌표(km)로 변환
+
+    한 여행지(도시 단위) 범위에서는 Haversine 거리와 오차가 거의 없음
+    """
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    mean_lat = lat.mean() if len(lat) else 0.0
+    x = EARTH_RADIUS_KM * lon * np.cos(mean_lat)
+    y = EARTH_RADIUS_KM * lat
+    return np.column_stack([y, x])
+
+
+def _squared_distances(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """(n, k) 제곱 유클리드 거리 행렬"""
+    diff = points[:, None, :] - centroids[None, :, :]
+    return np.einsum('nkd,nkd->nk', diff, diff)
+
+
+def kmeans_plus_plus_init(points: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    K-Means++ 초기 중심점 선택
+
+    이미 고른 중심점에서 먼 점일수록(거리²에 비례) 다음 중심점으로 뽑힐 확률이 높음
+    """
+    n = len(points)
+    centroids = np.empty((k, points.shape[1]), dtype=np.float64)
+    centroids[0] = points[rng.integers(n)]
+    closest_sq = _squared_distances(points, centroids[:1])[:, 0]
+
+    for c in range(1, k):
+        total = closest_sq.sum()
+        if total <= 0:
+            # 모든 점이 기존 중심점과 겹침 -> 균등 추출
+            idx = rng.integers(n)
+        else:
+            idx = rng.choice(n, p=closest_sq / total)
+        centroids[c] = points[idx]
+        closest_sq = np.minimum(closest_sq, _squared_distances(points, centroids[c:c + 1])[:, 0])
+
+    return centroids
+
+
+def kmeans(
+    points: np.ndarray,
+    k: int,
+    seed: Optional[int] = 0,
+    max_iter: int = KMEANS_MAX_ITER
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    벡터화 K-Means (K-Means++ 초기화, 수렴 시 조기 종료)
+
+    Args:
+        points: (n, d) 평면 좌표
+        k: 클러스터 수
+        seed: 난수 시드 (같은 시드면 같은 결과, None이면 매번 다름)
+        max_iter: 최대 반복 횟수
+
+    Returns:
+        (labels, 통계) - labels: (n,) 클러스터 인덱스
+        통계: iterations, converged, inertia
+    """
+    rng = np.random.default_rng(seed)
+    centroids = kmeans_plus_plus_init(points, k, rng)
+
+    labels = None
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # 1. 각 점을 가장 가까운 중심점에 할당
+        new_labels = np.argmin(_squared_distances(points, centroids), axis=1)
+
+        # 2. 할당이 바뀌지 않으면 수렴
+        if labels is not None and np.array_equal(new_labels, labels):
+            converged = True
+            break
+        labels = new_labels
+
+        # 3. 중심점 업데이트 (빈 클러스터면 기존 중심 유지)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        counts = np.bincount(labels, minlength=k)
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+    inertia = float(_squared_distances(points, centroids)[np.arange(len(points)), labels].sum())
+    return labels, {
+        "iterations": iterations,
+        "converged": converged,
+        "inertia": round(inertia, 4)
+    }
@@ -0,0 +1,241 @@
+"""
+CPU 연산 오프로드 (클러스터링 / 경로 생성 / 경로 개선)
+
+K-Means++, Greedy + 2-opt/Or-opt, 다일 통합 탐색은 순수 CPU 연산이라
+이벤트 루프에서 돌리면 그동안 같은 프로세스의 다른 요청이 모두 멈춤
+- 장소 수가 COMPUTE_OFFLOAD_MIN_PLACES 이상이면 크기가 제한된 프로세스 풀에서 실행
+- 그보다 작으면 프로세스 간 전송 비용이 더 크므로 그대로 인라인 실행
+- 워커에는 장소 dict 대신 좌표/점수 배열만 보내고, 결과는 인덱스로 받아 원래 장소로 복원
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from services.distance_cache import DistanceCache
+from services.route_optimizer import RouteOptimizer, to_coord_array
+
+# 워커 결과에서 숙소를 가리키는 인덱스
+HOTEL_INDEX = -1
+
+
+def plan_day_routes(
+    optimizer: RouteOptimizer,
+    places: List[Dict],
+    num_days: int,
+    hotel: Optional[Dict] = None,
+    solver: str = "cluster",
+    seed: Optional[int] = 0
+) -> Dict[str, Any]:
+    """
+    일자별 장소 배정 + 방문 순서 계산 (인라인 실행)
+
+    Args:
+        places: 방문할 장소들 (숙소 제외)
+        hotel: 숙소 (있으면 매일 숙소에서 출발, 마지막 날을 제외하고 숙소로 복귀)
+        solver: "cluster" (K-Means++ 후 일자별 경로) 또는 "joint" (다일 통합 탐색)
+
+    Returns:
+        clusters: 일자별 배정 장소
+        routes: 일자별 방문 순서 (숙소가 있으면 맨 앞에 숙소, 마지막 숙소 복귀는 제외)
+        kmeans / joint_solver: 탐색 통계
+        route_improvement: 일자별 2-opt/Or-opt 개선 통계 (없으면 None)
+    """
+    joint_stats = None
+    if solver == "joint":
+        # 모든 일자의 배정과 방문 순서를 함께 최적화 (숙소 = 출발/복귀 지점)
+        clusters, joint_stats = optimizer.optimize_days_joint(places, num_days, hotel=hotel, seed=seed)
+        kmeans_stats = joint_stats.pop("kmeans", None) if joint_stats else None
+        # 통합 탐색에서 이미 순서까지 정해짐 (숙소에서 출발)
+        routes = [([hotel] if hotel else []) + list(day) for day in clusters]
+        improvement = [None] * len(routes)
+    else:
+        # 일자별로 클러스터링 (K-Means++) 후 일자별 경로 최적화
+        clusters, kmeans_stats = optimizer.cluster_places_with_stats(places, num_days, seed=seed)
+        routes, improvement = [], []
+        for day, cluster in enumerate(clusters, start=1):
+            route, stats = optimizer.optimize_route_with_stats(
+                cluster,
+                start_location=hotel,
+                return_to_start=bool(hotel) and day < num_days
+            )
+            routes.append(route)
+            improvement.append(stats)
+
+    return {
+        "clusters": clusters,
+        "routes": routes,
+        "kmeans": kmeans_stats,
+        "joint_solver": joint_stats,
+        "route_improvement": improvement
+    }
+
+
+# ---------------------------------------------------------------------------
+# 워커 프로세스
+# ---------------------------------------------------------------------------
+
+_worker_optimizer: Optional[RouteOptimizer] = None
+
+
+def _init_worker():
+    """워커 시작 시 한 번만 RouteOptimizer 생성 (경로 계산은 직선 거리 행렬만 사용)"""
+    global _worker_optimizer
+    _worker_optimizer = RouteOptimizer(cache=DistanceCache(max_entries=1))
+
+
+def _plan_day_routes_worker(
+    coords: np.ndarray,
+    scores: np.ndarray,
+    hotel_coord: Optional[np.ndarray],
+    num_days: int,
+    solver: str,
+    seed: Optional[int],
+    route_improve_budget_ms: float,
+    joint_solver_budget_ms: float
+) -> Dict[str, Any]:
+    """
+    워커에서 실행되는 plan_day_routes (배열 입력 → 인덱스 결과)
+
+    장소 i는 인덱스 i, 숙소는 HOTEL_INDEX로 반환
+    """
+    if _worker_optimizer is None:
+        _init_worker()
+    optimizer = _worker_optimizer
+    # 요청을 보낸 프로세스와 같은 시간 예산 사용
+    optimizer.route_improve_budget_ms = route_improve_budget_ms
+    optimizer.joint_solver_budget_ms = joint_solver_budget_ms
+
+    places = [
+        {"latitude": float(lat), "longitude": float(lon), "score": float(score), "_index": i}
+        for i, ((lat, lon), score) in enumerate(zip(coords, scores))
+    ]
+    hotel = None
+    if hotel_coord is not None:
+        hotel = {"latitude": float(hotel_coord[0]), "longitude": float(hotel_coord[1]), "_index": HOTEL_INDEX}
+
+    plan = plan_day_routes(optimizer, places, num_days, hotel=hotel, solver=solver, seed=seed)
+    for key in ("clusters", "routes"):
+        plan[key] = [[p["_index"] for p in day] for day in plan[key]]
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# 프로세스 풀
+# ---------------------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_stats = {"offloaded": 0, "inline": 0, "failures": 0}
+
+
+def _pool_workers() -> int:
+    return int(os.getenv("COMPUTE_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+
+def _offload_min_places() -> int:
+    return int(os.getenv("COMPUTE_OFFLOAD_MIN_PLACES", "40"))
+
+
+def get_compute_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    프로세스 전체에서 공유하는 CPU 연산 프로세스 풀
+
+    워커 수는 COMPUTE_POOL_WORKERS (기본: min(2, CPU 수), 0이면 오프로드 사용 안 함)
+    스레드가 있는 서버 프로세스를 fork하지 않도록 spawn으로 시작
+    """
+    global _pool
+    if _pool is None:
+        workers = _pool_workers()
+        if workers <= 0:
+            return None
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                print(f"✅ CPU 연산 프로세스 풀 시작 (워커 {workers}개)")
+    return _pool
+
+
+def warm_up_compute_pool():
+    """워커 프로세스를 미리 띄워 첫 요청에서 프로세스 시작 비용이 생기지 않게 함 (서버 시작 시)"""
+    pool = get_compute_pool()
+    if pool is not None:
+        for _ in range(_pool_workers()):
+            pool.submit(_init_worker)
+
+
+def shutdown_compute_pool():
+    """프로세스 풀 종료 (서버 종료 시)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def compute_pool_stats() -> Dict[str, Any]:
+    """오프로드 통계 (offloaded: 풀에서 실행, inline: 인라인 실행, failures: 풀 오류 후 인라인 재실행)"""
+    return {
+        **_stats,
+        "workers": _pool_workers(),
+        "min_places": _offload_min_places(),
+        "running": _pool is not None
+    }
+
+
+async def plan_day_routes_async(
+    optimizer: RouteOptimizer,
+    places: List[Dict],
+    num_days: int,
+    hotel: Optional[Dict] = None,
+    solver: str = "cluster",
+    seed: Optional[int] = 0
+) -> Dict[str, Any]:
+    """
+    plan_day_routes의 비동기 버전
+
+    장소 수가 COMPUTE_OFFLOAD_MIN_PLACES 이상이면 프로세스 풀에서 실행하고,
+    풀을 쓸 수 없으면 인라인으로 실행 (결과는 같음)
+    """
+    pool = get_compute_pool() if len(places) >= _offload_min_places() else None
+    if pool is None:
+        _stats["inline"] += 1
+        return plan_day_routes(optimizer, places, num_days, hotel=hotel, solver=solver, seed=seed)
+
+    call = functools.partial(
+        _plan_day_routes_worker,
+        to_coord_array(places),
+        np.array([p.get("score", 0) or 0 for p in places], dtype=np.float64),
+        to_coord_array([hotel])[0] if hotel else None,
+        num_days,
+        solver,
+        seed,
+        optimizer.route_improve_budget_ms,
+        optimizer.joint_solver_budget_ms
+    )
+    try:
+        plan = await asyncio.get_running_loop().run_in_executor(pool, call)
+    except (BrokenProcessPool, RuntimeError) as e:
+        # 워커가 죽었거나 풀이 종료됨 → 다음 요청에서 새 풀 생성
+        print(f"⚠️  CPU 연산 프로세스 풀 오류, 인라인으로 실행: {e}")
+        _stats["failures"] += 1
+        shutdown_compute_pool()
+        return plan_day_routes(optimizer, places, num_days, hotel=hotel, solver=solver, seed=seed)
+
+    _stats["offloaded"] += 1
+
+    def restore(indices: List[int]) -> List[Dict]:
+        return [hotel if i == HOTEL_INDEX else places[i] for i in indices]
+
+    plan["clusters"] = [restore(day) for day in plan["clusters"]]
+    plan["routes"] = [restore(day) for day in plan["routes"]]
+    return plan
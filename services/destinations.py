@@ -0,0 +1,47 @@
+"""
+여행지 이름 정규화
+
+사용자 입력(예: '제주도')을 POI 데이터의 지역명(예: '제주')으로 변환
+SearchService의 DB 조회와 POI 거리 행렬 디렉토리 이름이 같은 규칙을 사용
+pois.region_key(주소의 시/도에서 한 번만 계산해 저장)도 같은 지역명을 사용
+"""
+from typing import Optional
+
+# destination 매핑 (사용자 입력을 실제 지역명으로 변환)
+DESTINATION_MAP = {
+    '서울': '서울',
+    '제주도': '제주',
+    '제주': '제주',
+    '부산': '부산',
+    '인천': '인천',
+    '대전': '대전',
+    '대구': '대구',
+    '광주': '광주'
+}
+
+
+def normalize_destination(destination: str) -> str:
+    """사용자 입력 여행지 → 지역명 (매핑에 없으면 그대로)"""
+    return DESTINATION_MAP.get(destination, destination)
+
+
+# region_key로 구분하는 지역명 (DESTINATION_MAP의 값)
+REGIONS = sorted(set(DESTINATION_MAP.values()))
+
+
+def region_key(destination: str) -> Optional[str]:
+    """여행지 → pois.region_key 값 (region_key로 구분하지 않는 여행지면 None)"""
+    region = normalize_destination(destination)
+    return region if region in REGIONS else None
+
+
+def region_key_sql(address_column: str = "address") -> str:
+    """
+    주소 → region_key SQL 식 (마이그레이션 백필 / 트리거에서 사용)
+
+    주소의 첫 토큰(시/도, 예: '서울특별시', '제주특별자치도')이 지역명으로 시작하면 그 지역명
+    (예: '경기도 광주시'는 광주가 아님), 해당 없으면 NULL
+    """
+    first_token = f"split_part(btrim({address_column}), ' ', 1)"
+    cases = " ".join(f"WHEN {first_token} LIKE '{region}%' THEN '{region}'" for region in REGIONS)
+    return f"CASE {cases} ELSE NULL END"
@@ -0,0 +1,535 @@
+"""
+거리 계산 캐시 - LRU + TTL + 메모리 제한 + 통계
+
+- LRU: 자주 조회되는 인기 구간은 남기고 오래 안 쓰인 구간부터 제거
+- TTL: 계산 방식(method)별로 다르게 적용
+  (Haversine은 값이 변하지 않으므로 길게, 실시간 교통이 반영된 Azure Maps는 짧게)
+- 메모리 제한: 항목 수와 추정 바이트 수 둘 다 제한
+- 영속 저장소(선택): SQLite 파일에 함께 저장하여 워커 프로세스 간 공유 + 재시작 후에도 유지
+  (쓰기는 모아서 백그라운드 스레드가 기록, 비동기 경로의 조회는 스레드 풀에서 실행 → 이벤트 루프를 막지 않음)
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_TTL_BY_METHOD = {
+    "haversine": float(os.getenv("DISTANCE_CACHE_TTL_HAVERSINE", "86400")),  # 24시간
+    "azure_maps": float(os.getenv("DISTANCE_CACHE_TTL_AZURE", "600")),  # 10분 (교통 상황 반영)
+}
+
+
+class SQLiteDistanceStore:
+    """
+    SQLite 기반 영속 거리 캐시 저장소
+
+    WAL 모드로 열어 여러 uvicorn 워커 프로세스가 같은 파일을 동시에 읽을 수 있음
+    만료 시각은 wall-clock(time.time()) 기준으로 저장 (프로세스 재시작 후에도 유효)
+    """
+
+    # 한 쿼리의 바인드 변수 개수 (SQLite 기본 제한 999 이하)
+    MAX_KEYS_PER_QUERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS distance_cache (
+                cache_key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                method TEXT,
+                expires_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_distance_cache_updated ON distance_cache(updated_at)"
+        )
+
+    @staticmethod
+    def encode_key(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False)
+
+    @staticmethod
+    def decode_key(raw: str) -> Hashable:
+        def to_hashable(obj):
+            return tuple(to_hashable(o) for o in obj) if isinstance(obj, list) else obj
+        return to_hashable(json.loads(raw))
+
+    def get(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(value, expires_at) 반환, 없거나 만료되었으면 None"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM distance_cache WHERE cache_key = ? AND expires_at > ?",
+                    (self.encode_key(key), time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️  거리 캐시 DB 조회 실패: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get_many(self, keys: Sequence[Hashable]) -> Dict[Hashable, Tuple[Dict[str, Any], float]]:
+        """여러 키를 IN 쿼리로 한 번에 조회, {key: (value, expires_at)} (없거나 만료된 키는 빠짐)"""
+        encoded = {self.encode_key(key): key for key in keys}
+        raw_keys = list(encoded)
+        now = time.time()
+        found = {}
+        try:
+            with self._lock:
+                for start in range(0, len(raw_keys), self.MAX_KEYS_PER_QUERY):
+                    chunk = raw_keys[start:start + self.MAX_KEYS_PER_QUERY]
+                    rows = self._conn.execute(
+                        "SELECT cache_key, value, expires_at FROM distance_cache "
+                        f"WHERE cache_key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                        (*chunk, now)
+                    ).fetchall()
+                    for raw, value, expires_at in rows:
+                        found[encoded[raw]] = (json.loads(value), expires_at)
+        except sqlite3.Error as e:
+            print(f"⚠️  거리 캐시 DB 조회 실패: {e}")
+        return found
+
+    def set(self, key: Hashable, value: Dict[str, Any], expires_at: float) -> bool:
+        return self.set_many([(key, value, expires_at)])
+
+    def set_many(self, items: Iterable[Tuple[Hashable, Dict[str, Any], float]]) -> bool:
+        """(key, value, expires_at) 여러 개를 한 트랜잭션으로 저장, 커밋에 성공하면 True"""
+        now = time.time()
+        rows = [
+            (self.encode_key(key), json.dumps(value, ensure_ascii=False), value.get("method"), expires_at, now)
+            for key, value, expires_at in items
+        ]
+        if not rows:
+            return True
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO distance_cache (cache_key, value, method, expires_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"⚠️  거리 캐시 DB 저장 실패 ({len(rows)}개): {e}")
+            return False
+        return True
+
+    def load_recent(self, limit: int) -> List[Tuple[Hashable, Dict[str, Any], float]]:
+        """만료되지 않은 항목을 최근 저장 순으로 최대 limit개 로드"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT cache_key, value, expires_at FROM distance_cache "
+                    "WHERE expires_at > ? ORDER BY updated_at DESC LIMIT ?",
+                    (time.time(), limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️  거리 캐시 DB 로드 실패: {e}")
+            return []
+        return [(self.decode_key(k), json.loads(v), exp) for k, v, exp in rows]
+
+    def prune_expired(self) -> int:
+        """만료된 행 삭제, 삭제한 개수 반환"""
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM distance_cache WHERE expires_at <= ?", (time.time(),)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️  거리 캐시 DB 정리 실패: {e}")
+            return 0
+
+    def count(self) -> int:
+        try:
+            with self._lock:
+                return self._conn.execute("SELECT COUNT(*) FROM distance_cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DistanceCache:
+    """스레드 안전한 LRU + TTL 거리 캐시"""
+
+    def __init__(
+        self,
+        max_entries: int = int(os.getenv("DISTANCE_CACHE_MAX_ENTRIES", "5000")),
+        max_bytes: int = int(float(os.getenv("DISTANCE_CACHE_MAX_MB", "16")) * 1024 * 1024),
+        ttl_by_method: Optional[Dict[str, float]] = None,
+        default_ttl: float = 3600,
+        store: Optional[SQLiteDistanceStore] = None,
+        flush_interval: float = float(os.getenv("DISTANCE_CACHE_FLUSH_INTERVAL", "1")),
+        flush_batch: int = 500
+    ):
+        """
+        Args:
+            store: 영속 저장소 (메모리 미스 시 조회, 저장 시 함께 기록)
+            flush_interval: 영속 저장소에 모아 둔 쓰기를 기록하는 주기 (초)
+            flush_batch: 모아 둔 쓰기가 이 개수 이상이면 주기를 기다리지 않고 기록
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_by_method = dict(DEFAULT_TTL_BY_METHOD if ttl_by_method is None else ttl_by_method)
+        self.default_ttl = default_ttl
+
+        # {key: (value, expires_at, size_bytes)} - 앞쪽이 가장 오래 사용되지 않은 항목
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.store_hits = 0
+        self.store_writes = 0
+        self.store_write_failures = 0
+        self._by_method: Dict[str, Dict[str, int]] = {}
+
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        # 영속 저장소에 아직 기록하지 않은 값 {key: (value, expires_at wall-clock)}
+        self._pending_writes: Dict[Hashable, tuple] = {}
+        self._flush_wakeup = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, record=False) is not None
+
+    def get(self, key: Hashable, record: bool = True, use_store: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        캐시 조회 (만료된 항목은 제거 후 None)
+
+        Args:
+            record: False면 hit/miss 통계에 반영하지 않음
+            use_store: False면 메모리만 조회 (영속 저장소 I/O 없음)
+        """
+        return self.get_many([key], record, use_store).get(key)
+
+    def get_many(
+        self,
+        keys: Iterable[Hashable],
+        record: bool = True,
+        use_store: bool = True
+    ) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        여러 키 조회 (거리 행렬용), 찾은 항목만 {key: value}로 반환
+
+        메모리 미스인 키는 영속 저장소에서 쿼리 한 번으로 조회
+        """
+        found, missing = self._get_from_memory(keys, record)
+        if missing and use_store and self.store is not None:
+            stored, unwritten = self._take_pending(missing)
+            if unwritten:
+                stored.update(self.store.get_many(unwritten))
+            found.update(self._accept_stored(stored))
+        self._record_store_lookup(found, missing, record)
+        return found
+
+    async def get_async(self, key: Hashable, record: bool = True) -> Optional[Dict[str, Any]]:
+        """get의 비동기 버전 (영속 저장소 조회는 스레드 풀에서 실행)"""
+        return (await self.get_many_async([key], record)).get(key)
+
+    async def get_many_async(self, keys: Iterable[Hashable], record: bool = True) -> Dict[Hashable, Dict[str, Any]]:
+        """get_many의 비동기 버전 (영속 저장소 조회는 스레드 풀에서 실행)"""
+        found, missing = self._get_from_memory(keys, record)
+        if missing and self.store is not None:
+            stored, unwritten = self._take_pending(missing)
+            if unwritten:
+                loop = asyncio.get_running_loop()
+                stored.update(await loop.run_in_executor(None, self.store.get_many, unwritten))
+            found.update(self._accept_stored(stored))
+        self._record_store_lookup(found, missing, record)
+        return found
+
+    def _get_from_memory(self, keys: Iterable[Hashable], record: bool) -> Tuple[Dict[Hashable, Dict[str, Any]], List[Hashable]]:
+        """메모리에서 조회 → (찾은 항목, 못 찾은 키)"""
+        found: Dict[Hashable, Dict[str, Any]] = {}
+        missing: List[Hashable] = []
+        now = time.monotonic()
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    value, expires_at, size = entry
+                    if expires_at > now:
+                        self._entries.move_to_end(key)
+                        if record:
+                            self.hits += 1
+                            self._method_stats(value.get("method"))["hits"] += 1
+                        found[key] = value
+                        continue
+
+                    self._remove(key, size)
+                    self.expirations += 1
+                missing.append(key)
+        return found, missing
+
+    def _take_pending(self, keys: List[Hashable]) -> Tuple[Dict[Hashable, tuple], List[Hashable]]:
+        """기록 대기 중인 값 중 keys에 해당하는 것 → (찾은 항목, 영속 저장소에서 조회할 키)"""
+        with self._lock:
+            pending = {key: self._pending_writes[key] for key in keys if key in self._pending_writes}
+        return pending, [key for key in keys if key not in pending]
+
+    def _accept_stored(self, stored: Dict[Hashable, tuple]) -> Dict[Hashable, Dict[str, Any]]:
+        """영속 저장소에서 찾은 (value, expires_at) 값을 메모리에 올림"""
+        now = time.time()
+        for key, (value, expires_at_wall) in stored.items():
+            self._put(key, value, expires_at_wall - now)
+        return {key: value for key, (value, _) in stored.items()}
+
+    def _record_store_lookup(self, found: Dict[Hashable, Dict[str, Any]], missing: List[Hashable], record: bool):
+        """메모리 미스 키들의 hit/miss 통계 (영속 저장소에서 찾은 항목은 store hit)"""
+        if not record:
+            return
+        with self._lock:
+            for key in missing:
+                value = found.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.store_hits += 1
+                    self._method_stats(value.get("method"))["hits"] += 1
+
+    def set(self, key: Hashable, value: Dict[str, Any], ttl: Optional[float] = None):
+        """
+        캐시 저장 (TTL 미지정 시 value["method"]에 따른 TTL 적용)
+        """
+        method = value.get("method")
+        if ttl is None:
+            ttl = self.ttl_by_method.get(method, self.default_ttl)
+        if ttl <= 0:
+            return
+
+        self._put(key, value, ttl)
+        with self._lock:
+            self._method_stats(method)["stores"] += 1
+            if self.store is None:
+                return
+            # 영속 저장소에는 바로 쓰지 않고 모아서 백그라운드 스레드가 한 트랜잭션으로 기록
+            self._pending_writes[key] = (value, time.time() + ttl)
+            pending = len(self._pending_writes)
+            if self._flush_thread is None:
+                self._flush_thread = threading.Thread(
+                    target=self._flush_loop, name="distance-cache-flush", daemon=True
+                )
+                self._flush_thread.start()
+                atexit.register(self.flush)
+
+        if pending >= self.flush_batch:
+            self._flush_wakeup.set()
+
+    def flush(self) -> int:
+        """
+        모아 둔 쓰기를 영속 저장소에 기록, 기록한 개수 반환
+
+        커밋에 성공한 뒤에만 대기 목록에서 제거 (기록 중에도 다른 조회가 대기 목록에서 값을 찾을 수 있음)
+        실패하면(예: 다른 워커가 잠가 timeout) 대기 목록에 남겨 다음 flush에서 다시 시도
+        """
+        with self._lock:
+            if not self._pending_writes:
+                return 0
+            entries = list(self._pending_writes.items())
+
+        if not self.store.set_many([(key, value, expires_at) for key, (value, expires_at) in entries]):
+            with self._lock:
+                self.store_write_failures += 1
+                # 저장소가 계속 실패해도 대기 목록이 메모리 캐시 크기를 넘지 않도록 오래된 것부터 버림
+                while len(self._pending_writes) > self.max_entries:
+                    del self._pending_writes[next(iter(self._pending_writes))]
+            return 0
+
+        with self._lock:
+            for key, entry in entries:
+                # 기록하는 동안 새 값으로 바뀐 키는 남겨서 다음 flush에 기록
+                if self._pending_writes.get(key) is entry:
+                    del self._pending_writes[key]
+            self.store_writes += len(entries)
+        return len(entries)
+
+    def _flush_loop(self):
+        """flush_interval마다 (또는 flush_batch개가 쌓이면 바로) 모아 둔 쓰기 기록"""
+        while True:
+            self._flush_wakeup.wait(max(self.flush_interval, 0.01))
+            self._flush_wakeup.clear()
+            self.flush()
+
+    def warm_up(self, limit: Optional[int] = None) -> int:
+        """
+        영속 저장소에서 최근 항목을 메모리로 미리 로드 (서버 시작 시)
+
+        Args:
+            limit: 최대 로드 개수 (기본값: max_entries)
+
+        Returns:
+            로드한 항목 수
+        """
+        if self.store is None:
+            return 0
+
+        self.store.prune_expired()
+        rows = self.store.load_recent(limit or self.max_entries)
+        now = time.time()
+        # 최근 항목이 LRU 뒤쪽(가장 최근 사용)에 오도록 오래된 것부터 넣음
+        for key, value, expires_at in reversed(rows):
+            self._put(key, value, expires_at - now)
+        return len(rows)
+
+    def _put(self, key: Hashable, value: Dict[str, Any], ttl: float):
+        """메모리에만 저장 (LRU 제한 적용)"""
+        if ttl <= 0:
+            return
+
+        size = self._estimate_size(key, value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+
+            # 최대 크기 초과 시 가장 오래 사용되지 않은 항목부터 제거 (LRU)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def clear(self):
+        """캐시 비우기 (통계는 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """만료된 항목 일괄 제거, 제거한 개수 반환"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                self._remove(key, self._entries[key][2])
+            self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 통계 (hit/miss/eviction, method별 내역)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries_by_method: Dict[str, int] = {}
+            for value, _, _ in self._entries.values():
+                method = value.get("method") or "unknown"
+                entries_by_method[method] = entries_by_method.get(method, 0) + 1
+
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "store_hits": self.store_hits,
+                "store": {
+                    "path": self.store.path,
+                    "writes": self.store_writes,
+                    "write_failures": self.store_write_failures,
+                    "pending_writes": len(self._pending_writes)
+                } if self.store is not None else None,
+                "ttl_by_method": dict(self.ttl_by_method),
+                "by_method": {
+                    method: {**counts, "entries": entries_by_method.get(method, 0)}
+                    for method, counts in self._by_method.items()
+                }
+            }
+
+    def _remove(self, key: Hashable, size: int):
+        del self._entries[key]
+        self._bytes -= size
+
+    def _method_stats(self, method: Optional[str]) -> Dict[str, int]:
+        return self._by_method.setdefault(method or "unknown", {"hits": 0, "stores": 0})
+
+    @staticmethod
+    def _estimate_size(key: Hashable, value: Dict[str, Any]) -> int:
+        """항목 하나의 대략적인 메모리 사용량 (bytes)"""
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(key, tuple):
+            # 튜플 키(mode, 출발 격자, 도착 격자)는 내부 원소 크기도 포함
+            size += sum(sys.getsizeof(part) for part in key)
+        for k, v in value.items():
+            size += sys.getsizeof(k) + sys.getsizeof(v)
+        return size
+
+
+_distance_cache: Optional[DistanceCache] = None
+
+
+def get_distance_cache() -> DistanceCache:
+    """프로세스 전체에서 공유하는 DistanceCache 싱글톤 인스턴스 가져오기"""
+    global _distance_cache
+    if _distance_cache is None:
+        # DISTANCE_CACHE_DB_PATH가 설정되면 SQLite 영속 저장소 사용
+        db_path = os.getenv("DISTANCE_CACHE_DB_PATH")
+        store = None
+        if db_path:
+            try:
+                store = SQLiteDistanceStore(db_path)
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️  거리 캐시 DB를 열 수 없어 메모리 캐시만 사용합니다: {e}")
+        _distance_cache = DistanceCache(store=store)
+    return _distance_cache
+
+
+def warm_up_distance_cache() -> int:
+    """
+    공유 거리 캐시를 영속 저장소에서 미리 로드
+
+    DISTANCE_CACHE_WARM_LIMIT (기본값: 최대 항목 수, 0이면 생략)
+    """
+    cache = get_distance_cache()
+    limit = int(os.getenv("DISTANCE_CACHE_WARM_LIMIT", str(cache.max_entries)))
+    if cache.store is None or limit <= 0:
+        return 0
+
+    loaded = cache.warm_up(limit)
+    print(f"✅ 거리 캐시 워밍업 완료 ({loaded}개 로드, {cache.store.path})")
+    return loaded
+
+
+def flush_distance_cache() -> int:
+    """공유 거리 캐시의 기록 대기 중인 값을 영속 저장소에 기록 (서버 종료 시)"""
+    if _distance_cache is None or _distance_cache.store is None:
+        return 0
+    return _distance_cache.flush()
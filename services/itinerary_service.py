@@ -1,18 +1,68 @@
 import asyncio
-from typing import List, Dict, Any
-from services.route_optimizer import RouteOptimizer
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from services.route_optimizer import RouteOptimizer, haversine_pairwise, to_coord_array
+from services.compute_pool import plan_day_routes_async
+from services.spatial_index import SpatialIndex
+
+# 일정에 제공하는 교통수단 (walk와 public만 제공)
+TRAVEL_MODES = ["walk", "public"]
+HOTEL_TYPES = ['hotel', '숙박']
+# 일정 항목마다 제공하는 예비 장소 수
+ALTERNATIVES_PER_SLOT = 5
+
+
+class PlanningContext:
+    """
+    일정 생성 요청 하나의 상태
+
+    ItineraryService는 요청 간 공유 상태를 갖지 않고, 요청별 중간 결과(숙소, 클러스터,
+    일정)는 모두 이 객체에 담음 → 한 서비스 인스턴스로 여러 요청을 동시에 처리 가능
+    """
+
+    def __init__(
+        self,
+        places: List[dict],
+        duration_days: int,
+        alternative_places: List[dict],
+        solver: str
+    ):
+        self.places = places
+        self.duration_days = duration_days
+        self.alternative_places = alternative_places
+        self.solver = solver
+        # 예비 장소 공간 인덱스 (슬롯마다 같은 타입의 가장 가까운 예비 장소 검색)
+        self.alternative_index = SpatialIndex(alternative_places)
+        self.main_hotel: Optional[Dict] = None
+        self.places_to_visit: List[Dict] = []
+        self.clusters: List[List[Dict]] = []
+        self.itinerary: List[Dict] = []
+        # 클러스터링/경로 탐색 정보 (clustering_debug_info)
+        self.debug_info: Optional[Dict] = None
 
 
 class ItineraryService:
+    """
+    여행 일정 생성 서비스
+
+    인스턴스에는 설정과 공유 RouteOptimizer만 두고 요청별 상태는 PlanningContext로 전달
+    (여러 요청이 같은 인스턴스를 스레드/태스크에서 동시에 사용해도 안전)
+    """
+
     def __init__(self):
         self.optimizer = RouteOptimizer()
+        # 일자별 경로 구성 방식
+        # - cluster: K-Means++로 일자 배정 후 일자별 경로 최적화 (기본)
+        # - joint: 모든 일자의 배정과 순서를 함께 최적화 (VRP 방식 지역 탐색)
+        self.route_solver = os.getenv("ROUTE_SOLVER", "cluster").lower()
     
     async def create_itinerary_async(
         self,
         places: List[dict],
         duration_days: int,
         alternative_places: List[dict] = [],
-        include_debug_info: bool = False
+        include_debug_info: bool = False,
+        solver: Optional[str] = None
     ) -> Any:
         """
         비동기 날짜별 여행 일정 생성
@@ -21,74 +71,151 @@ class ItineraryService:
         
         Args:
             include_debug_info: True면 상세한 디버그 정보 포함
+            solver: 경로 구성 방식 ("cluster" 또는 "joint", None이면 ROUTE_SOLVER)
         """
-        result = await self._create_itinerary_impl(places, duration_days, alternative_places)
-        
-        if include_debug_info:
-            return {
-                "itinerary": result,
-                "debug_info": {
-                    "total_selected_places": len(places),
-                    "clustering": self.clustered_places if hasattr(self, 'clustered_places') else None,
-                    "all_places_with_scores": places
-                }
-            }
-        
-        return result
+        context = await self._create_itinerary_impl(places, duration_days, alternative_places, solver)
+        return self._itinerary_result(context, include_debug_info)
     
     def create_itinerary(
         self,
         places: List[dict],
         duration_days: int,
         alternative_places: List[dict] = [],
-        include_debug_info: bool = False
+        include_debug_info: bool = False,
+        solver: Optional[str] = None
     ) -> Any:
         """
         날짜별 여행 일정 생성 (동기 버전)
         
         기존 코드와의 호환성을 위해 유지
         """
+        def run_in_new_loop(new_loop):
+            try:
+                return new_loop.run_until_complete(
+                    self._create_itinerary_impl(places, duration_days, alternative_places, solver)
+                )
+            finally:
+                # 루프별 자원(Azure Maps 비동기 클라이언트 등) 정리 후 종료
+                new_loop.run_until_complete(new_loop.shutdown_asyncgens())
+                new_loop.close()
+
         try:
             loop = asyncio.get_event_loop()
             if loop.is_running():
                 # 이미 실행 중인 루프가 있으면 새 루프 생성
-                new_loop = asyncio.new_event_loop()
-                result = new_loop.run_until_complete(
-                    self._create_itinerary_impl(places, duration_days, alternative_places)
-                )
+                context = run_in_new_loop(asyncio.new_event_loop())
             else:
-                result = loop.run_until_complete(
-                    self._create_itinerary_impl(places, duration_days, alternative_places)
+                context = loop.run_until_complete(
+                    self._create_itinerary_impl(places, duration_days, alternative_places, solver)
                 )
         except RuntimeError:
             # 새로운 루프 생성
             new_loop = asyncio.new_event_loop()
             asyncio.set_event_loop(new_loop)
-            result = new_loop.run_until_complete(
-                self._create_itinerary_impl(places, duration_days, alternative_places)
-            )
+            context = run_in_new_loop(new_loop)
         
+        return self._itinerary_result(context, include_debug_info)
+
+    @staticmethod
+    def _itinerary_result(context: "PlanningContext", include_debug_info: bool) -> Any:
+        """일정 생성 결과 (include_debug_info면 디버그 정보 포함)"""
         if include_debug_info:
             return {
-                "itinerary": result,
+                "itinerary": context.itinerary,
                 "debug_info": {
-                    "total_selected_places": len(places),
-                    "clustering": self.clustered_places if hasattr(self, 'clustered_places') else None,
-                    "all_places_with_scores": places
+                    "total_selected_places": len(context.places),
+                    "clustering": context.clusters,
+                    "all_places_with_scores": context.places
                 }
             }
         
-        return result
+        return context.itinerary
     
+    def planning_context(
+        self,
+        places: List[dict],
+        duration_days: int,
+        alternative_places: List[dict] = [],
+        solver: Optional[str] = None
+    ) -> "PlanningContext":
+        """요청 하나의 PlanningContext 생성 (solver가 없으면 ROUTE_SOLVER)"""
+        return PlanningContext(
+            places, duration_days, alternative_places, (solver or self.route_solver).lower()
+        )
+
     async def _create_itinerary_impl(
         self,
         places: List[dict],
         duration_days: int,
-        alternative_places: List[dict] = []
-    ) -> List[Dict]:
+        alternative_places: List[dict] = [],
+        solver: Optional[str] = None
+    ) -> "PlanningContext":
         """
         실제 일정 생성 로직 (비동기)
+
+        요청별 중간 결과는 모두 PlanningContext에 담음 (서비스 인스턴스에는 저장하지 않음)
+        """
+        context = self.planning_context(places, duration_days, alternative_places, solver)
+        day_routes = await self._plan_routes(context)
+
+        # 모든 일자의 구간/예비 장소 이동 정보를 한 번에 배치 계산 (두 작업도 동시에 진행)
+        (leg_tables, _), day_alternatives = await asyncio.gather(
+            self._compute_leg_table(day_routes),
+            self._slot_alternatives(day_routes, context.alternative_index)
+        )
+
+        # 일자별 시간표를 동시에 구성 (결과는 일자 순서대로)
+        context.itinerary.extend(await asyncio.gather(*[
+            self._build_day_plan(
+                day, optimized_places, alternative_places, context.alternative_index,
+                legs=leg_tables[day - 1], alternatives=day_alternatives[day - 1]
+            )
+            for day, optimized_places in enumerate(day_routes, start=1)
+        ]))
+
+        # 첫 날에만 클러스터링 정보 저장
+        if context.itinerary:
+            self._finish_debug_info(context)
+            context.itinerary[0]["clustering_debug_info"] = context.debug_info
+        return context
+
+    async def stream_days(self, context: "PlanningContext") -> AsyncIterator[Dict]:
+        """
+        일자별 일정을 준비되는 대로 일자 순서대로 반환 (스트리밍 응답용)
+
+        모든 일자를 동시에 계산하기 시작하고, 1일차가 끝나면 나머지 일자를 기다리지 않고 바로 반환
+        마지막 일자까지 반환한 뒤 context.debug_info에 클러스터링 정보가 채워짐
+        (일정에는 clustering_debug_info를 넣지 않음)
+        """
+        day_routes = await self._plan_routes(context)
+        tasks = [
+            asyncio.ensure_future(self._build_day_plan(
+                day, optimized_places, context.alternative_places, context.alternative_index
+            ))
+            for day, optimized_places in enumerate(day_routes, start=1)
+        ]
+        try:
+            for task in tasks:
+                day_plan = await task
+                context.itinerary.append(day_plan)
+                yield day_plan
+        finally:
+            # 클라이언트 연결이 끊기면 남은 일자 계산 중단
+            for task in tasks:
+                task.cancel()
+        self._finish_debug_info(context)
+
+    async def _plan_routes(self, context: "PlanningContext") -> List[List[Dict]]:
         """
+        장소 분류 → 숙소 선정 → 일자별 배정/방문 순서
+
+        Returns:
+            일자별 경로 (숙소 출발, 마지막 날을 제외하고 숙소 복귀 포함)
+            context.debug_info에 클러스터링 정보 저장
+        """
+        places = context.places
+        duration_days = context.duration_days
+        joint = context.solver == "joint"
 
         # 1. 장소 타입별 분류
         # DB의 main_type: 관광지, 음식점, 숙박, 문화시설, 쇼핑, 레저스포츠
@@ -96,242 +223,614 @@ class ItineraryService:
         activities = [p for p in places if p['type'] in ['activity', 'museum', 'shopping', '관광지', '문화시설', '레저스포츠']]
         restaurants = [p for p in places if p['type'] in ['restaurant', '음식점']]
         cafes = [p for p in places if p['type'] == 'cafe']    
-        hotels = [p for p in places if p['type'] in ['hotel', '숙박']]
-
-        itinerary = []
-        clustering_debug_info = None  # 클러스터링 정보 저장용
+        hotels = [p for p in places if p['type'] in HOTEL_TYPES]
 
         # 호텔은 점수 높은 순으로 정렬 (메인 숙소 선정용)
         hotels.sort(key=lambda x: x.get('score', 0), reverse=True)
-        main_hotel = hotels[0] if hotels else None
+        context.main_hotel = hotels[0] if hotels else None
 
-        for day in range(1, duration_days + 1):
-            day_plan = {
-                "day": day,
-                "schedule": [],
-                "summary": {}
-            }
+        # 1. 전체 장소 리스트 준비
+        # 비율에 맞춰 장소 혼합 (Activity 2 : Restaurant 2 : Cafe 1)
+        places_to_visit = context.places_to_visit
+        while activities or restaurants or cafes:
+            if activities: places_to_visit.append(activities.pop(0))
+            if restaurants: places_to_visit.append(restaurants.pop(0))
+            if activities: places_to_visit.append(activities.pop(0))
+            if cafes: places_to_visit.append(cafes.pop(0))
+            if restaurants: places_to_visit.append(restaurants.pop(0))
 
-            # 하루 일정 구성 로직 (클러스터링 적용)
-            
-            # 1. 전체 장소 리스트 준비 (첫 날에만 실행)
-            if day == 1:
-                all_places_to_visit = []
-                # 비율에 맞춰 장소 혼합 (Activity 2 : Restaurant 2 : Cafe 1)
-                while activities or restaurants or cafes:
-                    if activities: all_places_to_visit.append(activities.pop(0))
-                    if restaurants: all_places_to_visit.append(restaurants.pop(0))
-                    if activities: all_places_to_visit.append(activities.pop(0))
-                    if cafes: all_places_to_visit.append(cafes.pop(0))
-                    if restaurants: all_places_to_visit.append(restaurants.pop(0))
-                
-                # 2. 일자별로 클러스터링 (K-Means)
-                self.clustered_places = self.optimizer.cluster_places(all_places_to_visit, duration_days)
-                
-                # 클러스터링 정보 저장 (나중에 반환할 때 사용)
-                clustering_debug_info = {
-                    "clustering_method": "K-Means",
-                    "total_places_for_clustering": len(all_places_to_visit),
-                    "num_clusters": duration_days,
-                    "clusters": [
+        # 2. 일자별 배정 + 방문 순서 (숙소가 있으면 모든 날을 숙소에서 시작)
+        # 장소가 많으면 프로세스 풀에서 계산해 이벤트 루프를 막지 않음
+        plan = await plan_day_routes_async(
+            self.optimizer, places_to_visit, duration_days, hotel=context.main_hotel, solver=context.solver
+        )
+        context.clusters = plan["clusters"]
+
+        # 클러스터링 정보 저장 (나중에 반환할 때 사용)
+        context.debug_info = {
+            "clustering_method": "Joint VRP (K-Means++ 초기 해 + 지역 탐색)" if joint else "K-Means++",
+            "route_solver": context.solver,
+            "joint_solver": plan["joint_solver"],
+            "total_places_for_clustering": len(places_to_visit),
+            "num_clusters": duration_days,
+            "kmeans": plan["kmeans"],
+            "clusters": [
+                {
+                    "day": i + 1,
+                    "places_in_cluster": len(cluster),
+                    "cluster_places": [
                         {
-                            "day": i + 1,
-                            "places_in_cluster": len(self.clustered_places[i]),
-                            "cluster_places": [
-                                {
-                                    "name": p.get("name"),
-                                    "type": p.get("type"),
-                                    "score": p.get("score"),
-                                    "latitude": p.get("latitude"),
-                                    "longitude": p.get("longitude")
-                                }
-                                for p in self.clustered_places[i]
-                            ]
+                            "name": p.get("name"),
+                            "type": p.get("type"),
+                            "score": p.get("score"),
+                            "latitude": p.get("latitude"),
+                            "longitude": p.get("longitude")
                         }
-                        for i in range(len(self.clustered_places))
+                        for p in cluster
                     ]
                 }
+                for i, cluster in enumerate(context.clusters)
+            ],
+            "route_improvement": []  # 일자별 2-opt/Or-opt 개선 통계
+        }
 
-            # 3. 해당 일자의 클러스터 가져오기
-            daily_places = self.clustered_places[day-1] if day <= len(self.clustered_places) else []
+        # 3. 일자별 경로 (클러스터가 없는 날은 빈 경로)
+        routes, improvement = plan["routes"], plan["route_improvement"]
+        day_routes = []
+        for day in range(1, duration_days + 1):
+            optimized_places = list(routes[day - 1]) if day <= len(routes) else []
+            improvement_stats = improvement[day - 1] if day <= len(improvement) else None
+            context.debug_info["route_improvement"].append({
+                "day": day,
+                **(improvement_stats or {})
+            })
 
-            # 해당 일자의 경로 최적화
-            # 숙소가 있으면: 모든 날(1일차 포함)을 숙소를 기준으로 시작
-            # 숙소가 없으면: 시작점 없음 (None)
+            # 마지막에 숙소 추가(마지막 날 제외)
+            if context.main_hotel and day < duration_days:
+                optimized_places.append(context.main_hotel)
+            day_routes.append(optimized_places)
+        return day_routes
 
-            start_loc = main_hotel if main_hotel else None
-            optimized_places = self.optimizer.optimize_route(daily_places, start_location=start_loc)
+    @staticmethod
+    def _finish_debug_info(context: "PlanningContext"):
+        """경로 구성 방식 비교용 전체 이동 합계를 클러스터링 정보에 추가"""
+        itinerary = context.itinerary
+        context.debug_info["total_travel_minutes"] = sum(
+            d["summary"]["total_travel_time_minutes"] for d in itinerary
+        )
+        context.debug_info["total_distance_km"] = round(sum(
+            d["summary"]["total_distance_km"] for d in itinerary
+        ), 2)
 
-            # 마지막에 숙소 추가(마지막 날 제외)
-            if main_hotel and day < duration_days:
-                optimized_places.append(main_hotel)
-
-            # 시간표 생성 (09:00 시작)
-            current_time_min = 9*60
-            total_dist = 0
-            total_time = 0
-
-            # 모든 거리 계산을 준비 (병렬 처리 위함)
-            distance_tasks = []
-            for i, place in enumerate(optimized_places):
-                if i > 0:
-                    prev_place = optimized_places[i-1]
-                    lat1 = prev_place.get('latitude', 0)
-                    lon1 = prev_place.get('longitude', 0)
-                    lat2 = place.get('latitude', 0)
-                    lon2 = place.get('longitude', 0)
-                    
-                    straight_dist = self.optimizer.get_straight_distance(lat1, lon1, lat2, lon2)
-                    mode = "walk" if straight_dist < 1.5 else "public"
-                    
-                    # 기본값은 walk로 비동기 거리 계산
-                    # (추후 public도 선택 옵션으로 제공하므로 walk만 기본값으로)
-                    task = self.optimizer.calculate_distance_async(
-                        lat1, lon1, lat2, lon2,
-                        mode="walk"  # 기본값: walk
-                    )
-                    distance_tasks.append((i, "walk", task))
-            
-            # 모든 거리를 병렬로 계산
-            if distance_tasks:
-                travel_results = await asyncio.gather(
-                    *[task for _, _, task in distance_tasks],
-                    return_exceptions=False
-                )
+    async def _build_day_plan(
+        self,
+        day: int,
+        optimized_places: List[dict],
+        alternative_places: List[dict],
+        alternative_index: Optional[SpatialIndex] = None,
+        legs: Optional[List[Dict[str, Dict]]] = None,
+        alternatives: Optional[List[List[Dict]]] = None
+    ) -> Dict:
+        """
+        방문 순서가 정해진 하루 경로로 시간표 생성
+
+        구간 이동 정보는 구간 테이블에서 읽기만 함 (다시 계산하지 않음)
+
+        Args:
+            day: 일차
+            optimized_places: 방문 순서대로 정렬된 장소 (숙소 출발/복귀 포함)
+            alternative_places: 예비 장소 후보
+            alternative_index: alternative_places의 공간 인덱스 (없으면 생성)
+            legs: 이 날의 구간 테이블 [구간][mode] → 이동 정보 (없으면 _compute_leg_table로 계산)
+            alternatives: 이 날의 항목별 예비 장소 (없으면 _slot_alternatives로 계산)
+        """
+
+        day_plan = {
+            "day": day,
+            "schedule": [],
+            "summary": {}
+        }
+
+        # 시간표 생성 (09:00 시작)
+        current_time_min = 9*60
+        total_dist = 0
+        total_time = 0
+
+        # 하루치 구간(이전 장소 → 현재 장소)의 모든 교통수단 이동 정보
+        if legs is None:
+            tables, _ = await self._compute_leg_table([optimized_places])
+            legs = tables[0]
+        # 일정 항목별 예비 장소 (항목마다 별도 사본)
+        if alternatives is None:
+            if alternative_index is None:
+                alternative_index = SpatialIndex(alternative_places)
+            alternatives = (await self._slot_alternatives([optimized_places], alternative_index))[0]
+
+        # 일정 생성
+        for i, place in enumerate(optimized_places):
+            travel_info = None
+            travel_options = None
+
+            if i > 0:
+                # 모든 교통수단 선택지 제공 (일정 항목마다 별도 사본)
+                travel_options = {
+                    transport_mode: dict(option)
+                    for transport_mode, option in legs[i-1].items()
+                }
+
+                # 기본값은 walk로 설정 (travel_info에 walk 사용)
+                travel_info = travel_options["walk"]
+                dist = travel_info["distance_km"]
+                travel_time = travel_info["time_minutes"]
+
+                current_time_min += travel_time
+                total_dist += dist
+                total_time += travel_time
+
+            # 체류 시간 (기본 90분)
+            duration_min = 90
+            start_time_str = f"{current_time_min // 60:02d}:{current_time_min % 60:02d}"
+            current_time_min += duration_min
+            end_time_str = f"{current_time_min // 60:02d}:{current_time_min % 60:02d}"
+
+            # 시간대 구분
+
+            hour = int(start_time_str.split(':')[0])
+            if hour < 12: 
+                slot = "morning"
+            elif hour < 14:
+                slot = "lunch"
+            elif hour < 17:
+                slot = "afternoon"
+            elif hour < 19:
+                slot = "dinner"
             else:
-                travel_results = []
-
-            # 거리 계산 결과를 schedule_item에 반영
-            travel_result_map = {}
-            for idx, (i, mode, _) in enumerate(distance_tasks):
-                travel_result_map[i] = (travel_results[idx], mode)
-
-            # 일정 생성
-            for i, place in enumerate(optimized_places):
-                travel_info = None
-                travel_options = None
-                
-                if i > 0 and i in travel_result_map:
-                    travel_result, mode = travel_result_map[i]
-                    dist = travel_result["distance_km"]
-                    travel_time = travel_result["time_minutes"]
-
-                    current_time_min += travel_time
-                    total_dist += dist
-                    total_time += travel_time
-
-                    # 현재 선택된 교통수단
-                    travel_info = {
-                        "distance_km": dist,
-                        "time_minutes": travel_time,
+                slot = "night"
+
+            schedule_item = {
+                "order": i + 1,
+                "time_slot": slot,
+                "start_time": start_time_str,
+                "end_time": end_time_str,
+                "place": place,
+                "duration_minutes": duration_min,
+                "travel_from_previous": travel_info,
+                "travel_options": travel_options,  # 모든 교통수단 선택지
+                "alternatives": alternatives[i]
+            }
+            day_plan["schedule"].append(schedule_item)
+        day_plan["summary"] = {
+            "total_distance_km": round(total_dist, 2),
+            "total_travel_time_minutes": total_time
+        }
+        return day_plan
+
+    @staticmethod
+    def _place_key(place: Dict) -> tuple:
+        """장소 식별 키 (id가 있으면 id, 없으면 이름 + 좌표)"""
+        if place.get('id') is not None:
+            return ('id', place['id'])
+        return ('pos', place.get('name'), place.get('latitude'), place.get('longitude'))
+
+    async def _slot_alternatives(
+        self,
+        routes: List[List[dict]],
+        alternative_index: SpatialIndex
+    ) -> List[List[List[Dict]]]:
+        """
+        일정 항목별 예비 장소 (같은 타입, 현재 장소에서 가까운 순 최대 ALTERNATIVES_PER_SLOT개)
+
+        이전 장소 → 예비 장소 이동 정보는 모든 일자를 모아 한 번에 (일자 × 교통수단 배치 동시 실행) 계산하고,
+        예비 장소는 항목마다 사본을 만들어 다른 항목의 이동 정보로 덮어써지지 않게 함
+
+        Args:
+            routes: 일자별 방문 순서
+
+        Returns:
+            일자별 → 항목별 예비 장소 리스트 (각 예비 장소에 travel_from_previous 포함)
+        """
+        candidates = [
+            [self._nearest_alternatives(place, alternative_index) for place in route]
+            for route in routes
+        ]
+
+        # 이전 장소 → 예비 장소 구간 (첫 항목은 이동 정보 없음)
+        alt_legs = [
+            ((d, i, k), route[i-1], alt)
+            for d, (route, day_candidates) in enumerate(zip(routes, candidates))
+            for i, alts in enumerate(day_candidates) if i > 0
+            for k, alt in enumerate(alts)
+        ]
+        travel = await self._alternative_travel(alt_legs)
+
+        return [
+            [
+                [{**alt, 'travel_from_previous': travel.get((d, i, k))} for k, alt in enumerate(alts)]
+                for i, alts in enumerate(day_candidates)
+            ]
+            for d, day_candidates in enumerate(candidates)
+        ]
+
+    @staticmethod
+    def _nearest_alternatives(
+        place: Dict,
+        alternative_index: SpatialIndex,
+        where: Optional[Callable[[Dict], bool]] = None
+    ) -> List[Dict]:
+        """장소와 같은 타입의 가까운 예비 장소 (좌표가 없으면 입력 순서대로)"""
+        if place.get('latitude') is not None and place.get('longitude') is not None:
+            return [
+                alt for alt, _ in alternative_index.nearest(
+                    place['latitude'], place['longitude'],
+                    k=ALTERNATIVES_PER_SLOT, types=[place['type']], where=where
+                )
+            ]
+        alts = alternative_index.first_of_type(place['type'], len(alternative_index))
+        return [alt for alt in alts if where is None or where(alt)][:ALTERNATIVES_PER_SLOT]
+
+    async def _alternative_travel(self, alt_legs: List[tuple]) -> Dict[Any, Dict]:
+        """
+        이전 장소 → 예비 장소 이동 정보 (한 번에 계산)
+
+        Args:
+            alt_legs: [(슬롯 키, 이전 장소, 예비 장소)] - 슬롯 키의 첫 요소는 일자 (일자별 블록 유지)
+
+        Returns:
+            {슬롯 키: travel_from_previous}
+        """
+        travel: Dict[Any, Dict] = {}
+        if alt_legs:
+            # 직선 거리로 교통수단 선택 (1.5km 미만 도보) - 모든 구간을 한 번에 계산
+            straight = haversine_pairwise(
+                to_coord_array([prev for _, prev, _ in alt_legs]),
+                to_coord_array([alt for _, _, alt in alt_legs])
+            )
+            # 일자 × 교통수단별 배치를 한꺼번에 동시 실행 (일자별 블록 유지)
+            groups: Dict[tuple, List[tuple]] = {}
+            for leg, dist in zip(alt_legs, straight):
+                groups.setdefault((leg[0][0], "walk" if dist < 1.5 else "public"), []).append(leg)
+
+            batch_results = await asyncio.gather(*[
+                self.optimizer.calculate_distances_batch_async(
+                    [(prev, alt) for _, prev, alt in group], mode=mode
+                )
+                for (_, mode), group in groups.items()
+            ])
+            for ((_, mode), group), results in zip(groups.items(), batch_results):
+                for (slot, _, _), result in zip(group, results):
+                    travel[slot] = {
+                        "distance_km": result["distance_km"],
+                        "time_minutes": result["time_minutes"],
                         "mode": mode,
-                        "description": f"이동 {travel_time}분 ({dist}km)",
-                        "method": travel_result.get("method", "unknown")
+                        "description": f"이동 {result['time_minutes']}분 ({result['distance_km']}km)",
+                        "method": result.get("method", "unknown")
                     }
-                    
-                    # 모든 교통수단 선택지 제공
-                    if i > 0:
-                        prev_place = optimized_places[i-1]
-                        lat1 = prev_place.get('latitude', 0)
-                        lon1 = prev_place.get('longitude', 0)
-                        lat2 = place.get('latitude', 0)
-                        lon2 = place.get('longitude', 0)
-                        
-                        travel_options = {}
-                        
-                        # 각 교통수단별 거리/시간 계산 (걷기, 차량, 대중교통)
-                        for transport_mode in ["walk", "public"]:  # walk와 public만 제공
-                            transport_result = self.optimizer.calculate_distance(
-                                lat1, lon1, lat2, lon2,
-                                mode=transport_mode
-                            )
-                            
-                            travel_options[transport_mode] = {
-                                "distance_km": transport_result["distance_km"],
-                                "time_minutes": transport_result["time_minutes"],
-                                "mode": transport_mode,
-                                "description": f"{transport_mode} - {transport_result['time_minutes']}분 ({transport_result['distance_km']}km)",
-                                "method": transport_result.get("method", "unknown")
-                            }
-                        
-                        # 기본값은 walk로 설정 (travel_info에 walk 사용)
-                        travel_info = travel_options.get("walk", travel_info)
-
-                # 체류 시간 (기본 90분)
-                duration_min = 90
-                start_time_str = f"{current_time_min // 60:02d}:{current_time_min % 60:02d}"
-                current_time_min += duration_min
-                end_time_str = f"{current_time_min // 60:02d}:{current_time_min % 60:02d}"
-
-                # 시간대 구분
-
-                hour = int(start_time_str.split(':')[0])
-                if hour < 12: 
-                    slot = "morning"
-                elif hour < 14:
-                    slot = "lunch"
-                elif hour < 17:
-                    slot = "afternoon"
-                elif hour < 19:
-                    slot = "dinner"
+        return travel
+
+    async def _reuse_alternatives(
+        self,
+        routes: List[List[dict]],
+        itinerary: List[Dict],
+        alternative_places: List[dict] = []
+    ) -> tuple:
+        """
+        기존 일정의 예비 장소를 새 경로에 맞춰 재사용
+
+        예비 장소의 travel_from_previous는 이전 장소에서 잰 값이므로
+        - 장소와 이전 장소가 모두 그대로인 항목: 기존 예비 장소를 그대로 사용
+        - 장소는 그대로인데 이전 장소가 바뀐 항목: 같은 예비 장소로 이동 정보만 다시 계산
+        - 새 장소(교체된 장소, 새 숙소): alternative_places + 기존 예비 장소 중 가까운 같은 타입 장소
+        다시 계산할 구간은 모아서 한 번에 계산 (_slot_alternatives와 같은 배치)
+
+        Args:
+            routes: 일자별 새 방문 순서
+            itinerary: routes와 같은 일자의 기존 일정
+            alternative_places: 새 장소의 예비 장소 후보 (기존 예비 장소에 추가)
+
+        Returns:
+            (일자별 → 항목별 예비 장소, 일자별 예비 장소를 다시 계산한 항목 수)
+        """
+        def strip(alt: Dict) -> Dict:
+            return {k: v for k, v in alt.items() if k != 'travel_from_previous'}
+
+        # 기존 항목: (이전 장소 키, 장소 키) → 예비 장소, 장소 키 → 예비 장소(이동 정보 제외)
+        by_slot: Dict[tuple, List[Dict]] = {}
+        by_place: Dict[tuple, List[Dict]] = {}
+        pool: Dict[tuple, Dict] = {self._place_key(p): p for p in alternative_places}
+        for day_plan in itinerary:
+            prev_key = None
+            for item in day_plan.get("schedule", []):
+                key = self._place_key(item["place"])
+                alts = item.get("alternatives") or []
+                by_slot.setdefault((prev_key, key), alts)
+                by_place.setdefault(key, [strip(alt) for alt in alts])
+                for alt in alts:
+                    pool.setdefault(self._place_key(alt), strip(alt))
+                prev_key = key
+
+        route_keys = {self._place_key(p) for route in routes for p in route}
+        index: Optional[SpatialIndex] = None
+        candidates: List[List[Optional[List[Dict]]]] = []
+        for route in routes:
+            day_candidates = []
+            for i, place in enumerate(route):
+                key = self._place_key(place)
+                prev_key = self._place_key(route[i-1]) if i > 0 else None
+                if (prev_key, key) in by_slot:
+                    day_candidates.append(None)  # 그대로 사용
+                elif key in by_place:
+                    day_candidates.append(by_place[key])
                 else:
-                    slot = "night"
-
-                # 같은 타입의 예비 장소 찾기 (최대 5개)
-                alternatives = [
-                    alt for alt in alternative_places 
-                    if alt['type'] == place['type']
-                ][:5]
-                
-                # 각 예비 장소에 이전 장소에서의 거리/시간 정보 추가
-                for alt in alternatives:
-                    if i > 0:
-                        # 이전 장소에서 예비 장소까지의 거리 계산
-                        alt_lat1 = prev_place.get('latitude', 0)
-                        alt_lon1 = prev_place.get('longitude', 0)
-                        alt_lat2 = alt.get('latitude', 0)
-                        alt_lon2 = alt.get('longitude', 0)
-                        
-                        alt_straight_dist = self.optimizer.get_straight_distance(alt_lat1, alt_lon1, alt_lat2, alt_lon2)
-                        alt_mode = "walk" if alt_straight_dist < 1.5 else "public"
-                        
-                        # 예비 장소까지의 이동 정보
-                        alt_travel_result = self.optimizer.calculate_distance(
-                            alt_lat1, alt_lon1, alt_lat2, alt_lon2,
-                            mode=alt_mode
-                        )
-                        
-                        alt['travel_from_previous'] = {
-                            "distance_km": alt_travel_result["distance_km"],
-                            "time_minutes": alt_travel_result["time_minutes"],
-                            "mode": alt_mode,
-                            "description": f"이동 {alt_travel_result['time_minutes']}분 ({alt_travel_result['distance_km']}km)",
-                            "method": alt_travel_result.get("method", "unknown")
-                        }
-                    else:
-                        # 첫 번째 장소인 경우 이동 정보 없음
-                        alt['travel_from_previous'] = None
-
-                schedule_item = {
-                    "order": i + 1,
-                    "time_slot": slot,
-                    "start_time": start_time_str,
-                    "end_time": end_time_str,
-                    "place": place,
-                    "duration_minutes": duration_min,
-                    "travel_from_previous": travel_info,
-                    "travel_options": travel_options,  # 모든 교통수단 선택지
-                    "alternatives": alternatives
-                }
-                day_plan["schedule"].append(schedule_item)
-            day_plan["summary"] = {
-                "total_distance_km": round(total_dist, 2),
-                "total_travel_time_minutes": total_time
+                    if index is None:
+                        index = SpatialIndex(list(pool.values()))
+                    day_candidates.append(self._nearest_alternatives(
+                        place, index, where=lambda alt: self._place_key(alt) not in route_keys
+                    ))
+            candidates.append(day_candidates)
+
+        alt_legs = [
+            ((d, i, k), route[i-1], alt)
+            for d, (route, day_candidates) in enumerate(zip(routes, candidates))
+            for i, alts in enumerate(day_candidates) if i > 0 and alts
+            for k, alt in enumerate(alts)
+        ]
+        travel = await self._alternative_travel(alt_legs)
+
+        alternatives, recomputed = [], []
+        for d, (route, day_candidates) in enumerate(zip(routes, candidates)):
+            day_alternatives = []
+            for i, (place, alts) in enumerate(zip(route, day_candidates)):
+                if alts is None:
+                    prev_key = self._place_key(route[i-1]) if i > 0 else None
+                    day_alternatives.append([dict(alt) for alt in by_slot[(prev_key, self._place_key(place))]])
+                else:
+                    day_alternatives.append([
+                        {**alt, 'travel_from_previous': travel.get((d, i, k))} for k, alt in enumerate(alts)
+                    ])
+            alternatives.append(day_alternatives)
+            recomputed.append(sum(alts is not None for alts in day_candidates))
+        return alternatives, recomputed
+
+    @staticmethod
+    def _travel_option(mode: str, result: Dict) -> Dict:
+        """거리 계산 결과 → 일정 항목의 이동 정보"""
+        return {
+            "distance_km": result["distance_km"],
+            "time_minutes": result["time_minutes"],
+            "mode": mode,
+            "description": f"{mode} - {result['time_minutes']}분 ({result['distance_km']}km)",
+            "method": result.get("method", "unknown")
+        }
+
+    async def _compute_leg_table(
+        self,
+        routes: List[List[dict]],
+        known_legs: Optional[Dict[tuple, Dict[str, Dict]]] = None
+    ) -> tuple:
+        """
+        경로들의 구간 테이블 (구간별 모든 교통수단 이동 정보)
+
+        모든 구간을 모아 중복을 제거한 뒤 일자 × 교통수단별 배치를 동시에 계산
+        (public은 일자마다 Azure Maps Route Matrix 한 번으로 처리)
+
+        Args:
+            routes: 일자별 방문 순서
+            known_legs: 이미 계산된 구간 {(출발 키, 도착 키): {mode: 이동 정보}} (다시 계산하지 않음)
+
+        Returns:
+            (일자별 구간 테이블 [구간][mode] → 이동 정보, 일자별 새로 계산한 구간 수)
+        """
+        known_legs = known_legs or {}
+        tables = [[None] * max(len(route) - 1, 0) for route in routes]
+        computed = [0] * len(routes)
+
+        # 계산할 구간 → 이 구간이 쓰이는 (일자, 구간) 위치들
+        missing: Dict[tuple, List[tuple]] = {}
+        # 일자별 계산할 구간 (여러 날에 나오는 구간은 처음 나온 날에서만 계산)
+        day_pairs: List[List[tuple]] = [[] for _ in routes]
+        for day_idx, route in enumerate(routes):
+            for i, (a, b) in enumerate(zip(route[:-1], route[1:])):
+                key = (self._place_key(a), self._place_key(b))
+                if key in known_legs:
+                    tables[day_idx][i] = known_legs[key]
+                    continue
+                computed[day_idx] += 1
+                if key not in missing:
+                    missing[key] = []
+                    day_pairs[day_idx].append((key, a, b))
+                missing[key].append((day_idx, i))
+
+        # 일자 × 교통수단별 배치를 한꺼번에 동시 실행
+        # (일자를 한 행렬로 합치면 다른 날 장소끼리의 셀까지 요청하게 되므로 일자별 블록 유지)
+        batches = [(mode, pairs) for pairs in day_pairs if pairs for mode in TRAVEL_MODES]
+        batch_results = await asyncio.gather(*[
+            self.optimizer.calculate_distances_batch_async([(a, b) for _, a, b in pairs], mode=mode)
+            for mode, pairs in batches
+        ])
+        options: Dict[tuple, Dict[str, Dict]] = {}
+        for (mode, pairs), results in zip(batches, batch_results):
+            for (key, _, _), result in zip(pairs, results):
+                options.setdefault(key, {})[mode] = self._travel_option(mode, result)
+        for key, slots in missing.items():
+            for day_idx, i in slots:
+                tables[day_idx][i] = options[key]
+        return tables, computed
+
+    @classmethod
+    def _known_legs(cls, itinerary: List[Dict], exclude: Optional[Dict] = None) -> Dict[tuple, Dict[str, Dict]]:
+        """
+        기존 일정에서 재사용할 수 있는 구간 {(출발 키, 도착 키): travel_options}
+
+        exclude: 이 장소가 끼는 구간은 제외 (예: 바뀐 숙소)
+        """
+        exclude_key = cls._place_key(exclude) if exclude is not None else None
+        known: Dict[tuple, Dict[str, Dict]] = {}
+        for day_plan in itinerary:
+            schedule = day_plan.get("schedule", [])
+            for prev_item, item in zip(schedule[:-1], schedule[1:]):
+                options = item.get("travel_options") or {}
+                if not all(mode in options for mode in TRAVEL_MODES):
+                    continue
+                key = (cls._place_key(prev_item["place"]), cls._place_key(item["place"]))
+                if exclude_key is None or exclude_key not in key:
+                    known[key] = options
+        return known
+
+    @classmethod
+    def _same_place(cls, a: Dict, b: Dict) -> bool:
+        """같은 장소인지 비교"""
+        return cls._place_key(a) == cls._place_key(b)
+
+    @classmethod
+    def _split_day_route(cls, day_plan: Dict) -> tuple:
+        """
+        하루 일정을 (숙소, 방문 장소들, 숙소 복귀 여부)로 분리
+
+        숙소는 항상 맨 앞에 있고, 마지막 날이 아니면 맨 뒤에도 있음
+        """
+        route = [item["place"] for item in day_plan.get("schedule", [])]
+        start = route[0] if route and route[0].get('type') in HOTEL_TYPES else None
+        returns = start is not None and len(route) > 1 and cls._same_place(route[-1], start)
+        visits = route[1 if start else 0:len(route) - 1 if returns else len(route)]
+        return start, visits, returns
+
+    async def replace_place_in_day(
+        self,
+        day_plan: Dict,
+        old_place: Dict,
+        new_place: Dict,
+        alternative_places: List[dict] = []
+    ) -> Dict:
+        """
+        하루 일정에서 장소 하나만 교체하고 그 날만 다시 계산
+
+        다른 날의 배정/순서는 건드리지 않으며, 해당 날도 전체를 다시 정렬하지 않고
+        old_place를 뺀 뒤 new_place를 추가 거리가 가장 작은 위치에 삽입
+
+        Args:
+            day_plan: 기존 하루 일정 (schedule의 place 순서 = 방문 순서)
+            old_place: 제거할 장소
+            new_place: 새 장소
+            alternative_places: new_place 자리의 예비 장소 후보 (기존 예비 장소와 old_place에 추가)
+
+        Returns:
+            재계산된 하루 일정 (summary.replacement에 삽입 통계 포함)
+        """
+        # 숙소 출발/복귀 구간 분리
+        start, visits, returns = self._split_day_route(day_plan)
+
+        remaining = [p for p in visits if not self._same_place(p, old_place)]
+        if len(remaining) == len(visits):
+            raise ValueError(f"Day {day_plan.get('day')} 일정에 교체할 장소가 없습니다: {old_place.get('name')}")
+
+        optimized_places, stats = self.optimizer.insert_into_route(
+            remaining, new_place, start_location=start, return_to_start=returns
+        )
+        if returns:
+            optimized_places.append(start)
+
+        # 기존 일정과 같은 구간은 재사용하고 새로 생긴 구간만 계산
+        # 예비 장소도 이전 장소가 그대로인 항목은 재사용 (빠진 old_place는 새 장소의 예비 후보)
+        (tables, computed), (alternatives, recomputed) = await asyncio.gather(
+            self._compute_leg_table([optimized_places], known_legs=self._known_legs([day_plan])),
+            self._reuse_alternatives([optimized_places], [day_plan], list(alternative_places) + [old_place])
+        )
+        new_day_plan = await self._build_day_plan(
+            day_plan.get("day"), optimized_places, alternative_places,
+            legs=tables[0], alternatives=alternatives[0]
+        )
+        stats["computed_legs"] = computed[0]
+        stats["recomputed_alternative_slots"] = recomputed[0]
+        new_day_plan["summary"]["replacement"] = stats
+        return new_day_plan
+
+    async def swap_hotel(
+        self,
+        itinerary: List[Dict],
+        new_hotel: Dict,
+        reoptimize: bool = False
+    ) -> List[Dict]:
+        """
+        숙소만 바꾸고 일정 재계산 (일자별 장소 배정과 방문 순서는 유지)
+
+        - 숙소 출발/복귀 구간만 새로 계산 (모든 일자를 교통수단별로 한 번에 배치 계산)
+        - 장소 사이 구간은 기존 일정의 이동 정보를 그대로 사용
+        - 예비 장소는 이전 장소가 그대로인 항목만 재사용하고, 나머지는 이동 정보를 다시 계산
+        - reoptimize=True면 새 숙소 기준으로 일자별 2-opt / Or-opt를 병렬 실행
+          (순서가 바뀐 구간만 추가 계산)
+
+        Args:
+            itinerary: 기존 일정 (일자별 day_plan 리스트)
+            new_hotel: 새 숙소 (latitude, longitude 필수)
+            reoptimize: 새 숙소 기준 경로 개선 여부
+
+        Returns:
+            새 일정 (일자별 summary.hotel_swap에 재사용/계산한 구간 수 포함)
+        """
+        if not new_hotel.get('type'):
+            new_hotel = {**new_hotel, 'type': '숙박'}
+        duration_days = len(itinerary)
+
+        # 1. 일자별 방문 장소 (기존 순서) + 새 숙소로 경로 구성
+        day_visits, day_returns, old_hotels = [], [], []
+        for day_idx, day_plan in enumerate(itinerary):
+            start, visits, returns = self._split_day_route(day_plan)
+            day_visits.append(visits)
+            if start is not None:
+                old_hotels.append(start)
+            # 기존에 숙소가 없던 일정이면 마지막 날을 제외하고 숙소로 복귀
+            day_returns.append(returns if start is not None else day_idx + 1 < duration_days)
+
+        if reoptimize:
+            async def improve(visits: List[Dict], returns: bool) -> List[Dict]:
+                route, _ = await asyncio.to_thread(
+                    self.optimizer.improve_existing_route, visits, new_hotel, returns
+                )
+                return route[1:]
+
+            day_visits = list(await asyncio.gather(*[
+                improve(visits, returns) for visits, returns in zip(day_visits, day_returns)
+            ]))
+
+        routes = [
+            [new_hotel] + visits + ([new_hotel] if returns else [])
+            for visits, returns in zip(day_visits, day_returns)
+        ]
+
+        # 2. 기존 일정에서 재사용할 수 있는 구간 (새 숙소가 끼지 않은 구간)
+        known_legs = self._known_legs(itinerary, exclude=new_hotel)
+
+        # 3. 새로 계산할 구간 + 이전 장소가 바뀐 항목의 예비 장소 이동 정보를 한 번에 계산
+        (leg_tables, computed_legs), (day_alternatives, recomputed) = await asyncio.gather(
+            self._compute_leg_table(routes, known_legs=known_legs),
+            # 기존 숙소는 새 숙소 자리의 예비 후보
+            self._reuse_alternatives(routes, itinerary, old_hotels)
+        )
+
+        # 4. 시간표 재구성
+        new_itinerary = []
+        for day_idx, (day_plan, route) in enumerate(zip(itinerary, routes)):
+            new_day_plan = await self._build_day_plan(
+                day_plan.get("day", day_idx + 1), route, [],
+                legs=leg_tables[day_idx], alternatives=day_alternatives[day_idx]
+            )
+            computed = computed_legs[day_idx]
+            new_day_plan["summary"]["hotel_swap"] = {
+                "computed_legs": computed,
+                "reused_legs": len(route) - 1 - computed,
+                "recomputed_alternative_slots": recomputed[day_idx],
+                "reoptimized": reoptimize
             }
-            itinerary.append(day_plan)
-        
-        # 첫 날에만 클러스터링 정보 저장
-        if itinerary and clustering_debug_info:
-            itinerary[0]["clustering_debug_info"] = clustering_debug_info
-            
-        return itinerary
\ No newline at end of file
+            new_itinerary.append(new_day_plan)
+        return new_itinerary
+
+
+_itinerary_service: Optional[ItineraryService] = None
+
+
+def get_itinerary_service() -> ItineraryService:
+    """프로세스 전체에서 공유하는 ItineraryService (요청별 상태가 없으므로 동시 사용 가능)"""
+    global _itinerary_service
+    if _itinerary_service is None:
+        _itinerary_service = ItineraryService()
+    return _itinerary_service
@@ -0,0 +1,272 @@
+"""
+다일 일정 통합 경로 탐색 (VRP 방식 지역 탐색)
+
+클러스터링 후 일자별로 따로 경로를 만드는 대신, 모든 일자의 경로를 함께 개선
+- 숙소를 출발/복귀 지점(depot)으로 하는 일자별 경로 = 차량별 경로
+- 장소를 다른 날로 옮기거나(relocate) 두 날의 장소를 맞바꾸는(swap) 이동으로 총 거리 감소
+- 일자 내부 순서는 route_improver(2-opt / Or-opt)로 개선
+- 지역 최적해에 도달하면 무작위로 흔든 뒤 다시 탐색 (Iterated Local Search)
+- 시간 예산(ms)이 끝나면 그때까지의 최선 해 반환
+"""
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.route_improver import improve_route
+
+# 개선 없이 연속으로 흔들기만 한 횟수가 이 값을 넘으면 조기 종료
+MAX_STALL_ROUNDS = 30
+# 한 번 흔들 때 무작위로 옮기는 장소 수
+PERTURB_MOVES = 2
+
+
+class _Plan:
+    """
+    일자별 경로 집합
+
+    노드 0은 depot(숙소, 없으면 모든 거리가 0인 가상 지점), 1..n은 장소,
+    n+1은 "복귀하지 않는 날"의 가상 도착점(모든 거리 0)
+    """
+
+    def __init__(self, dist: np.ndarray, routes: List[List[int]], closed: Sequence[bool]):
+        n = dist.shape[0]
+        padded = np.zeros((n + 1, n + 1))
+        padded[:n, :n] = dist
+        self.d = padded.tolist()
+        self.end = n
+        self.routes = [list(r) for r in routes]
+        self.closed = list(closed)
+
+    def tail(self, day: int) -> int:
+        return 0 if self.closed[day] else self.end
+
+    def node_before(self, day: int, pos: int) -> int:
+        return self.routes[day][pos - 1] if pos > 0 else 0
+
+    def node_after(self, day: int, pos: int) -> int:
+        route = self.routes[day]
+        return route[pos + 1] if pos + 1 < len(route) else self.tail(day)
+
+    def route_cost(self, day: int) -> float:
+        seq = [0] + self.routes[day] + [self.tail(day)]
+        return sum(self.d[seq[k]][seq[k + 1]] for k in range(len(seq) - 1))
+
+    def total_cost(self) -> float:
+        return sum(self.route_cost(day) for day in range(len(self.routes)))
+
+    def removal_delta(self, day: int, pos: int) -> float:
+        x = self.routes[day][pos]
+        p, q = self.node_before(day, pos), self.node_after(day, pos)
+        return self.d[p][q] - self.d[p][x] - self.d[x][q]
+
+    def best_insertion(self, day: int, x: int, skip: Optional[int] = None) -> Tuple[float, int]:
+        """
+        x를 day 경로에 넣을 최적 위치 (증가 거리, 삽입 인덱스)
+
+        skip: 같은 경로 안에서 옮길 때 원래 위치 (제거된 상태로 간주)
+        """
+        route = self.routes[day] if skip is None else self.routes[day][:skip] + self.routes[day][skip + 1:]
+        seq = [0] + route + [self.tail(day)]
+        best, best_at = float("inf"), 0
+        for k in range(len(seq) - 1):
+            u, v = seq[k], seq[k + 1]
+            delta = self.d[u][x] + self.d[x][v] - self.d[u][v]
+            if delta < best:
+                best, best_at = delta, k
+        return best, best_at
+
+    def swap_delta(self, a: int, i: int, b: int, j: int) -> float:
+        x, y = self.routes[a][i], self.routes[b][j]
+        pa, qa = self.node_before(a, i), self.node_after(a, i)
+        pb, qb = self.node_before(b, j), self.node_after(b, j)
+        return (self.d[pa][y] + self.d[y][qa] - self.d[pa][x] - self.d[x][qa] +
+                self.d[pb][x] + self.d[x][qb] - self.d[pb][y] - self.d[y][qb])
+
+
+def _local_search(plan: _Plan, max_per_day: int, min_per_day: int, deadline: float, stats: Dict) -> bool:
+    """
+    relocate / swap으로 더 이상 개선되지 않을 때까지 반복 (first improvement)
+
+    Returns:
+        시간 예산 안에 지역 최적해에 도달했는지 여부
+    """
+    days = len(plan.routes)
+    improved = True
+    while improved:
+        improved = False
+        for a in range(days):
+            pos = 0
+            while pos < len(plan.routes[a]):
+                if time.perf_counter() > deadline:
+                    return False
+                x = plan.routes[a][pos]
+                gain = plan.removal_delta(a, pos)
+
+                # 1. relocate: 다른 날(또는 같은 날 다른 위치)로 옮기기
+                best = (-1e-9, None, None)
+                for b in range(days):
+                    if b != a and (len(plan.routes[b]) >= max_per_day or len(plan.routes[a]) <= min_per_day):
+                        continue
+                    add, at = plan.best_insertion(b, x, skip=pos if b == a else None)
+                    if add + gain < best[0]:
+                        best = (add + gain, b, at)
+                if best[1] is not None:
+                    _, b, at = best
+                    del plan.routes[a][pos]
+                    plan.routes[b].insert(at, x)
+                    stats["relocate_moves"] += 1
+                    improved = True
+                    continue
+
+                # 2. swap: 다른 날의 장소와 맞바꾸기 (일자별 장소 수 유지)
+                swapped = False
+                for b in range(a + 1, days):
+                    for j in range(len(plan.routes[b])):
+                        if plan.swap_delta(a, pos, b, j) < -1e-9:
+                            plan.routes[a][pos], plan.routes[b][j] = plan.routes[b][j], plan.routes[a][pos]
+                            stats["swap_moves"] += 1
+                            swapped = improved = True
+                            break
+                    if swapped:
+                        break
+                pos += 1
+    return True
+
+
+def _improve_days(plan: _Plan, dist: np.ndarray, deadline: float):
+    """일자 내부 순서를 2-opt / Or-opt로 개선 (depot 고정)"""
+    for day, route in enumerate(plan.routes):
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        if len(route) < 3 or remaining_ms <= 0:
+            continue
+        nodes = [0] + route
+        sub = dist[np.ix_(nodes, nodes)]
+        order, _ = improve_route(sub, list(range(len(nodes))), time_budget_ms=remaining_ms,
+                                 closed=plan.closed[day])
+        plan.routes[day] = [nodes[k] for k in order[1:]]
+
+
+def _balance(plan: _Plan, max_per_day: int, min_per_day: int):
+    """일자별 장소 수 상한/하한 맞추기 (삽입 비용이 가장 작은 곳으로 이동)"""
+    days = len(plan.routes)
+    for a in range(days):
+        while len(plan.routes[a]) > max_per_day:
+            best = None
+            for pos, x in enumerate(plan.routes[a]):
+                for b in range(days):
+                    if b == a or len(plan.routes[b]) >= max_per_day:
+                        continue
+                    add, at = plan.best_insertion(b, x)
+                    cost = add + plan.removal_delta(a, pos)
+                    if best is None or cost < best[0]:
+                        best = (cost, pos, b, at)
+            if best is None:
+                break
+            _, pos, b, at = best
+            plan.routes[b].insert(at, plan.routes[a].pop(pos))
+
+    for a in range(days):
+        while len(plan.routes[a]) < min_per_day:
+            best = None
+            for b in range(days):
+                if b == a or len(plan.routes[b]) <= min_per_day:
+                    continue
+                for pos, x in enumerate(plan.routes[b]):
+                    add, at = plan.best_insertion(a, x)
+                    cost = add + plan.removal_delta(b, pos)
+                    if best is None or cost < best[0]:
+                        best = (cost, b, pos, at)
+            if best is None:
+                break
+            _, b, pos, at = best
+            plan.routes[a].insert(at, plan.routes[b].pop(pos))
+
+
+def solve_multi_day(
+    dist_matrix: np.ndarray,
+    initial_routes: List[List[int]],
+    closed: Sequence[bool],
+    max_per_day: int,
+    min_per_day: int = 1,
+    time_budget_ms: float = 300,
+    seed: Optional[int] = 0
+) -> Tuple[List[List[int]], Dict[str, Any]]:
+    """
+    모든 일자의 경로를 함께 개선
+
+    Args:
+        dist_matrix: (n+1, n+1) 거리 행렬 (0번: depot, 1..n: 장소)
+        initial_routes: 일자별 초기 방문 순서 (장소 노드 번호, depot 제외)
+        closed: 일자별 depot 복귀 여부
+        max_per_day / min_per_day: 일자별 장소 수 상한/하한
+        time_budget_ms: 최대 탐색 시간 (ms)
+        seed: 흔들기(perturbation) 난수 시드
+
+    Returns:
+        (일자별 방문 순서, 통계)
+        통계: initial_cost, final_cost, improvement_pct, relocate_moves, swap_moves,
+              perturbations, accepted, elapsed_ms, timed_out
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+    dist = np.asarray(dist_matrix, dtype=np.float64)
+    rng = random.Random(seed)
+
+    plan = _Plan(dist, initial_routes, closed)
+    stats = {
+        "initial_cost": round(plan.total_cost(), 4),
+        "final_cost": 0.0,
+        "improvement_pct": 0.0,
+        "max_per_day": max_per_day,
+        "relocate_moves": 0,
+        "swap_moves": 0,
+        "perturbations": 0,
+        "accepted": 0,
+        "elapsed_ms": 0.0,
+        "timed_out": False
+    }
+
+    _balance(plan, max_per_day, min_per_day)
+    converged = _local_search(plan, max_per_day, min_per_day, deadline, stats)
+    _improve_days(plan, dist, deadline)
+    best_routes, best_cost = [list(r) for r in plan.routes], plan.total_cost()
+
+    # Iterated Local Search: 최선 해를 흔든 뒤 다시 탐색, 더 좋아지면 채택
+    stall = 0
+    days = len(plan.routes)
+    while converged and days > 1 and stall < MAX_STALL_ROUNDS and time.perf_counter() < deadline:
+        plan.routes = [list(r) for r in best_routes]
+        for _ in range(PERTURB_MOVES):
+            donors = [a for a in range(days) if len(plan.routes[a]) > min_per_day]
+            if not donors:
+                break
+            a = rng.choice(donors)
+            receivers = [b for b in range(days) if b != a and len(plan.routes[b]) < max_per_day]
+            if not receivers:
+                break
+            b = rng.choice(receivers)
+            x = plan.routes[a].pop(rng.randrange(len(plan.routes[a])))
+            _, at = plan.best_insertion(b, x)
+            plan.routes[b].insert(at, x)
+        stats["perturbations"] += 1
+
+        converged = _local_search(plan, max_per_day, min_per_day, deadline, stats)
+        _improve_days(plan, dist, deadline)
+        cost = plan.total_cost()
+        if cost < best_cost - 1e-9:
+            best_routes, best_cost = [list(r) for r in plan.routes], cost
+            stats["accepted"] += 1
+            stall = 0
+        else:
+            stall += 1
+
+    stats["timed_out"] = time.perf_counter() >= deadline
+    stats["final_cost"] = round(best_cost, 4)
+    if stats["initial_cost"] > 0:
+        stats["improvement_pct"] = round(
+            (stats["initial_cost"] - best_cost) / stats["initial_cost"] * 100, 2
+        )
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return best_routes, stats
@@ -0,0 +1,194 @@
+"""
+여행 일정 응답 인코딩 (정규화 + 장소 필드 선택)
+
+기본(full) 응답은 일정 항목마다 장소 dict 전체(details, description, 타임스탬프 등)를 넣고
+예비 장소도 같은 내용을 반복하므로, 담긴 데이터보다 응답이 몇 배 큼
+- normalized: 장소는 id를 키로 하는 places 테이블에 한 번만 담고
+  일정 항목/예비 장소는 place_id로 참조
+- fields: 장소에 남길 필드 (클라이언트가 렌더링하는 필드만 요청)
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+RESPONSE_FORMATS = ("full", "normalized")
+
+# normalized 응답에서 fields를 지정하지 않았을 때 남기는 장소 필드
+DEFAULT_PLACE_FIELDS = (
+    "id", "name", "type", "sub_type", "latitude", "longitude",
+    "address", "image_url", "category", "price_level", "score"
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    fields 쿼리 파라미터 파싱 ("name,latitude,longitude" → 리스트)
+
+    None/빈 문자열이면 None (형식별 기본값), "*"이면 ["*"] (모든 필드)
+    """
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()] or None
+
+
+def place_ref(place: Dict) -> str:
+    """places 테이블 키 (id가 없으면 이름 + 좌표)"""
+    if place.get("id") is not None:
+        return str(place["id"])
+    return f"pos:{place.get('name')}:{place.get('latitude')}:{place.get('longitude')}"
+
+
+def _project(place: Dict, fields: Optional[Iterable[str]]) -> Dict:
+    """장소에서 fields만 남김 (None 또는 "*"이면 전체)"""
+    if fields is None or "*" in fields:
+        return dict(place)
+    projected = {f: place[f] for f in fields if f in place}
+    if "id" in place:
+        projected["id"] = place["id"]
+    return projected
+
+
+def _normalize_days(
+    days: List[Dict],
+    fields: Optional[Iterable[str]]
+) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """일자별 일정 → (places 테이블, place_id로 참조하는 일정)"""
+    places: Dict[str, Dict] = {}
+
+    def ref(place: Dict) -> str:
+        key = place_ref(place)
+        if key not in places:
+            places[key] = _project(
+                {k: v for k, v in place.items() if k != "travel_from_previous"}, fields
+            )
+        return key
+
+    normalized = []
+    for day_plan in days:
+        schedule = []
+        for item in day_plan.get("schedule", []):
+            slim = {k: v for k, v in item.items() if k not in ("place", "alternatives")}
+            slim["place_id"] = ref(item["place"])
+            slim["alternatives"] = [
+                {"place_id": ref(alt), "travel_from_previous": alt.get("travel_from_previous")}
+                for alt in item.get("alternatives") or []
+            ]
+            schedule.append(slim)
+        normalized.append({**day_plan, "schedule": schedule})
+    return places, normalized
+
+
+def _project_days(days: List[Dict], fields: Iterable[str]) -> List[Dict]:
+    """full 형식을 유지한 채 일정 항목/예비 장소의 장소 필드만 줄임"""
+    projected = []
+    for day_plan in days:
+        schedule = []
+        for item in day_plan.get("schedule", []):
+            alternatives = []
+            for alt in item.get("alternatives") or []:
+                slim_alt = _project(alt, fields)
+                slim_alt["travel_from_previous"] = alt.get("travel_from_previous")
+                alternatives.append(slim_alt)
+            schedule.append({**item, "place": _project(item["place"], fields), "alternatives": alternatives})
+        projected.append({**day_plan, "schedule": schedule})
+    return projected
+
+
+def encode_plan(
+    data: Dict[str, Any],
+    response_format: str = "full",
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    일정 응답(itinerary 포함 dict)을 요청한 형식으로 변환 (원본은 수정하지 않음)
+
+    Args:
+        response_format: "full" (장소 dict 포함) 또는 "normalized" (places 테이블 + place_id)
+        fields: 장소 필드 (None이면 full은 전체, normalized는 DEFAULT_PLACE_FIELDS)
+
+    Returns:
+        normalized면 {"format": "normalized", "places": {...}, "itinerary": [...], ...}
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"지원하지 않는 응답 형식입니다: {response_format} (full, normalized)")
+
+    data = expand_plan(data)
+    itinerary = data.get("itinerary")
+    if not isinstance(itinerary, list):
+        return data
+
+    if response_format == "full":
+        if fields is None:
+            return data
+        return {**data, "itinerary": _project_days(itinerary, fields)}
+
+    places, days = _normalize_days(itinerary, fields or DEFAULT_PLACE_FIELDS)
+    return {**data, "format": "normalized", "places": places, "itinerary": days}
+
+
+def encode_day(
+    day_plan: Dict[str, Any],
+    response_format: str = "full",
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    하루 일정 변환 (스트리밍용)
+
+    Returns:
+        {"data": 하루 일정} (normalized면 그 날의 "places" 테이블 포함)
+    """
+    encoded = encode_plan({"itinerary": [day_plan]}, response_format, fields)
+    result = {"data": encoded["itinerary"][0]}
+    if "places" in encoded:
+        result["places"] = encoded["places"]
+    return result
+
+
+def expand_plan(data: Dict[str, Any]) -> Dict[str, Any]:
+    """normalized 일정을 full 형식으로 복원 (full이면 그대로 반환)"""
+    if not isinstance(data, dict) or data.get("format") != "normalized":
+        return data
+
+    places = data.get("places", {})
+    itinerary = []
+    for day_plan in data.get("itinerary", []):
+        schedule = []
+        for item in day_plan.get("schedule", []):
+            full_item = {k: v for k, v in item.items() if k not in ("place_id", "alternatives")}
+            full_item["place"] = dict(places.get(item.get("place_id"), {}))
+            full_item["alternatives"] = [
+                {**places.get(alt.get("place_id"), {}), "travel_from_previous": alt.get("travel_from_previous")}
+                for alt in item.get("alternatives") or []
+            ]
+            schedule.append(full_item)
+        itinerary.append({**day_plan, "schedule": schedule})
+
+    expanded = {k: v for k, v in data.items() if k not in ("format", "places")}
+    expanded["itinerary"] = itinerary
+    return expanded
+
+
+def expand_itinerary(itinerary: List[Dict], places: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    요청으로 돌려받은 일정을 full 형식으로 복원 (호텔 변경 / 장소 교체 요청용)
+
+    normalized 응답의 itinerary를 그대로 보낸 경우 places 테이블로 장소를 채움 (full이면 그대로 반환)
+
+    Raises:
+        ValueError: place_id로 참조하는 장소가 places 테이블에 없을 때
+    """
+    refs = []
+    for day_plan in itinerary:
+        for item in day_plan.get("schedule", []):
+            if "place" in item or "place_id" not in item:
+                continue
+            refs.append(item["place_id"])
+            refs.extend(alt.get("place_id") for alt in item.get("alternatives") or [])
+    if not refs:
+        return itinerary
+
+    places = places or {}
+    missing = sorted({str(ref) for ref in refs if ref not in places})
+    if missing:
+        raise ValueError(
+            f"normalized 일정의 place_id에 해당하는 장소가 places에 없습니다: {', '.join(missing[:5])}"
+        )
+    return expand_plan({"format": "normalized", "places": places, "itinerary": itinerary})["itinerary"]
@@ -0,0 +1,296 @@
+"""
+여행지별 POI 거리 행렬 (오프라인 사전 계산 + 메모리 매핑)
+
+여행지의 POI 목록은 자주 바뀌지 않으므로, 모든 POI 쌍의 교통수단별 거리/시간을
+미리 계산해 .npy 파일로 저장하고 np.load(mmap_mode="r")로 읽음
+- 요청마다 거리를 다시 계산하지 않음
+- 여러 워커 프로세스가 OS 페이지 캐시에 올라간 같은 파일을 공유 (프로세스별 복사 없음)
+
+디렉토리 구조 (여행지는 services.destinations로 정규화한 지역명, 예: 제주도 → 제주):
+    {POI_MATRIX_DIR}/{여행지}/CURRENT            # 현재 빌드 이름 (원자적으로 교체)
+    {POI_MATRIX_DIR}/{여행지}/{빌드}/ids.npy       # POI id (문자열)
+    {POI_MATRIX_DIR}/{여행지}/{빌드}/{mode}_km.npy  # (n, n) float32, 계산 불가 셀은 NaN
+    {POI_MATRIX_DIR}/{여행지}/{빌드}/{mode}_min.npy # (n, n) int32, 계산 불가 셀은 -1
+    {POI_MATRIX_DIR}/{여행지}/{빌드}/meta.json
+
+빌드: python build_poi_matrices.py --destination 서울
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.destinations import normalize_destination
+
+DEFAULT_MATRIX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "poi_matrices")
+MATRIX_MODES = ("walk", "public", "car")
+# 이전 빌드를 바로 지우면 아직 매핑 중인 프로세스가 있을 수 있으므로 몇 개 남겨둠
+KEEP_BUILDS = 2
+# 빌드 시 한 번에 계산하는 출발지 수 (출발지 블록 × 전체 POI, n² 결과를 한꺼번에 만들지 않음)
+BUILD_BLOCK_ROWS = int(os.getenv("POI_MATRIX_BLOCK_ROWS", "100"))
+
+
+class PoiDistanceMatrix:
+    """한 여행지의 사전 계산 거리 행렬 (읽기 전용, 메모리 매핑)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        ids = np.load(os.path.join(path, "ids.npy"))
+        self.index: Dict[str, int] = {poi_id: i for i, poi_id in enumerate(ids.tolist())}
+        self.modes = tuple(self.meta.get("modes", []))
+
+        self._km: Dict[str, np.ndarray] = {}
+        self._minutes: Dict[str, np.ndarray] = {}
+        for mode in self.modes:
+            self._km[mode] = np.load(os.path.join(path, f"{mode}_km.npy"), mmap_mode="r")
+            self._minutes[mode] = np.load(os.path.join(path, f"{mode}_min.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def indices(self, poi_ids: Sequence) -> np.ndarray:
+        """POI id 리스트 → 행렬 인덱스 배열 (없으면 -1)"""
+        return np.array(
+            [self.index.get(str(poi_id), -1) if poi_id is not None else -1 for poi_id in poi_ids],
+            dtype=np.int64
+        )
+
+    def block(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        mode: str
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        rows × cols 부분 행렬 (거리 km, 시간 분)
+
+        인덱스가 -1인 행/열은 NaN / -1로 채움
+        필요한 셀만 페이지에서 읽으므로 전체 행렬을 메모리에 올리지 않음
+        """
+        if mode not in self._km:
+            return None
+
+        km = np.full((len(rows), len(cols)), np.nan, dtype=np.float32)
+        minutes = np.full((len(rows), len(cols)), -1, dtype=np.int32)
+        row_ok = np.flatnonzero(rows >= 0)
+        col_ok = np.flatnonzero(cols >= 0)
+        if len(row_ok) and len(col_ok):
+            sel = np.ix_(rows[row_ok], cols[col_ok])
+            dst = np.ix_(row_ok, col_ok)
+            km[dst] = self._km[mode][sel]
+            minutes[dst] = self._minutes[mode][sel]
+        return km, minutes
+
+    def lookup(self, id1, id2, mode: str) -> Optional[Dict[str, float]]:
+        """POI 두 개 사이의 사전 계산 결과 (없으면 None)"""
+        i, j = self.index.get(str(id1)), self.index.get(str(id2))
+        if i is None or j is None or mode not in self._km:
+            return None
+        minutes = int(self._minutes[mode][i, j])
+        if minutes < 0:
+            return None
+        return {
+            "distance_km": round(float(self._km[mode][i, j]), 2),
+            "time_minutes": minutes,
+            "method": "precomputed"
+        }
+
+
+class PoiMatrixStore:
+    """
+    여행지별 PoiDistanceMatrix 로더
+
+    CURRENT 파일이 바뀌면(재빌드) 다음 조회 때 새 빌드를 다시 매핑
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        # {여행지: (CURRENT 내용, 행렬 또는 None)}
+        self._loaded: Dict[str, Tuple[Optional[str], Optional[PoiDistanceMatrix]]] = {}
+
+    def get(self, destination: str) -> Optional[PoiDistanceMatrix]:
+        """여행지의 거리 행렬 (빌드된 적이 없으면 None)"""
+        if not destination:
+            return None
+        destination = normalize_destination(destination)
+
+        current = self._read_current(destination)
+        loaded = self._loaded.get(destination)
+        if loaded is not None and loaded[0] == current:
+            return loaded[1]
+
+        with self._lock:
+            loaded = self._loaded.get(destination)
+            if loaded is not None and loaded[0] == current:
+                return loaded[1]
+
+            matrix = None
+            if current is not None:
+                try:
+                    matrix = PoiDistanceMatrix(os.path.join(self.root, destination, current))
+                    print(f"✅ POI 거리 행렬 로드: {destination} ({len(matrix)}개, 빌드 {current})")
+                except (OSError, ValueError) as e:
+                    print(f"⚠️  POI 거리 행렬 로드 실패 ({destination}): {e}")
+            self._loaded[destination] = (current, matrix)
+            return matrix
+
+    def _read_current(self, destination: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, destination, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+def build_poi_distance_matrix(
+    destination: str,
+    places: List[Dict],
+    optimizer,
+    root: Optional[str] = None,
+    modes: Sequence[str] = MATRIX_MODES,
+    block_rows: int = BUILD_BLOCK_ROWS
+) -> str:
+    """
+    여행지의 모든 POI 쌍 거리/시간을 계산해 새 빌드로 저장하고 CURRENT 교체
+
+    출발지 block_rows개씩 나눠 미리 할당한 배열에 바로 채움 (POI 수천 개여도 메모리는 블록 크기만큼)
+    - Haversine 셀(도보, 1.5km 미만, Azure Maps 비활성화): NumPy로 한 번에 계산
+    - Azure Maps 셀: 블록마다 optimizer.calculate_distance_matrix (Route Matrix)
+
+    Args:
+        destination: 여행지 (정규화한 지역명을 디렉토리 이름으로 사용)
+        places: POI 리스트 (id, latitude, longitude 필수)
+        optimizer: RouteOptimizer (Azure Maps가 켜져 있으면 Route Matrix 결과가 저장됨)
+        modes: 계산할 교통수단
+        block_rows: 한 번에 계산하는 출발지 수 (기본: POI_MATRIX_BLOCK_ROWS)
+
+    Returns:
+        생성된 빌드 디렉토리 경로
+    """
+    root = root or DEFAULT_MATRIX_DIR
+    destination = normalize_destination(destination)
+    places = [p for p in places if p.get("id") is not None]
+    # id 순으로 정렬해 같은 POI 목록이면 같은 행렬이 나오도록
+    places.sort(key=lambda p: str(p["id"]))
+
+    now = time.time()
+    build = time.strftime("%Y%m%d%H%M%S", time.localtime(now)) + f"{int(now * 1e6) % 1000000:06d}-{os.getpid()}"
+    dest_dir = os.path.join(root, destination)
+    build_dir = os.path.join(dest_dir, build)
+    os.makedirs(build_dir, exist_ok=True)
+
+    from services.route_optimizer import to_coord_array
+
+    n = len(places)
+    coords = to_coord_array(places)
+    has_coords = np.array([p.get("latitude") is not None and p.get("longitude") is not None for p in places], dtype=bool)
+    np.save(os.path.join(build_dir, "ids.npy"), np.array([str(p["id"]) for p in places]))
+
+    methods: Dict[str, Dict[str, int]] = {}
+    for mode in modes:
+        km = np.full((n, n), np.nan, dtype=np.float32)
+        minutes = np.full((n, n), -1, dtype=np.int32)
+        counts: Dict[str, int] = {}
+        for start in range(0, n, max(1, block_rows)):
+            stop = min(start + max(1, block_rows), n)
+            _fill_block(places, coords, has_coords, start, stop, mode, optimizer, km, minutes, counts)
+        np.save(os.path.join(build_dir, f"{mode}_km.npy"), km)
+        np.save(os.path.join(build_dir, f"{mode}_min.npy"), minutes)
+        methods[mode] = counts
+
+    with open(os.path.join(build_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "destination": destination,
+            "count": n,
+            "modes": list(modes),
+            "methods": methods,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }, f, ensure_ascii=False, indent=2)
+
+    # CURRENT를 원자적으로 교체 (읽는 쪽은 항상 완성된 빌드만 봄)
+    tmp = os.path.join(dest_dir, f"CURRENT.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(build)
+    os.replace(tmp, os.path.join(dest_dir, "CURRENT"))
+
+    _remove_old_builds(dest_dir, keep=KEEP_BUILDS)
+    return build_dir
+
+
+def _fill_block(
+    places: List[Dict],
+    coords: np.ndarray,
+    has_coords: np.ndarray,
+    start: int,
+    stop: int,
+    mode: str,
+    optimizer,
+    km: np.ndarray,
+    minutes: np.ndarray,
+    counts: Dict[str, int]
+):
+    """출발지 places[start:stop] × 전체 POI 셀을 km/minutes 배열에 채움 (좌표 없는 셀은 NaN / -1 유지)"""
+    from services.route_optimizer import haversine_matrix
+
+    straight = haversine_matrix(coords[start:stop], coords)
+    valid = has_coords[start:stop, None] & has_coords[None, :]
+    counts["none"] = counts.get("none", 0) + int((~valid).sum())
+
+    azure = valid & optimizer.needs_azure_maps_mask(straight, mode)
+    haversine = valid & ~azure
+    block_km, block_minutes = optimizer.haversine_travel_matrix(straight, mode)
+    km[start:stop][haversine] = block_km[haversine]
+    minutes[start:stop][haversine] = block_minutes[haversine]
+    counts["haversine"] = counts.get("haversine", 0) + int(haversine.sum())
+    if not azure.any():
+        return
+
+    # Azure Maps가 필요한 셀이 있는 행/열만 Route Matrix로 요청
+    rows = np.flatnonzero(azure.any(axis=1))
+    cols = np.flatnonzero(azure.any(axis=0))
+    matrix = optimizer.calculate_distance_matrix(
+        [places[start + r] for r in rows], [places[c] for c in cols], mode
+    )
+    for a, r in enumerate(rows):
+        for b, c in enumerate(cols):
+            if not azure[r, c]:
+                continue
+            cell = matrix[a][b]
+            method = cell.get("method")
+            counts[method] = counts.get(method, 0) + 1
+            km[start + r, c] = cell["distance_km"]
+            minutes[start + r, c] = cell["time_minutes"]
+
+
+def _remove_old_builds(dest_dir: str, keep: int):
+    builds = sorted(
+        name for name in os.listdir(dest_dir)
+        if os.path.isdir(os.path.join(dest_dir, name))
+    )
+    for name in builds[:-keep]:
+        shutil.rmtree(os.path.join(dest_dir, name), ignore_errors=True)
+
+
+_poi_matrix_store: Optional[PoiMatrixStore] = None
+
+
+def get_poi_matrix_store() -> Optional[PoiMatrixStore]:
+    """
+    프로세스 전체에서 공유하는 PoiMatrixStore
+
+    POI_MATRIX_DIR(기본: 프로젝트 루트의 poi_matrices)이 없으면 None (사전 계산 미사용)
+    """
+    global _poi_matrix_store
+    if _poi_matrix_store is None:
+        root = os.getenv("POI_MATRIX_DIR", DEFAULT_MATRIX_DIR)
+        if not os.path.isdir(root):
+            return None
+        _poi_matrix_store = PoiMatrixStore(root)
+    return _poi_matrix_store
@@ -0,0 +1,171 @@
+"""
+경로 개선 엔진 - 2-opt / Or-opt 지역 탐색 (Anytime)
+
+Greedy Nearest Neighbor로 만든 초기 경로를 거리 행렬 위에서 개선
+시간 예산(ms)이 끝나면 그때까지의 최선 경로를 반환하므로 부하 상황에서도 지연 시간이 제한됨
+"""
+import time
+from typing import List, Dict, Tuple, Any
+
+import numpy as np
+
+OR_OPT_MAX_SEGMENT = 3  # Or-opt에서 옮길 최대 구간 길이
+
+
+def tour_cost(dist: List[List[float]], order: List[int], closed: bool = False) -> float:
+    """
+    경로 총 거리 계산
+
+    Args:
+        dist: 거리 행렬 (list of list)
+        order: 방문 순서 (행렬 인덱스)
+        closed: True면 마지막 장소 → 첫 장소 복귀 거리 포함
+    """
+    cost = sum(dist[order[k]][order[k + 1]] for k in range(len(order) - 1))
+    if closed and len(order) > 1:
+        cost += dist[order[-1]][order[0]]
+    return cost
+
+
+def improve_route(
+    dist_matrix: np.ndarray,
+    order: List[int],
+    time_budget_ms: float = 50,
+    closed: bool = False
+) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    2-opt / Or-opt로 경로 개선 (첫 장소는 고정)
+
+    Args:
+        dist_matrix: (n, n) 거리 행렬
+        order: 초기 방문 순서 (order[0]은 출발지로 고정)
+        time_budget_ms: 개선에 사용할 최대 시간 (ms)
+        closed: True면 마지막에 출발지로 복귀하는 경로로 간주
+
+    Returns:
+        (개선된 방문 순서, 통계)
+        통계: iterations, two_opt_moves, or_opt_moves, initial_cost, final_cost,
+              improvement_pct, elapsed_ms, timed_out
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+
+    n = len(order)
+    dist = np.asarray(dist_matrix, dtype=np.float64)
+    symmetric = bool(np.allclose(dist, dist.T))
+
+    # 열린 경로는 "거리 0인 가상 도착점"을 끝에 고정해 닫힌 경로처럼 다룸
+    # (모든 이동을 순환 경로 기준으로 통일하기 위함)
+    if closed:
+        d = dist.tolist()
+        tour = list(order)
+    else:
+        padded = np.zeros((dist.shape[0] + 1, dist.shape[1] + 1))
+        padded[:-1, :-1] = dist
+        d = padded.tolist()
+        tour = list(order) + [dist.shape[0]]
+    last_movable = n - 1  # 움직일 수 있는 위치: 1..n-1
+
+    m = len(tour)
+    initial_cost = tour_cost(d, tour, closed=True)
+    stats = {
+        "iterations": 0,
+        "two_opt_moves": 0,
+        "or_opt_moves": 0,
+        "initial_cost": round(initial_cost, 4),
+        "final_cost": round(initial_cost, 4),
+        "improvement_pct": 0.0,
+        "elapsed_ms": 0.0,
+        "timed_out": False
+    }
+
+    # 움직일 수 있는 장소가 2개 미만이면 개선 불필요
+    if last_movable < 2:
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return list(order), stats
+
+    def path_cost(i: int, j: int) -> float:
+        """tour[i..j] 내부 구간 거리 (정방향)"""
+        return sum(d[tour[k]][tour[k + 1]] for k in range(i, j))
+
+    def reversed_path_cost(i: int, j: int) -> float:
+        """tour[i..j] 내부 구간 거리 (역방향)"""
+        return sum(d[tour[k + 1]][tour[k]] for k in range(i, j))
+
+    improved = True
+    while improved:
+        improved = False
+        stats["iterations"] += 1
+
+        # 1. 2-opt: tour[i..j] 구간을 뒤집어 교차 제거
+        for i in range(1, last_movable):
+            if time.perf_counter() > deadline:
+                stats["timed_out"] = True
+                break
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, last_movable + 1):
+                c, e = tour[j], tour[(j + 1) % m]
+                delta = d[a][c] + d[b][e] - d[a][b] - d[c][e]
+                if not symmetric:
+                    delta += reversed_path_cost(i, j) - path_cost(i, j)
+                if delta < -1e-9:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    stats["two_opt_moves"] += 1
+                    improved = True
+                    b = tour[i]
+        if stats["timed_out"]:
+            break
+
+        # 2. Or-opt: 길이 1~3 구간을 다른 위치로 이동 (정/역방향)
+        for seg_len in range(1, OR_OPT_MAX_SEGMENT + 1):
+            i = 1
+            while i + seg_len - 1 <= last_movable:
+                if time.perf_counter() > deadline:
+                    stats["timed_out"] = True
+                    break
+                j = i + seg_len - 1
+                p, nx = tour[i - 1], tour[(j + 1) % m]
+                s0, s1 = tour[i], tour[j]
+                forward = path_cost(i, j)
+                backward = reversed_path_cost(i, j) if seg_len > 1 else 0.0
+                removal_gain = d[p][s0] + forward + d[s1][nx] - d[p][nx]
+
+                best_delta, best_k, best_reverse = -1e-9, None, False
+                # 삽입 위치: 간선 (tour[k], tour[k+1]) 사이, 고정된 끝 뒤에는 삽입 불가
+                for k in range(last_movable + 1):
+                    if i - 1 <= k <= j:
+                        continue
+                    u, v = tour[k], tour[(k + 1) % m]
+                    insert_fwd = d[u][s0] + forward + d[s1][v] - d[u][v]
+                    if insert_fwd - removal_gain < best_delta:
+                        best_delta, best_k, best_reverse = insert_fwd - removal_gain, k, False
+                    if seg_len > 1:
+                        insert_rev = d[u][s1] + backward + d[s0][v] - d[u][v]
+                        if insert_rev - removal_gain < best_delta:
+                            best_delta, best_k, best_reverse = insert_rev - removal_gain, k, True
+
+                if best_k is None:
+                    i += 1
+                    continue
+
+                segment = tour[i:j + 1]
+                if best_reverse:
+                    segment.reverse()
+                rest = tour[:i] + tour[j + 1:]
+                insert_at = best_k + 1 if best_k < i else best_k + 1 - seg_len
+                tour = rest[:insert_at] + segment + rest[insert_at:]
+                stats["or_opt_moves"] += 1
+                improved = True
+                i += 1
+            if stats["timed_out"]:
+                break
+        if stats["timed_out"]:
+            break
+
+    final_cost = tour_cost(d, tour, closed=True)
+    stats["final_cost"] = round(final_cost, 4)
+    if initial_cost > 0:
+        stats["improvement_pct"] = round((initial_cost - final_cost) / initial_cost * 100, 2)
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    return tour[:n], stats
@@ -1,22 +1,172 @@
 import math
-import requests
 import os
 import asyncio
-from typing import List, Dict, Optional
-from datetime import datetime
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+from services.azure_maps_client import (
+    AzureMapsClient,
+    get_azure_maps_client,
+    get_async_azure_maps_client
+)
+from services.distance_cache import DistanceCache, get_distance_cache
+from services.single_flight import get_single_flight, get_async_single_flight
+from services.poi_distance_matrix import PoiMatrixStore, get_poi_matrix_store
+from services.destinations import normalize_destination
+from services.clustering import EARTH_RADIUS_KM, kmeans, project_to_plane
+from services.route_improver import improve_route
+from services.multi_day_solver import solve_multi_day
+
+# 장소 dict({'latitude', 'longitude'}) 또는 (lat, lon) 튜플
+Point = Union[Dict, Sequence[float]]
+
+# 거리 캐시 키: (mode, (출발 격자 lat, lon), (도착 격자 lat, lon))
+CacheKey = Tuple[str, Tuple[int, int], Tuple[int, int]]
+
+# Haversine 계산 시 교통수단별 속도 (km/h)
+HAVERSINE_SPEED_KMH = {
+    "walk": 4.0,
+    "car": 30.0,
+    "public": 20.0
+}
+
+
+def to_coord_array(points: Sequence[Point]) -> np.ndarray:
+    """
+    장소 리스트를 (n, 2) 위경도 배열로 변환 (좌표가 없으면 0)
+    """
+    coords = np.zeros((len(points), 2), dtype=np.float64)
+    for i, p in enumerate(points):
+        if isinstance(p, dict):
+            lat, lon = p.get('latitude'), p.get('longitude')
+        else:
+            lat, lon = p[0], p[1]
+        coords[i, 0] = lat or 0.0
+        coords[i, 1] = lon or 0.0
+    return coords
+
+
+def haversine_matrix(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """
+    Haversine 거리 행렬 (km, 벡터화)
+
+    Args:
+        origins: (n, 2) 위경도 배열 (degree)
+        destinations: (m, 2) 위경도 배열 (degree)
+
+    Returns:
+        (n, m) 거리 행렬
+    """
+    o = np.radians(origins)
+    d = np.radians(destinations)
+    lat1 = o[:, 0][:, None]
+    lon1 = o[:, 1][:, None]
+    lat2 = d[:, 0][None, :]
+    lon2 = d[:, 1][None, :]
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0.0, None)))
+
+
+def haversine_pairwise(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """
+    같은 인덱스끼리의 Haversine 거리 (km, 벡터화)
+
+    Args:
+        origins, destinations: (n, 2) 위경도 배열 (degree)
+
+    Returns:
+        (n,) 거리 배열 (origins[i] → destinations[i])
+    """
+    o = np.radians(origins)
+    d = np.radians(destinations)
+    dlat = d[:, 0] - o[:, 0]
+    dlon = d[:, 1] - o[:, 1]
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(o[:, 0]) * np.cos(d[:, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0.0, None)))
+
 
 class RouteOptimizer:
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[DistanceCache] = None,
+        azure_client: Optional[AzureMapsClient] = None,
+        poi_matrices: Optional[PoiMatrixStore] = None
+    ):
         # Azure Maps 설정
         self.use_azure_maps = os.getenv("USE_AZURE_MAPS", "false").lower() == "true"
         self.azure_maps_key = os.getenv("AZURE_MAPS_SUBSCRIPTION_KEY")
+        # 커넥션 풀을 쓰는 HTTP 클라이언트 (기본값은 프로세스 전체 공유)
+        self.azure_client = azure_client if azure_client is not None else get_azure_maps_client()
+
+        # 거리 캐시 (LRU + TTL, 기본값은 프로세스 전체 공유 캐시)
+        self.cache = cache if cache is not None else get_distance_cache()
+        # 사전 계산된 여행지별 POI 거리 행렬 (없으면 None → 실시간 계산만 사용)
+        self.poi_matrices = poi_matrices if poi_matrices is not None else get_poi_matrix_store()
+
+        # 캐시 키 격자 크기 (degree, 기본 0.0001 ≈ 11m, 키우면 근처 좌표끼리 캐시 공유)
+        self._grid_scale = 1.0 / float(os.getenv("DISTANCE_CACHE_GRID_DEG", "0.0001"))
 
-        self.cache = {}
-        self.cache_max_size = 5000  # 캐시 크기 확대: 1000 → 5000
+        # 2-opt / Or-opt 경로 개선 시간 예산 (ms, 0이면 개선 생략)
+        self.route_improve_budget_ms = float(os.getenv("ROUTE_IMPROVE_BUDGET_MS", "50"))
+        # 다일 통합 경로 탐색 시간 예산 (ms)
+        self.joint_solver_budget_ms = float(os.getenv("JOINT_SOLVER_BUDGET_MS", "300"))
 
     def get_straight_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """직선 거리 계산 (km)"""
         return self._haversine_distance(lat1, lon1, lat2, lon2)
+
+    def distance_matrix(
+        self,
+        origins: Sequence[Point],
+        destinations: Sequence[Point]
+    ) -> np.ndarray:
+        """
+        출발지 × 도착지 직선 거리 행렬 (km)
+
+        장소 쌍마다 _haversine_distance를 호출하지 않고
+        NumPy로 한 번에 계산
+
+        Args:
+            origins: 출발지 리스트 (장소 dict 또는 (lat, lon))
+            destinations: 도착지 리스트 (장소 dict 또는 (lat, lon))
+
+        Returns:
+            (len(origins), len(destinations)) 거리 행렬
+        """
+        if not len(origins) or not len(destinations):
+            return np.zeros((len(origins), len(destinations)))
+        return haversine_matrix(to_coord_array(origins), to_coord_array(destinations))
+
+    def distances_from(self, origin: Point, destinations: Sequence[Point]) -> np.ndarray:
+        """
+        한 출발지에서 여러 도착지까지의 직선 거리 (km, one-to-many)
+
+        Returns:
+            (len(destinations),) 거리 배열
+        """
+        return self.distance_matrix([origin], destinations)[0]
+
+    def pairwise_distances(
+        self,
+        origins: Sequence[Point],
+        destinations: Sequence[Point]
+    ) -> np.ndarray:
+        """
+        origins[i] → destinations[i] 직선 거리 (km)
+
+        경로의 구간별 거리 계산에 사용
+        (예: pairwise_distances(route[:-1], route[1:]))
+
+        Returns:
+            (n,) 거리 배열
+        """
+        if len(origins) != len(destinations):
+            raise ValueError("origins와 destinations의 길이가 같아야 합니다.")
+        if not len(origins):
+            return np.zeros(0)
+        return haversine_pairwise(to_coord_array(origins), to_coord_array(destinations))
     
     async def calculate_distance_async(
         self,
@@ -29,15 +179,42 @@ class RouteOptimizer:
         """
         비동기 거리 계산 (I/O 작업)
         
-        Azure Maps API 호출이나 캐시 조회 시 대기 시간이 발생하므로
-        비동기로 처리하여 다른 작업과 병렬 실행 가능
+        Azure Maps 호출은 비동기 HTTP 클라이언트로 직접 await 하므로
+        스레드 풀을 점유하지 않고 다른 작업과 병렬 실행 가능
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            self.calculate_distance,
-            lat1, lon1, lat2, lon2, mode
-        )
+        if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+            return {"distance_km": 0.0, "time_minutes": 0, "method": "none"}
+
+        straight_dist = self._haversine_distance(lat1, lon1, lat2, lon2)
+        use_azure = self._needs_azure_maps(straight_dist, mode)
+        cache_key = self._cache_key(lat1, lon1, lat2, lon2, mode, symmetric=not use_azure)
+        # 영속 캐시 조회는 스레드 풀에서 실행 (이벤트 루프를 막지 않음)
+        cached = await self.cache.get_async(cache_key)
+        if cached is not None:
+            result = cached.copy()
+            result["method"] = "cache"
+            return result
+
+        if not use_azure:
+            result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
+            self.cache.set(cache_key, result)
+            return result
+
+        async def fetch() -> Dict[str, float]:
+            # 앞선 호출이 방금 캐시(메모리)에 저장했을 수 있으므로 한 번 더 확인
+            cached = self.cache.get(cache_key, record=False, use_store=False)
+            if cached is not None:
+                return cached
+            client = await get_async_azure_maps_client()
+            result = await client.route_directions(lat1, lon1, lat2, lon2, mode)
+            if result.get("method") == "error":
+                # Azure Maps 실패 시 Haversine으로 폴백
+                result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
+            self.cache.set(cache_key, result)
+            return result
+
+        # 같은 구간을 동시에 요청하면 Azure Maps 호출 한 번의 결과를 공유
+        return (await get_async_single_flight().do(cache_key, fetch)).copy()
 
     def calculate_distance(
         self,
@@ -66,36 +243,409 @@ class RouteOptimizer:
         if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
             return {"distance_km": 0.0, "time_minutes": 0, "method": "none"}
 
-        # 1. 캐시 확인
-        cache_key = f"{lat1:.4f}, {lon1:.4f}, {lat2:.4f}, {lon2:.4f}:{mode}"
-        if cache_key in self.cache:
-            result = self.cache[cache_key].copy()
+        # 1. 직선 거리 계산 (Azure Maps 필요 여부 = 캐시 키 대칭 여부)
+        straight_dist = self._haversine_distance(lat1, lon1, lat2, lon2)
+        use_azure = self._needs_azure_maps(straight_dist, mode)
+
+        # 2. 캐시 확인
+        cache_key = self._cache_key(lat1, lon1, lat2, lon2, mode, symmetric=not use_azure)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            result = cached.copy()
             result["method"] = "cache"
             return result
-        
-        # 2. 직선 거리 계산
-        straight_dist = self._haversine_distance(lat1, lon1, lat2, lon2)
 
         # 3. 조건별 선택
-        if not self.use_azure_maps:
-            # Azure Maps 비활성화 -> Haversine 사용
-            result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
-        elif straight_dist < 1.5:
-            # 1.5km 미만 -> Haversine 사용
+        if not use_azure:
             result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
-        elif mode == "walk":
-            # Walk는 항상 Haversine 사용 (실제 도로와 무관하게 직선 거리 기반)
-            result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
-        else:
+            self.cache.set(cache_key, result)
+            return result
+
+        def fetch() -> Dict[str, float]:
+            # 앞선 호출이 방금 캐시에 저장했을 수 있으므로 한 번 더 확인
+            cached = self.cache.get(cache_key, record=False)
+            if cached is not None:
+                return cached
             # 1.5km 이상 + public/car -> Azure Maps 사용 (1차 선택)
             result = self._calculate_with_azure_maps(lat1, lon1, lat2, lon2, mode)
             if result.get("method") == "error":
                 # Azure Maps 실패 시 Haversine으로 폴백
                 result = self._calculate_with_haversine(lat1, lon1, lat2, lon2, mode)
-        
-        self._add_to_cache(cache_key, result)
+            self.cache.set(cache_key, result)
+            return result
+
+        # 같은 구간을 동시에 요청하면 Azure Maps 호출 한 번의 결과를 공유
+        return get_single_flight().do(cache_key, fetch).copy()
+
+    def _snap(self, lat: float, lon: float) -> Tuple[int, int]:
+        """좌표를 캐시 격자 위의 정수 좌표로 변환"""
+        return round(lat * self._grid_scale), round(lon * self._grid_scale)
+
+    def _cache_key(
+        self,
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float,
+        mode: str,
+        symmetric: bool = False
+    ) -> CacheKey:
+        """
+        거리 캐시 키: (mode, 출발 격자, 도착 격자)
+
+        - 문자열 포맷 없이 정수 튜플로 구성 (해시/비교가 빠름)
+        - symmetric=True(Haversine 계산 구간)면 A→B와 B→A를 같은 키로 정규화
+        """
+        return self._pair_key(self._snap(lat1, lon1), self._snap(lat2, lon2), mode, symmetric)
+
+    @staticmethod
+    def _pair_key(a: Tuple[int, int], b: Tuple[int, int], mode: str, symmetric: bool) -> CacheKey:
+        if symmetric and b < a:
+            a, b = b, a
+        return (mode, a, b)
+
+    def _needs_azure_maps(self, straight_dist: float, mode: str) -> bool:
+        """
+        Azure Maps 사용 여부
+        - Azure Maps 비활성화 -> Haversine
+        - 1.5km 미만 -> Haversine
+        - Walk는 항상 Haversine (실제 도로와 무관하게 직선 거리 기반)
+        """
+        return self.use_azure_maps and straight_dist >= 1.5 and mode != "walk"
+
+    def needs_azure_maps_mask(self, straight: np.ndarray, mode: str) -> np.ndarray:
+        """_needs_azure_maps의 벡터화 버전 (직선 거리 행렬의 셀별 Azure Maps 사용 여부)"""
+        if not self.use_azure_maps or mode == "walk":
+            return np.zeros(straight.shape, dtype=bool)
+        return straight >= 1.5
+
+    @staticmethod
+    def haversine_travel_matrix(straight: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        _calculate_with_haversine의 벡터화 버전
+
+        Args:
+            straight: 직선 거리 행렬 (km)
+
+        Returns:
+            (거리 km, 소요 시간 분) 행렬
+        """
+        km = np.round(straight, 2)
+        minutes = np.rint(km / HAVERSINE_SPEED_KMH.get(mode, 20.0) * 60) + 10
+        return km, minutes.astype(np.int64)
+
+    async def calculate_distance_matrix_async(
+        self,
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str = "public"
+    ) -> List[List[Dict[str, float]]]:
+        """
+        calculate_distance_matrix의 비동기 버전 (Route Matrix를 비동기 HTTP로 요청)
+
+        영속 캐시 조회는 행렬 전체를 한 번에 스레드 풀에서 실행
+        """
+        result, lookups = self._matrix_lookups(origins, destinations, mode)
+        cached = await self.cache.get_many_async(key for _, _, key, _ in lookups) if lookups else {}
+        pending = self._fill_from_cache(result, lookups, cached, origins, destinations, mode)
+        if not pending:
+            return result
+
+        flight = get_async_single_flight()
+        owned, waiting = flight.claim(key for _, _, key in pending)
+        own = self._filter_pending(pending, owned)
+        try:
+            if own:
+                rows, cols = self._matrix_axes(own)
+                client = await get_async_azure_maps_client()
+                matrix = await client.route_matrix(
+                    [(origins[i]['latitude'], origins[i]['longitude']) for i in rows],
+                    [(destinations[j]['latitude'], destinations[j]['longitude']) for j in cols],
+                    mode
+                )
+                self._complete_distance_matrix(result, own, rows, cols, matrix, origins, destinations, mode)
+        finally:
+            self._resolve_owned(flight, result, own, owned)
+
+        # 다른 요청이 계산 중이던 셀은 그 결과를 공유
+        for i, j, key in self._filter_pending(pending, waiting):
+            shared = await flight.wait(waiting[key])
+            if shared is None:
+                o, d = origins[i], destinations[j]
+                shared = await self.calculate_distance_async(
+                    o['latitude'], o['longitude'], d['latitude'], d['longitude'], mode
+                )
+            result[i][j] = shared.copy()
         return result
 
+    def calculate_distance_matrix(
+        self,
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str = "public"
+    ) -> List[List[Dict[str, float]]]:
+        """
+        출발지 × 도착지 거리/시간 행렬 (하이브리드, 배치)
+
+        캐시에 없고 Azure Maps가 필요한 셀만 모아
+        Route Matrix API 한 번(100셀 단위)으로 요청
+
+        다른 요청이 이미 계산 중인 셀은 다시 요청하지 않고 그 결과를 기다림 (single-flight)
+
+        Returns:
+            result[i][j]: calculate_distance(origins[i] → destinations[j], mode)와 같은 형식
+        """
+        result, lookups = self._matrix_lookups(origins, destinations, mode)
+        cached = self.cache.get_many(key for _, _, key, _ in lookups) if lookups else {}
+        pending = self._fill_from_cache(result, lookups, cached, origins, destinations, mode)
+        if not pending:
+            return result
+
+        flight = get_single_flight()
+        owned, waiting = flight.claim(key for _, _, key in pending)
+        own = self._filter_pending(pending, owned)
+        try:
+            if own:
+                rows, cols = self._matrix_axes(own)
+                matrix = self.azure_client.route_matrix(
+                    [(origins[i]['latitude'], origins[i]['longitude']) for i in rows],
+                    [(destinations[j]['latitude'], destinations[j]['longitude']) for j in cols],
+                    mode
+                )
+                self._complete_distance_matrix(result, own, rows, cols, matrix, origins, destinations, mode)
+        finally:
+            # 기다리기 전에 선점한 셀부터 마무리해야 요청 간 교착이 생기지 않음
+            self._resolve_owned(flight, result, own, owned)
+
+        # 다른 요청이 계산 중이던 셀은 그 결과를 공유
+        for i, j, key in self._filter_pending(pending, waiting):
+            shared = waiting[key].result()
+            if shared is None:
+                o, d = origins[i], destinations[j]
+                shared = self.calculate_distance(
+                    o['latitude'], o['longitude'], d['latitude'], d['longitude'], mode
+                )
+            result[i][j] = shared.copy()
+        return result
+
+    def _matrix_lookups(
+        self,
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str
+    ) -> Tuple[List[List[Optional[Dict]]], List[Tuple[int, int, CacheKey, bool]]]:
+        """
+        좌표가 없거나 사전 계산 행렬에 있는 셀을 채우고 캐시에서 찾아볼 셀 목록 반환
+
+        Returns:
+            (result, lookups)
+            lookups: 캐시 조회가 필요한 (i, j, cache_key, Azure Maps 필요 여부)
+        """
+        result: List[List[Optional[Dict]]] = [[None] * len(destinations) for _ in origins]
+        if not origins or not destinations:
+            return result, []
+
+        straight = self.distance_matrix(origins, destinations)
+        precomputed = self._precomputed_block(origins, destinations, mode)
+        # 격자 좌표는 장소마다 한 번만 계산 (셀마다 반올림하지 않음)
+        origin_cells = self._snap_all(origins)
+        dest_cells = self._snap_all(destinations)
+        lookups = []
+
+        for i, o in enumerate(origins):
+            lat1, lon1 = o.get('latitude'), o.get('longitude')
+            for j, d in enumerate(destinations):
+                lat2, lon2 = d.get('latitude'), d.get('longitude')
+                if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+                    result[i][j] = {"distance_km": 0.0, "time_minutes": 0, "method": "none"}
+                    continue
+
+                if precomputed is not None and precomputed[1][i, j] >= 0:
+                    result[i][j] = {
+                        "distance_km": round(float(precomputed[0][i, j]), 2),
+                        "time_minutes": int(precomputed[1][i, j]),
+                        "method": "precomputed"
+                    }
+                    continue
+
+                use_azure = self._needs_azure_maps(straight[i, j], mode)
+                cache_key = self._pair_key(origin_cells[i], dest_cells[j], mode, not use_azure)
+                lookups.append((i, j, cache_key, use_azure))
+
+        return result, lookups
+
+    def _fill_from_cache(
+        self,
+        result: List[List[Optional[Dict]]],
+        lookups: List[Tuple[int, int, CacheKey, bool]],
+        cached: Dict[CacheKey, Dict[str, float]],
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str
+    ) -> List[Tuple[int, int, CacheKey]]:
+        """
+        캐시 조회 결과(cached)와 Haversine으로 셀을 채우고 Azure Maps가 필요한 셀 목록 반환
+
+        Returns:
+            pending: Azure Maps가 필요한 (i, j, cache_key)
+        """
+        pending = []
+        for i, j, cache_key, use_azure in lookups:
+            hit = cached.get(cache_key)
+            if hit is not None:
+                cell = hit.copy()
+                cell["method"] = "cache"
+                result[i][j] = cell
+            elif use_azure:
+                pending.append((i, j, cache_key))
+            else:
+                o, d = origins[i], destinations[j]
+                cell = self._calculate_with_haversine(
+                    o['latitude'], o['longitude'], d['latitude'], d['longitude'], mode
+                )
+                self.cache.set(cache_key, cell)
+                cached[cache_key] = cell  # 같은 키의 반대 방향 셀(대칭 키)은 다시 계산하지 않음
+                result[i][j] = cell
+        return pending
+
+    def _precomputed_block(
+        self,
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        사전 계산 행렬에서 origins × destinations 부분 행렬 조회 (거리 km, 시간 분)
+
+        destination이 있는 장소들이 모두 같은 여행지이고 그 여행지 행렬이 빌드되어 있을 때만 사용
+        행렬에 없는 POI(새로 추가된 장소, destination이 없는 클라이언트 숙소 등)의 셀은 시간 -1 → 실시간 계산
+        """
+        if self.poi_matrices is None:
+            return None
+
+        regions = {
+            normalize_destination(p.get('destination'))
+            for p in (*origins, *destinations)
+            if p.get('destination')
+        }
+        if len(regions) != 1:
+            return None
+        region = regions.pop()
+        matrix = self.poi_matrices.get(region)
+        if matrix is None:
+            return None
+
+        def indices(places: Sequence[Dict]) -> np.ndarray:
+            # destination이 없거나 다른 장소는 행렬에서 찾지 않음 (-1)
+            return matrix.indices([
+                p.get('id') if normalize_destination(p.get('destination')) == region else None
+                for p in places
+            ])
+
+        rows = indices(origins)
+        cols = indices(destinations)
+        if not (rows >= 0).any() or not (cols >= 0).any():
+            return None
+        return matrix.block(rows, cols, mode)
+
+    def _snap_all(self, points: Sequence[Dict]) -> List[Tuple[int, int]]:
+        """장소 리스트의 격자 좌표 (벡터화)"""
+        cells = np.rint(to_coord_array(points) * self._grid_scale).astype(np.int64)
+        return [(int(lat), int(lon)) for lat, lon in cells]
+
+    @staticmethod
+    def _matrix_axes(pending: List[Tuple[int, int, CacheKey]]) -> Tuple[List[int], List[int]]:
+        """Route Matrix로 요청할 origins/destinations 인덱스"""
+        rows = sorted({i for i, _, _ in pending})
+        cols = sorted({j for _, j, _ in pending})
+        return rows, cols
+
+    @staticmethod
+    def _filter_pending(pending: List[Tuple[int, int, CacheKey]], keys) -> List[Tuple[int, int, CacheKey]]:
+        """pending 중 cache_key가 keys에 속하는 셀만"""
+        keys = set(keys)
+        return [cell for cell in pending if cell[2] in keys]
+
+    @staticmethod
+    def _resolve_owned(flight, result: List[List[Optional[Dict]]], own: List[Tuple[int, int, CacheKey]], owned: List[CacheKey]):
+        """선점한 키마다 계산 결과(실패 시 None)를 기다리는 요청에 전달"""
+        cells = {key: result[i][j] for i, j, key in own}
+        for key in owned:
+            flight.resolve(key, cells.get(key))
+
+    def _complete_distance_matrix(
+        self,
+        result: List[List[Optional[Dict]]],
+        pending: List[Tuple[int, int, CacheKey]],
+        rows: List[int],
+        cols: List[int],
+        matrix: List[List[Dict[str, float]]],
+        origins: Sequence[Dict],
+        destinations: Sequence[Dict],
+        mode: str
+    ):
+        """Route Matrix 응답으로 남은 셀 채우기 (실패한 셀은 Haversine 폴백)"""
+        row_pos = {i: r for r, i in enumerate(rows)}
+        col_pos = {j: c for c, j in enumerate(cols)}
+
+        for i, j, cache_key in pending:
+            cell = matrix[row_pos[i]][col_pos[j]]
+            if cell.get("method") == "error":
+                # Azure Maps 실패 시 Haversine으로 폴백
+                o, d = origins[i], destinations[j]
+                cell = self._calculate_with_haversine(
+                    o['latitude'], o['longitude'], d['latitude'], d['longitude'], mode
+                )
+            self.cache.set(cache_key, cell)
+            result[i][j] = cell
+
+    @staticmethod
+    def _index_pairs(
+        pairs: Sequence[Tuple[Dict, Dict]]
+    ) -> Tuple[List[Dict], List[Dict], List[Tuple[int, int]]]:
+        """(출발지, 도착지) 쌍을 고유 origins/destinations 리스트와 인덱스 쌍으로 변환"""
+        origin_idx: Dict[int, int] = {}
+        dest_idx: Dict[int, int] = {}
+        origins: List[Dict] = []
+        destinations: List[Dict] = []
+        for o, d in pairs:
+            if id(o) not in origin_idx:
+                origin_idx[id(o)] = len(origins)
+                origins.append(o)
+            if id(d) not in dest_idx:
+                dest_idx[id(d)] = len(destinations)
+                destinations.append(d)
+        return origins, destinations, [(origin_idx[id(o)], dest_idx[id(d)]) for o, d in pairs]
+
+    def calculate_distances_batch(
+        self,
+        pairs: Sequence[Tuple[Dict, Dict]],
+        mode: str = "public"
+    ) -> List[Dict[str, float]]:
+        """
+        여러 (출발지, 도착지) 쌍의 거리/시간을 한 번에 계산
+
+        쌍에 등장하는 장소들로 행렬을 만들어 calculate_distance_matrix 한 번으로 처리
+        (요청하지 않은 셀도 캐시에 저장되므로 경로 변경/장소 교체 시 재사용됨)
+        """
+        if not pairs:
+            return []
+        origins, destinations, index = self._index_pairs(pairs)
+        matrix = self.calculate_distance_matrix(origins, destinations, mode)
+        return [matrix[i][j] for i, j in index]
+
+    async def calculate_distances_batch_async(
+        self,
+        pairs: Sequence[Tuple[Dict, Dict]],
+        mode: str = "public"
+    ) -> List[Dict[str, float]]:
+        """calculate_distances_batch의 비동기 버전"""
+        if not pairs:
+            return []
+        origins, destinations, index = self._index_pairs(pairs)
+        matrix = await self.calculate_distance_matrix_async(origins, destinations, mode)
+        return [matrix[i][j] for i, j in index]
+
     def _haversine_distance(
         self,
         lat1: float, 
@@ -105,7 +655,7 @@ class RouteOptimizer:
     ) -> float:
         """Haversine 공식을 사용한 거리 계산"""
 
-        R = 6371.0  # 지구 반지름 (km)
+        R = EARTH_RADIUS_KM
 
         dlat = math.radians(lat2 - lat1)
         dlon = math.radians(lon2 - lon1)
@@ -151,13 +701,7 @@ class RouteOptimizer:
         distance_km = round(self._haversine_distance(lat1, lon1, lat2, lon2), 2)
         
         # 교통수단별 속도
-        speed_map = {
-            "walk": 4.0,
-            "car": 30.0,
-            "public": 20.0
-        }
-
-        speed = speed_map.get(mode, 20.0)
+        speed = HAVERSINE_SPEED_KMH.get(mode, 20.0)
 
         # 시간 계산
         time_minutes = round(distance_km / speed * 60) + 10
@@ -178,118 +722,51 @@ class RouteOptimizer:
         mode: str = "public"
     ) -> Dict[str,float]:
         """
-        Azure Maps를 사용한 거리 및 시간 계산
+        Azure Maps를 사용한 거리 및 시간 계산 (Route Directions API)
         """
-        # 교통수단 매핑
-        travel_mode_map = {
-            "car" : "car",
-            "public" : "publicTransit",
-            "walk" : "pedestrian"
-        }
-
-        travel_mode = travel_mode_map.get(mode, "car")
-
-        #Azure Maps Route API
-        url = "https://atlas.microsoft.com/route/directions/json"
-        params = {
-            "api-version": "1.0",
-            "subscription-key": self.azure_maps_key,
-            "query": f"{lat1},{lon1}:{lat2},{lon2}",
-            "travelMode": travel_mode,
-            "traffic": "true",
-            "departAt": datetime.now().isoformat()
-        }
+        return self.azure_client.route_directions(lat1, lon1, lat2, lon2, mode)
 
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("routes"):
-                route = data["routes"][0]
-                summary = route["summary"]
-
-                # 거리 (미터 -> km)
-                distance_km = round(summary['lengthInMeters'] / 1000, 2)
-
-                # 소요 시간 (초 -> 분)
-                time_minutes = round(summary['travelTimeInSeconds'] / 60)
+    def cluster_places(
+        self,
+        places: List[Dict],
+        k: int,
+        seed: Optional[int] = 0
+    ) -> List[List[Dict]]:
+        """
+        K-Means++ 알고리즘을 사용하여 장소들을 k개의 그룹(일자별)으로 나눔
 
-                return {
-                    "distance_km": distance_km,
-                    "time_minutes": time_minutes,
-                    "method": "azure_maps"
-                }
-            else:
-                # routes가 없는 경우
-                return {"method": "error"}
-        except Exception as e:
-            print(f"Azure Maps API Error: {e}")
-            return {"method": "error"}
+        Args:
+            places: 장소 리스트
+            k: 그룹 수 (여행 일수)
+            seed: K-Means++ 초기화 시드 (같은 입력 + 같은 시드 = 같은 결과)
+        """
+        clusters, _ = self.cluster_places_with_stats(places, k, seed=seed)
+        return clusters
 
-    def cluster_places(self, places: List[Dict], k: int) -> List[List[Dict]]:
+    def cluster_places_with_stats(
+        self,
+        places: List[Dict],
+        k: int,
+        seed: Optional[int] = 0
+    ) -> Tuple[List[List[Dict]], Optional[Dict]]:
         """
-        K-Means 알고리즘을 사용하여 장소들을 k개의 그룹(일자별)으로 나눔
-        (외부 라이브러리 없이 구현)
+        장소 클러스터링 후 수렴 통계(iterations, converged, inertia)와 함께 반환
         """
         if not places or k <= 0:
-            return []
+            return [], None
         
         if len(places) <= k:
-            return [[p] for p in places]
+            return [[p] for p in places], None
 
-        # 1. 초기 중심점 설정 (첫 k개 장소를 중심으로 사용 - 간단 버전)
-        centroids = [
-            (p['latitude'], p['longitude']) 
-            for p in places[:k]
-        ]
-        
-        # 최대 10번 반복 (보통 금방 수렴함)
-        for _ in range(10):
-            # 클러스터 초기화
-            new_clusters = [[] for _ in range(k)]
-            
-            # 2. 각 장소를 가장 가까운 중심점에 할당
-            for place in places:
-                p_lat, p_lon = place['latitude'], place['longitude']
-                
-                best_cluster_idx = 0
-                min_dist = float('inf')
-                
-                for i, (c_lat, c_lon) in enumerate(centroids):
-                    # 직선 거리 계산 (빠름)
-                    dist = self._haversine_distance(p_lat, p_lon, c_lat, c_lon)
-                    if dist < min_dist:
-                        min_dist = dist
-                        best_cluster_idx = i
-                
-                new_clusters[best_cluster_idx].append(place)
-            
-            # 3. 중심점 업데이트
-            new_centroids = []
-            
-            for cluster in new_clusters:
-                if not cluster: # 빈 클러스터면 기존 중심 유지
-                    new_centroids.append(centroids[len(new_centroids)])
-                    continue
-                    
-                avg_lat = sum(p['latitude'] for p in cluster) / len(cluster)
-                avg_lon = sum(p['longitude'] for p in cluster) / len(cluster)
-                new_centroids.append((avg_lat, avg_lon))
-            
-            centroids = new_centroids
-            clusters = new_clusters
+        # 평면 좌표(km)로 투영 후 벡터화 K-Means
+        points = project_to_plane(to_coord_array(places))
+        labels, stats = kmeans(points, k, seed=seed)
 
-        return clusters
+        clusters = [[] for _ in range(k)]
+        for place, label in zip(places, labels):
+            clusters[label].append(place)
 
-    def _add_to_cache(self, key: str, value: Dict):
-        """캐시에 추가 (최대 크기 제한)"""
-        if len(self.cache) >= self.cache_max_size:
-            # 가장 오래된 항목 삭제 (FIFO)
-            first_key = next(iter(self.cache))
-            del self.cache[first_key]
-        
-        self.cache[key] = value
+        return clusters, stats
 
     def calculate_travel_time(self, distance_km: float, mode:str = "public") -> int:
         """
@@ -305,46 +782,226 @@ class RouteOptimizer:
         time_hours = distance_km / speed_kmh
         return int(time_hours * 60) + 10 # 10분 여유 시간 추가
     
-    def optimize_route(self, places: List[Dict], start_location: Optional[Dict] = None) -> List[Dict]:
+    def optimize_route(
+        self,
+        places: List[Dict],
+        start_location: Optional[Dict] = None,
+        return_to_start: bool = False,
+        time_budget_ms: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Greedy Nearest Neighbor + 2-opt/Or-opt 개선으로 최단 경로 정렬
+        """
+        route, _ = self.optimize_route_with_stats(
+            places,
+            start_location=start_location,
+            return_to_start=return_to_start,
+            time_budget_ms=time_budget_ms
+        )
+        return route
+
+    def optimize_route_with_stats(
+        self,
+        places: List[Dict],
+        start_location: Optional[Dict] = None,
+        return_to_start: bool = False,
+        time_budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[Dict]]:
         """
-        Greedy Nearest Neighbor 알고리즘으로 최단 경로 정렬
+        경로 정렬 후 개선 통계와 함께 반환
+
+        Args:
+            places: 방문할 장소들
+            start_location: 출발지 (없으면 점수가 가장 높은 장소)
+            return_to_start: True면 마지막에 출발지로 돌아오는 거리까지 최소화
+            time_budget_ms: 경로 개선 시간 예산 (None이면 ROUTE_IMPROVE_BUDGET_MS)
+
+        Returns:
+            (경로, 개선 통계 또는 None)
         """
         if not places:
-            return []
+            return [], None
         
         unvisited = places.copy()
-        route = []
 
         # 시작점 결정
         if start_location:
             current_location = start_location
-            route.append(current_location)
         else:
             # 시작점이 없으면 점수가 가장 높은 곳을 첫 번째로 선택
             current_location = max(unvisited, key=lambda x: x.get('score', 0))
             unvisited.remove(current_location)
-            route.append(current_location)
+
+        # 거리 행렬을 한 번만 계산 (0번: 시작점, 1..n: 미방문 후보)
+        points = [current_location] + unvisited
+        dist = self.distance_matrix(points, points)
+        visited = np.zeros(len(points), dtype=bool)
+        visited[0] = True
+        order = [0]
 
         # 가장 가까운 곳을 찾아가며 경로 생성
-        while unvisited:
-            nearest_place = None
-            min_dist = float("inf")
-
-            for place in unvisited:
-                result = self.calculate_distance(
-                    current_location.get('latitude',0),
-                    current_location.get('longitude',0),
-                    place.get('latitude',0),
-                    place.get('longitude',0)
-                )
-                dist = result["distance_km"]
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_place = place
-            if nearest_place:
-                route.append(nearest_place)
-                unvisited.remove(nearest_place)
-                current_location = nearest_place
-            else:
-                break
-        return route
\ No newline at end of file
+        for _ in range(len(unvisited)):
+            row = np.where(visited, np.inf, dist[order[-1]])
+            nearest_idx = int(np.argmin(row))
+            visited[nearest_idx] = True
+            order.append(nearest_idx)
+
+        # 2-opt / Or-opt로 경로 개선 (시간 예산 내에서)
+        stats = None
+        budget = self.route_improve_budget_ms if time_budget_ms is None else time_budget_ms
+        if budget > 0:
+            order, stats = improve_route(dist, order, time_budget_ms=budget, closed=return_to_start)
+
+        return [points[i] for i in order], stats
+
+    def improve_existing_route(
+        self,
+        route: List[Dict],
+        start_location: Optional[Dict] = None,
+        return_to_start: bool = False,
+        time_budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        기존 방문 순서를 초기 해로 2-opt / Or-opt 개선 (Greedy로 다시 만들지 않음)
+
+        Args:
+            route: 기존 방문 순서 (start_location 제외)
+            start_location: 출발지 (있으면 맨 앞에 고정)
+            return_to_start: True면 마지막에 출발지로 복귀하는 경로로 간주
+
+        Returns:
+            (경로 (start_location 포함), 개선 통계 또는 None)
+        """
+        points = ([start_location] if start_location else []) + list(route)
+        budget = self.route_improve_budget_ms if time_budget_ms is None else time_budget_ms
+        if len(points) < 3 or budget <= 0:
+            return points, None
+
+        dist = self.distance_matrix(points, points)
+        order, stats = improve_route(
+            dist, list(range(len(points))), time_budget_ms=budget,
+            closed=bool(start_location) and return_to_start
+        )
+        return [points[i] for i in order], stats
+
+    def insert_into_route(
+        self,
+        route: List[Dict],
+        place: Dict,
+        start_location: Optional[Dict] = None,
+        return_to_start: bool = False,
+        time_budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        기존 방문 순서에 장소 하나를 추가 거리가 가장 작은 위치에 삽입 (Cheapest Insertion)
+
+        전체를 다시 정렬하지 않고 기존 순서를 유지한 채 삽입한 뒤,
+        시간 예산 안에서 2-opt / Or-opt로 다듬음
+
+        Args:
+            route: 기존 방문 순서 (start_location 제외)
+            place: 삽입할 장소
+            start_location: 출발지 (있으면 맨 앞에 고정)
+            return_to_start: True면 마지막에 출발지로 복귀하는 경로로 간주
+            time_budget_ms: 삽입 후 경로 개선 시간 예산 (None이면 ROUTE_IMPROVE_BUDGET_MS)
+
+        Returns:
+            (경로 (start_location 포함), 통계)
+            통계: inserted_at(방문 순서상 위치), insertion_cost_km, improvement(개선 통계 또는 None)
+        """
+        points = ([start_location] if start_location else []) + list(route) + [place]
+        dist = self.distance_matrix(points, points)
+        new = len(points) - 1
+        order = list(range(new))
+        closed = bool(start_location) and return_to_start
+
+        # 삽입 위치 k: order[k-1]과 order[k] 사이 (출발지가 있으면 맨 앞에는 삽입 불가)
+        best_cost, best_k = float("inf"), len(order)
+        for k in range(1 if start_location else 0, len(order) + 1):
+            prev = order[k - 1] if k > 0 else None
+            nxt = order[k] if k < len(order) else (0 if closed else None)
+            cost = 0.0
+            if prev is not None:
+                cost += dist[prev, new]
+            if nxt is not None:
+                cost += dist[new, nxt]
+            if prev is not None and nxt is not None:
+                cost -= dist[prev, nxt]
+            if cost < best_cost:
+                best_cost, best_k = cost, k
+        order.insert(best_k, new)
+
+        stats = {
+            "inserted_at": best_k - (1 if start_location else 0),
+            "insertion_cost_km": round(float(best_cost), 3),
+            "improvement": None
+        }
+        budget = self.route_improve_budget_ms if time_budget_ms is None else time_budget_ms
+        if budget > 0:
+            order, stats["improvement"] = improve_route(dist, order, time_budget_ms=budget, closed=closed)
+
+        return [points[i] for i in order], stats
+
+    def optimize_days_joint(
+        self,
+        places: List[Dict],
+        num_days: int,
+        hotel: Optional[Dict] = None,
+        max_per_day: Optional[int] = None,
+        time_budget_ms: Optional[float] = None,
+        seed: Optional[int] = 0
+    ) -> Tuple[List[List[Dict]], Optional[Dict]]:
+        """
+        모든 일자의 장소 배정과 방문 순서를 함께 최적화 (VRP 방식)
+
+        K-Means++ 클러스터 + Greedy 경로를 초기 해로 삼아
+        장소를 다른 날로 옮기거나 맞바꾸며 전체 이동 거리를 줄임
+
+        Args:
+            places: 방문할 장소들 (숙소 제외)
+            num_days: 여행 일수
+            hotel: 숙소 (있으면 매일 숙소에서 출발, 마지막 날을 제외하고 숙소로 복귀)
+            max_per_day: 하루 최대 장소 수 (None이면 ceil(장소 수 / 일수) + 1)
+            time_budget_ms: 탐색 시간 예산 (None이면 JOINT_SOLVER_BUDGET_MS)
+
+        Returns:
+            (일자별 방문 순서 (숙소 제외), 탐색 통계 또는 None)
+        """
+        if not places or num_days <= 0:
+            return [[] for _ in range(max(num_days, 0))], None
+
+        clusters, kmeans_stats = self.cluster_places_with_stats(places, num_days, seed=seed)
+        clusters = clusters + [[] for _ in range(num_days - len(clusters))]
+        closed = [hotel is not None and day < num_days for day in range(1, num_days + 1)]
+
+        # 노드 0: 숙소 (없으면 모든 거리가 0인 가상 출발점), 1..n: 장소
+        node_of = {id(p): k + 1 for k, p in enumerate(places)}
+        dist = np.zeros((len(places) + 1, len(places) + 1))
+        dist[1:, 1:] = self.distance_matrix(places, places)
+        if hotel is not None:
+            dist[0, 1:] = self.distance_matrix([hotel], places)[0]
+            dist[1:, 0] = self.distance_matrix(places, [hotel])[:, 0]
+
+        # 초기 해: 일자별 Greedy 경로 (개선은 통합 탐색에서 수행)
+        initial_routes = []
+        for day, cluster in enumerate(clusters):
+            route, _ = self.optimize_route_with_stats(
+                cluster, start_location=hotel, return_to_start=closed[day], time_budget_ms=0
+            )
+            initial_routes.append([node_of[id(p)] for p in route if id(p) in node_of])
+
+        if max_per_day is None:
+            max_per_day = -(-len(places) // num_days) + 1
+        min_per_day = 1 if len(places) >= num_days else 0
+
+        routes, stats = solve_multi_day(
+            dist,
+            initial_routes,
+            closed,
+            max_per_day=max_per_day,
+            min_per_day=min_per_day,
+            time_budget_ms=self.joint_solver_budget_ms if time_budget_ms is None else time_budget_ms,
+            seed=seed
+        )
+        stats["kmeans"] = kmeans_stats
+        return [[places[node - 1] for node in route] for route in routes], stats
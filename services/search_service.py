@@ -2,17 +2,24 @@ import json
 import os
 import time
 import asyncio
+import weakref
 from typing import List, Dict, Optional, Tuple
 from sqlalchemy import text
-from db_connection import get_db_session
+from db_connection import get_async_db_session
+from services.destinations import normalize_destination, region_key
+from services.single_flight import AsyncSingleFlight
 
 class SearchService:
     def __init__(self):
         """캐시 초기화 (TTL 포함)"""
         self.destination_cache = {}  # destination별 캐시: {destination: (data, timestamp)}
-        self.cache_lock = asyncio.Lock()  # 동시 접근 방지 Lock
+        # destination별 진행 중인 로드 (이벤트 루프마다 따로, asyncio.Future는 루프에 묶여 있음)
+        self.load_flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSingleFlight]" = (
+            weakref.WeakKeyDictionary()
+        )
         self.cache_ttl = 3600  # TTL: 1시간 (3600초)
         self.cleanup_interval = 600  # 정리 주기: 10분 (600초)
+        self.region_key_ready = False  # pois.region_key 마이그레이션 완료 여부 (migrate_poi_region_key.py)
     
     def _is_cache_valid(self, destination: str) -> bool:
         """
@@ -51,9 +58,21 @@ class SearchService:
         if expired_keys:
             print(f"✅ 총 {len(expired_keys)}개의 만료된 캐시 정리 완료 (캐시 크기: {len(self.destination_cache)}개)")
     
+    def _load_flight(self) -> AsyncSingleFlight:
+        """현재 이벤트 루프의 destination 로드 single-flight"""
+        loop = asyncio.get_running_loop()
+        flight = self.load_flights.get(loop)
+        if flight is None:
+            flight = AsyncSingleFlight()
+            self.load_flights[loop] = flight
+        return flight
+
     async def _load_places_by_destination_async(self, destination: str) -> List[dict]:
         """
-        특정 destination의 장소 데이터만 로드 (캐싱 + TTL + Lock 적용)
+        특정 destination의 장소 데이터만 로드 (캐싱 + TTL + destination별 single-flight 적용)
+
+        같은 destination의 동시 로드는 DB 쿼리 하나를 함께 기다리고,
+        다른 destination의 로드는 서로 기다리지 않고 병렬로 진행
         """
         # 1. 캐시 확인 (TTL 포함)
         if self._is_cache_valid(destination):
@@ -61,47 +80,71 @@ class SearchService:
             print(f"✅ 캐시에서 {destination} 데이터 로드 ({len(places)}개, 캐시 크기: {len(self.destination_cache)}개)")
             return places
         
-        # 2. Lock을 사용하여 동시 DB 쿼리 방지
-        async with self.cache_lock:
-            # Double-check: Lock 획득 후 다시 캐시 확인
-            if self._is_cache_valid(destination):
-                places, _ = self.destination_cache[destination]
-                print(f"✅ (Lock 후) 캐시에서 {destination} 데이터 로드 ({len(places)}개)")
-                return places
-            
-            # 3. DB에서 데이터 조회
-            places = await self._query_from_database(destination)
-        
-            # 4. DB 쿼리 완료 후 캐시에 저장 (timestamp 포함)
-            if places:
-                self.destination_cache[destination] = (places, time.time())
-                print(f"✅ 데이터베이스에서 {destination} 데이터 로드 완료 ({len(places)}개, 캐시 저장됨)")
-            
-            # 5. 주기적으로 만료된 캐시 정리
-            if len(self.destination_cache) % 10 == 0:  # 10번마다 한 번 정리
-                self._cleanup_expired_cache()
-            
+        # 2. destination별 single-flight로 동시 DB 쿼리 병합
+        return await self._load_flight().do(destination, lambda: self._load_into_cache(destination))
+
+    async def _load_into_cache(self, destination: str) -> List[dict]:
+        """
+        DB에서 destination 데이터를 조회해 캐시에 저장 (destination별로 한 번에 하나만 실행)
+        """
+        # Double-check: 앞선 로드가 방금 끝났을 수 있음
+        if self._is_cache_valid(destination):
+            places, _ = self.destination_cache[destination]
+            print(f"✅ (로드 대기 후) 캐시에서 {destination} 데이터 로드 ({len(places)}개)")
             return places
+        
+        # 3. DB에서 데이터 조회
+        places = await self._query_from_database(destination)
+    
+        # 4. DB 쿼리 완료 후 캐시에 저장 (timestamp 포함)
+        if places:
+            self.destination_cache[destination] = (places, time.time())
+            print(f"✅ 데이터베이스에서 {destination} 데이터 로드 완료 ({len(places)}개, 캐시 저장됨)")
+        
+        # 5. 주기적으로 만료된 캐시 정리
+        if len(self.destination_cache) % 10 == 0:  # 10번마다 한 번 정리
+            self._cleanup_expired_cache()
+        
+        return places
+
+    def load_stats(self) -> Dict[str, int]:
+        """destination 로드 병합 통계 (leaders: DB 조회, coalesced: 진행 중인 조회 공유, in_flight: 진행 중)"""
+        total = {"leaders": 0, "coalesced": 0, "in_flight": 0}
+        for flight in list(self.load_flights.values()):
+            for k, v in flight.stats().items():
+                total[k] += v
+        return total
     
+    async def _check_region_key(self, session) -> bool:
+        """
+        pois.region_key 인덱스가 준비되었는지 확인 (준비되면 이후 다시 확인하지 않음)
+
+        마이그레이션 스크립트가 백필 후 마지막에 인덱스를 만들므로,
+        인덱스가 유효하면 모든 POI에 region_key가 채워진 상태
+        """
+        if not self.region_key_ready:
+            result = await session.execute(text("""
+                SELECT i.indisvalid
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = 'idx_pois_region_key'
+            """))
+            row = result.fetchone()
+            self.region_key_ready = bool(row and row[0])
+        return self.region_key_ready
+
     async def _query_from_database(self, destination: str) -> List[dict]:
         """
         데이터베이스에서 destination의 장소 데이터 조회
+
+        region_key 마이그레이션이 끝났고 지원 지역이면 region_key 인덱스로 조회,
+        그 외에는 주소 LIKE 검색 (앞에 %가 붙어 btree 인덱스 사용 불가, trigram 인덱스가 있으면 사용)
+        비동기 세션을 사용하므로 DB가 응답하는 동안 다른 요청이 멈추지 않음
         """
         try:
-            session = get_db_session()
-            
             # destination 매핑 (사용자 입력을 실제 지역명으로 변환)
-            destination_map = {
-                '서울': '서울',
-                '제주도': '제주',
-                '제주': '제주',
-                '부산': '부산',
-                '인천': '인천',
-                '대전': '대전',
-                '대구': '대구',
-                '광주': '광주'
-            }
-            search_term = destination_map.get(destination, destination)
+            search_term = normalize_destination(destination)
+            region = region_key(destination)
             
             # destination에 맞는 데이터만 조회
             query = """
@@ -125,16 +168,25 @@ class SearchService:
                 FROM pois p
                 LEFT JOIN poi_tag_association pta ON p.id = pta.poi_id
                 LEFT JOIN poi_tags pt ON pta.tag_id = pt.id
-                WHERE p.address LIKE :search_term
+                WHERE {where_clause}
                 GROUP BY p.id, p.name, p.latitude, p.longitude, p.overview, p.address, 
                          p.main_type, p.sub_type, p.image_url, p.content_id, 
                          p.content_type_id, p.created_at, p.updated_at
                 ORDER BY p.name
             """
             
-            result = session.execute(text(query), {"search_term": f"%{search_term}%"})
-            rows = result.fetchall()
-            session.close()
+            session = get_async_db_session()
+            try:
+                if region is not None and await self._check_region_key(session):
+                    where_clause = "p.region_key = :region"
+                    params = {"region": region}
+                else:
+                    where_clause = "p.address LIKE :search_term"
+                    params = {"search_term": f"%{search_term}%"}
+                result = await session.execute(text(query.format(where_clause=where_clause)), params)
+                rows = result.fetchall()
+            finally:
+                await session.close()
             
             # 결과를 딕셔너리로 변환
             places = []
@@ -201,7 +253,30 @@ class SearchService:
 
         # 1. destination의 데이터 로드 (캐싱 적용)
         all_places = self._load_places_by_destination(destination)
-        
+        return self._rank_places(all_places, destination, travel_styles, requirements, price_level)
+
+    async def search_places_with_priority_async(
+        self,
+        destination: str,
+        travel_styles: List[str],
+        requirements: List[str],
+        price_level: int) -> List[dict]:
+        """
+        우선순위 기반 장소 검색 (비동기, 이벤트 루프를 막지 않음)
+        """
+        all_places = await self._load_places_by_destination_async(destination)
+        return self._rank_places(all_places, destination, travel_styles, requirements, price_level)
+
+    def _rank_places(
+        self,
+        all_places: List[dict],
+        destination: str,
+        travel_styles: List[str],
+        requirements: List[str],
+        price_level: int) -> List[dict]:
+        """
+        예산 필터링 + 점수 계산 + 점수순 정렬
+        """
         # 2. 예산 필터링
         candidates = [
             p for p in all_places 
@@ -0,0 +1,111 @@
+"""
+응답 / DB 직렬화 (datetime을 직렬화 단계에서 바로 변환)
+
+기존에는 convert_datetime_to_str로 결과 전체를 재귀 복사한 뒤
+FastAPI가 jsonable_encoder로 한 번 더 순회하고, DB JSON 컬럼 저장 시 json.dumps로 또 직렬화함
+- orjson이 설치되어 있으면 datetime / numpy 값을 C 구현에서 한 번에 직렬화
+- 없으면 표준 json + default 핸들러로 동일한 결과 (한 번의 순회)
+- Accept: application/msgpack (또는 application/x-msgpack)이면 MessagePack 응답 (msgpack 설치 시)
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 선택 의존성
+    msgpack = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(obj: Any) -> Any:
+    """
+    기본 직렬화기가 처리하지 못하는 값 변환 (datetime → ISO 문자열, numpy → 파이썬 값)
+
+    그 외 타입은 str()로 조용히 바꾸지 않고 TypeError (json.dumps와 동일한 동작)
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON 직렬화 (UTF-8 bytes, 한글은 이스케이프하지 않음)"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(obj, ensure_ascii=False, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """JSON 직렬화 (str, SQLAlchemy JSON 컬럼 / 스트리밍 이벤트용)"""
+    return dumps(obj).decode("utf-8")
+
+
+def packb(obj: Any) -> bytes:
+    """MessagePack 직렬화 (msgpack이 설치되어 있어야 함)"""
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+class FastJSONResponse(JSONResponse):
+    """dumps()로 렌더링하는 JSON 응답"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack 응답"""
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+
+def wants_msgpack(request: Optional[Request]) -> bool:
+    """Accept 헤더가 MessagePack을 요청하고 msgpack을 쓸 수 있는지"""
+    if msgpack is None or request is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def negotiated_response(request: Optional[Request], content: Any, status_code: int = 200) -> Response:
+    """
+    Accept 헤더에 맞춘 응답 (MessagePack 또는 JSON)
+
+    Response를 직접 반환하므로 FastAPI의 jsonable_encoder 순회를 거치지 않음
+    """
+    if wants_msgpack(request):
+        return MsgPackResponse(content, status_code=status_code)
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def serialization_backend() -> dict:
+    """사용 중인 직렬화 구현 (캐시 통계 / 디버깅용)"""
+    return {
+        "json": "orjson" if orjson is not None else "json",
+        "msgpack": msgpack is not None
+    }
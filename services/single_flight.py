@@ -0,0 +1,170 @@
+"""
+Single-flight 요청 병합
+
+같은 키(구간 + 교통수단)에 대한 계산이 이미 진행 중이면 새로 계산하지 않고
+진행 중인 계산의 결과를 함께 기다림
+(캐시가 비어 있는 배포 직후, 인기 구간에 대한 중복 Azure Maps 호출 방지)
+
+사용 규칙:
+- claim()으로 선점한 키(owned)는 반드시 resolve()로 한 번씩 마무리
+- resolve(key, None)은 "계산 실패"를 뜻하며, 기다리던 호출은 각자 직접 계산
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class SingleFlight:
+    """스레드용 single-flight (동기 경로)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, Future]]:
+        """
+        여러 키를 한 번에 선점
+
+        Returns:
+            (직접 계산해야 하는 키들, 다른 호출이 계산 중인 키 -> Future)
+        """
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in owned or key in waiting:
+                    continue
+                future = self._calls.get(key)
+                if future is not None:
+                    waiting[key] = future
+                    self.coalesced += 1
+                else:
+                    self._calls[key] = Future()
+                    owned[key] = True
+                    self.leaders += 1
+        return list(owned), waiting
+
+    def resolve(self, key: Hashable, result: Optional[Any]):
+        """선점한 키의 결과 전달 (None이면 실패)"""
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is not None:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        key에 대한 계산 실행 (이미 진행 중이면 그 결과를 기다림)
+
+        fn이 예외를 던지면 기다리던 호출들은 각자 fn을 다시 실행
+        """
+        owned, waiting = self.claim([key])
+        if not owned:
+            shared = waiting[key].result()
+            return fn() if shared is None else shared
+
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self.resolve(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """이벤트 루프용 single-flight (비동기 경로, 해당 루프 안에서만 사용)"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, asyncio.Future]]:
+        """SingleFlight.claim과 동일 (asyncio.Future 반환)"""
+        loop = asyncio.get_running_loop()
+        owned, waiting = {}, {}
+        for key in keys:
+            if key in owned or key in waiting:
+                continue
+            future = self._calls.get(key)
+            if future is not None:
+                waiting[key] = future
+                self.coalesced += 1
+            else:
+                self._calls[key] = loop.create_future()
+                owned[key] = True
+                self.leaders += 1
+        return list(owned), waiting
+
+    def resolve(self, key: Hashable, result: Optional[Any]):
+        """선점한 키의 결과 전달 (None이면 실패)"""
+        future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    async def wait(future: asyncio.Future) -> Optional[Any]:
+        """
+        다른 호출의 결과 기다리기
+
+        기다리는 쪽이 취소되어도 공유 Future는 취소되지 않도록 shield
+        """
+        return await asyncio.shield(future)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """SingleFlight.do의 비동기 버전"""
+        owned, waiting = self.claim([key])
+        if not owned:
+            shared = await self.wait(waiting[key])
+            return await fn() if shared is None else shared
+
+        result = None
+        try:
+            result = await fn()
+            return result
+        finally:
+            self.resolve(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+_single_flight = SingleFlight()
+_async_single_flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSingleFlight]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_single_flight() -> SingleFlight:
+    """프로세스 전체에서 공유하는 SingleFlight"""
+    return _single_flight
+
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    """
+    현재 이벤트 루프에서 공유하는 AsyncSingleFlight
+
+    asyncio.Future는 루프에 묶여 있으므로 루프마다 따로 생성
+    (travel_tools처럼 별도 스레드에서 새 루프를 돌리는 경우 대비)
+    """
+    loop = asyncio.get_running_loop()
+    flight = _async_single_flights.get(loop)
+    if flight is None:
+        flight = AsyncSingleFlight()
+        _async_single_flights[loop] = flight
+    return flight
+
+
+def single_flight_stats() -> Dict[str, int]:
+    """동기 + 모든 이벤트 루프의 병합 통계 합계"""
+    total = _single_flight.stats()
+    for flight in list(_async_single_flights.values()):
+        for k, v in flight.stats().items():
+            total[k] += v
+    return total
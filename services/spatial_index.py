@@ -0,0 +1,257 @@
+"""
+여행지 POI 공간 인덱스 (격자 기반)
+
+장소들을 평면 좌표(km)로 투영한 뒤 cell_km 크기의 격자 칸에 나눠 담고,
+질의 지점 주변 칸부터 바깥쪽으로 넓혀가며 탐색
+- k-최근접 질의: 전체 스캔 없이 가까운 칸만 확인
+- 반경 질의: 반경을 덮는 칸만 확인
+- 타입별로 격자를 따로 만들어 타입 필터가 탐색 범위를 넓히지 않음
+"""
+import math
+import os
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.clustering import EARTH_RADIUS_KM
+
+# 장소와 질의 지점 사이 거리(km)
+Neighbor = Tuple[Dict, float]
+
+
+class _Grid:
+    """한 타입의 장소들을 담는 격자"""
+
+    def __init__(self, places: List[Dict], points: np.ndarray, cell_km: float):
+        self.places = places
+        self.points = points
+        self.cell_km = cell_km
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for idx, (y, x) in enumerate(points):
+            self.cells.setdefault(self._cell_of(y, x), []).append(idx)
+
+        keys = np.array(list(self.cells.keys())) if self.cells else np.zeros((0, 2), dtype=int)
+        self.min_cell = keys.min(axis=0) if len(keys) else np.zeros(2, dtype=int)
+        self.max_cell = keys.max(axis=0) if len(keys) else np.zeros(2, dtype=int)
+
+    def _cell_of(self, y: float, x: float) -> Tuple[int, int]:
+        return math.floor(y / self.cell_km), math.floor(x / self.cell_km)
+
+    def _ring(self, center: Tuple[int, int], r: int) -> Iterable[Tuple[int, int]]:
+        """center에서 체비쇼프 거리가 정확히 r인 칸들"""
+        cy, cx = center
+        if r == 0:
+            yield center
+            return
+        for dx in range(-r, r + 1):
+            yield cy - r, cx + dx
+            yield cy + r, cx + dx
+        for dy in range(-r + 1, r):
+            yield cy + dy, cx - r
+            yield cy + dy, cx + r
+
+    def _max_ring(self, center: Tuple[int, int]) -> int:
+        """center에서 모든 칸을 덮는 데 필요한 링 수"""
+        c = np.array(center)
+        return int(max(np.abs(self.min_cell - c).max(), np.abs(self.max_cell - c).max()))
+
+    def _distances(self, idxs: List[int], q: np.ndarray) -> np.ndarray:
+        diff = self.points[idxs] - q
+        return np.sqrt(np.einsum('nd,nd->n', diff, diff))
+
+    def nearest(
+        self,
+        q: np.ndarray,
+        k: int,
+        where: Optional[Callable[[Dict], bool]],
+        max_km: Optional[float]
+    ) -> List[Tuple[float, int]]:
+        if not self.cells:
+            return []
+
+        center = self._cell_of(q[0], q[1])
+        last_ring = self._max_ring(center)
+        if max_km is not None:
+            last_ring = min(last_ring, math.ceil(max_km / self.cell_km) + 1)
+
+        found: List[Tuple[float, int]] = []
+        for r in range(last_ring + 1):
+            idxs = [i for cell in self._ring(center, r) for i in self.cells.get(cell, ())]
+            if idxs:
+                for d, i in zip(self._distances(idxs, q), idxs):
+                    if max_km is not None and d > max_km:
+                        continue
+                    if where is not None and not where(self.places[i]):
+                        continue
+                    found.append((float(d), i))
+                found.sort()
+                del found[k:]
+            # 다음 링의 장소는 질의 지점에서 최소 r * cell_km 떨어져 있음
+            if len(found) >= k and found[-1][0] <= r * self.cell_km:
+                break
+        return found
+
+    def within(
+        self,
+        q: np.ndarray,
+        radius_km: float,
+        where: Optional[Callable[[Dict], bool]]
+    ) -> List[Tuple[float, int]]:
+        if not self.cells:
+            return []
+
+        cy, cx = self._cell_of(q[0], q[1])
+        span = math.ceil(radius_km / self.cell_km)
+        idxs = [
+            i
+            for y in range(cy - span, cy + span + 1)
+            for x in range(cx - span, cx + span + 1)
+            for i in self.cells.get((y, x), ())
+        ]
+        if not idxs:
+            return []
+
+        found = [
+            (float(d), i)
+            for d, i in zip(self._distances(idxs, q), idxs)
+            if d <= radius_km and (where is None or where(self.places[i]))
+        ]
+        found.sort()
+        return found
+
+
+class SpatialIndex:
+    """
+    장소 공간 인덱스 (k-최근접 / 반경 질의, 타입·카테고리 필터)
+
+    Args:
+        places: 장소 리스트 (latitude, longitude가 없는 장소는 제외)
+        cell_km: 격자 칸 크기 (km, 기본: SPATIAL_INDEX_CELL_KM 또는 1.0)
+    """
+
+    def __init__(self, places: Sequence[Dict], cell_km: Optional[float] = None):
+        self.cell_km = cell_km or float(os.getenv("SPATIAL_INDEX_CELL_KM", "1.0"))
+        located = [
+            p for p in places
+            if p.get('latitude') is not None and p.get('longitude') is not None
+        ]
+        self.size = len(located)
+
+        # 좌표가 없는 장소도 포함한 타입별 목록 (입력 순서 유지, 좌표 없는 질의용)
+        self._by_type_all: Dict[Optional[str], List[Dict]] = {}
+        for p in places:
+            self._by_type_all.setdefault(p.get('type'), []).append(p)
+
+        # 투영 기준 위도를 고정해 질의 지점도 같은 평면으로 변환
+        lats = np.array([p['latitude'] for p in located], dtype=np.float64)
+        self._ref_cos = math.cos(math.radians(float(lats.mean()))) if len(lats) else 1.0
+
+        by_type: Dict[Optional[str], List[Dict]] = {}
+        for p in located:
+            by_type.setdefault(p.get('type'), []).append(p)
+        self._grids: Dict[Optional[str], _Grid] = {
+            place_type: _Grid(group, self._project(group), self.cell_km)
+            for place_type, group in by_type.items()
+        }
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def types(self) -> List[Optional[str]]:
+        return list(self._grids.keys())
+
+    def first_of_type(self, place_type: Optional[str], k: int = 5) -> List[Dict]:
+        """해당 타입의 장소 앞에서부터 k개 (입력 순서, 질의 지점 좌표가 없을 때 사용)"""
+        return self._by_type_all.get(place_type, [])[:max(k, 0)]
+
+    def _project(self, places: Sequence[Dict]) -> np.ndarray:
+        coords = np.array([[p['latitude'], p['longitude']] for p in places], dtype=np.float64)
+        return self._project_coords(coords)
+
+    def _project_coords(self, coords: np.ndarray) -> np.ndarray:
+        rad = np.radians(coords.reshape(-1, 2))
+        return np.column_stack([
+            EARTH_RADIUS_KM * rad[:, 0],
+            EARTH_RADIUS_KM * rad[:, 1] * self._ref_cos
+        ])
+
+    def _select(
+        self,
+        types: Optional[Iterable[str]],
+        categories: Optional[Iterable[str]],
+        where: Optional[Callable[[Dict], bool]]
+    ) -> Tuple[List[_Grid], Optional[Callable[[Dict], bool]]]:
+        grids = list(self._grids.values()) if types is None else [
+            self._grids[t] for t in set(types) if t in self._grids
+        ]
+
+        if categories is None:
+            return grids, where
+        wanted = set(categories)
+
+        def predicate(place: Dict) -> bool:
+            if wanted.isdisjoint(place.get('category') or ()):
+                return False
+            return where is None or where(place)
+
+        return grids, predicate
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        types: Optional[Iterable[str]] = None,
+        categories: Optional[Iterable[str]] = None,
+        where: Optional[Callable[[Dict], bool]] = None,
+        max_km: Optional[float] = None
+    ) -> List[Neighbor]:
+        """
+        가장 가까운 장소 k개 (가까운 순)
+
+        Args:
+            types: 이 타입 중 하나인 장소만 (None이면 전체)
+            categories: 이 카테고리(태그)를 하나라도 가진 장소만
+            where: 추가 조건 (예: 이미 일정에 포함된 장소 제외)
+            max_km: 이보다 먼 장소는 제외
+
+        Returns:
+            [(장소, 거리 km), ...]
+        """
+        if k <= 0 or self.size == 0:
+            return []
+        grids, predicate = self._select(types, categories, where)
+        q = self._project_coords(np.array([latitude, longitude], dtype=np.float64))[0]
+
+        found = [
+            (d, grid, i)
+            for grid in grids
+            for d, i in grid.nearest(q, k, predicate, max_km)
+        ]
+        found.sort(key=lambda item: item[0])
+        return [(grid.places[i], round(d, 3)) for d, grid, i in found[:k]]
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        types: Optional[Iterable[str]] = None,
+        categories: Optional[Iterable[str]] = None,
+        where: Optional[Callable[[Dict], bool]] = None
+    ) -> List[Neighbor]:
+        """
+        반경 radius_km 안의 장소 (가까운 순, 필터는 nearest와 동일)
+        """
+        if radius_km < 0 or self.size == 0:
+            return []
+        grids, predicate = self._select(types, categories, where)
+        q = self._project_coords(np.array([latitude, longitude], dtype=np.float64))[0]
+
+        found = [
+            (d, grid, i)
+            for grid in grids
+            for d, i in grid.within(q, radius_km, predicate)
+        ]
+        found.sort(key=lambda item: item[0])
+        return [(grid.places[i], round(d, 3)) for d, grid, i in found]
@@ -1,7 +1,11 @@
 """
 사용자 여행 플랜 저장 및 조회 서비스
+
+비동기 세션(db_connection.get_async_db_session)을 사용하므로
+DB가 응답하는 동안 이벤트 루프의 다른 요청이 멈추지 않음
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user_plan import UserTravelPlan
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -11,8 +15,8 @@ class UserPlanService:
     """사용자 여행 플랜 관리 서비스"""
     
     @staticmethod
-    def save_plan(
-        db_session: Session,
+    async def save_plan(
+        db_session: AsyncSession,
         user_id: str,
         destination: str,
         duration_days: int,
@@ -53,14 +57,14 @@ class UserPlanService:
         )
         
         db_session.add(plan)
-        db_session.commit()
-        db_session.refresh(plan)
+        await db_session.commit()
+        await db_session.refresh(plan)
         
         return plan
     
     @staticmethod
-    def get_plan_by_id(
-        db_session: Session,
+    async def get_plan_by_id(
+        db_session: AsyncSession,
         plan_id: str,
         user_id: str
     ) -> Optional[UserTravelPlan]:
@@ -76,16 +80,19 @@ class UserPlanService:
         Returns:
             UserTravelPlan 객체 또는 None
         """
-        plan = db_session.query(UserTravelPlan).filter(
-            UserTravelPlan.plan_id == plan_id,
-            UserTravelPlan.user_id == user_id
-        ).first()
+        result = await db_session.execute(
+            select(UserTravelPlan).where(
+                UserTravelPlan.plan_id == plan_id,
+                UserTravelPlan.user_id == user_id
+            )
+        )
+        plan = result.scalars().first()
         
         return plan
     
     @staticmethod
-    def get_user_plans(
-        db_session: Session,
+    async def get_user_plans(
+        db_session: AsyncSession,
         user_id: str,
         limit: int = 10,
         offset: int = 0
@@ -103,20 +110,25 @@ class UserPlanService:
             (플랜 리스트, 전체 개수)
         """
         # 전체 개수 조회
-        total_count = db_session.query(UserTravelPlan).filter(
-            UserTravelPlan.user_id == user_id
-        ).count()
+        total_count = await db_session.scalar(
+            select(func.count()).select_from(UserTravelPlan).where(
+                UserTravelPlan.user_id == user_id
+            )
+        )
         
         # 페이지네이션으로 조회
-        plans = db_session.query(UserTravelPlan).filter(
-            UserTravelPlan.user_id == user_id
-        ).order_by(UserTravelPlan.created_at.desc()).limit(limit).offset(offset).all()
+        result = await db_session.execute(
+            select(UserTravelPlan).where(
+                UserTravelPlan.user_id == user_id
+            ).order_by(UserTravelPlan.created_at.desc()).limit(limit).offset(offset)
+        )
+        plans = list(result.scalars().all())
         
         return plans, total_count
     
     @staticmethod
-    def update_plan(
-        db_session: Session,
+    async def update_plan(
+        db_session: AsyncSession,
         plan_id: str,
         user_id: str,
         plan_data: Optional[Dict[str, Any]] = None
@@ -134,10 +146,13 @@ class UserPlanService:
         Returns:
             업데이트된 UserTravelPlan 객체 또는 None
         """
-        plan = db_session.query(UserTravelPlan).filter(
-            UserTravelPlan.plan_id == plan_id,
-            UserTravelPlan.user_id == user_id
-        ).first()
+        result = await db_session.execute(
+            select(UserTravelPlan).where(
+                UserTravelPlan.plan_id == plan_id,
+                UserTravelPlan.user_id == user_id
+            )
+        )
+        plan = result.scalars().first()
         
         if not plan:
             return None
@@ -146,14 +161,14 @@ class UserPlanService:
             plan.plan_data = plan_data
         
         plan.updated_at = datetime.utcnow()
-        db_session.commit()
-        db_session.refresh(plan)
+        await db_session.commit()
+        await db_session.refresh(plan)
         
         return plan
     
     @staticmethod
-    def delete_plan(
-        db_session: Session,
+    async def delete_plan(
+        db_session: AsyncSession,
         plan_id: str,
         user_id: str
     ) -> bool:
@@ -169,16 +184,19 @@ class UserPlanService:
         Returns:
             성공 여부
         """
-        plan = db_session.query(UserTravelPlan).filter(
-            UserTravelPlan.plan_id == plan_id,
-            UserTravelPlan.user_id == user_id
-        ).first()
+        result = await db_session.execute(
+            select(UserTravelPlan).where(
+                UserTravelPlan.plan_id == plan_id,
+                UserTravelPlan.user_id == user_id
+            )
+        )
+        plan = result.scalars().first()
         
         if not plan:
             return False
         
-        db_session.delete(plan)
-        db_session.commit()
+        await db_session.delete(plan)
+        await db_session.commit()
         
         return True
 
@@ -2,13 +2,17 @@
 Travel Tools - 여행지 검색 및 필터링 LangGraph 툴
 """
 from langchain_core.tools import tool
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
 from services.search_service import SearchService
-from services.itinerary_service import ItineraryService
+from services.itinerary_service import get_itinerary_service
 
 search_service = SearchService()
-itinerary_service = ItineraryService()
+# 요청별 상태가 없으므로 모든 요청이 공유
+itinerary_service = get_itinerary_service()
+
+# 예비 장소 후보 수 (일정에 쓰이지 않은 상위 장소)
+ALTERNATIVE_POOL_SIZE = 100
 
 
 # MVP용 샘플 데이터 (하드코딩)
@@ -272,60 +276,56 @@ async def get_supported_types(destination: str) -> List[str]:
     
     return list(SAMPLE_PLACES[destination].keys())
 
-async def _generate_travel_itinerary_async(
+async def _select_places(
     destination: str,
-    travel_styles: List[str], 
-    duration_days: int, 
-    requirements: List[str] =[], 
-    budget_level: int = 2,
-    include_debug: bool = False
-) -> Dict[str,Any]:
-    """
-    비동기 여행 일정 생성 (거리 계산 병렬 처리)
+    travel_styles: List[str],
+    duration_days: int,
+    requirements: List[str],
+    budget_level: int
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
     """
-    print(f"--- [Tool] 일정 생성 시작 : {destination} ({duration_days}일) ---")
+    장소 검색 후 일정용/예비 장소 선택
 
+    Returns:
+        (검색된 전체 후보, 일정에 넣을 장소, 예비 장소)
+    """
     #1. 장소 검색
-    candidates = search_service.search_places_with_priority(
+    candidates = await search_service.search_places_with_priority_async(
         destination=destination,
         travel_styles=travel_styles,
         requirements=requirements,
         price_level=budget_level,
     )
-
     if not candidates:
-        return {"error" : "조건에 맞는 장소를 찾을 수 없습니다."}
-    
+        return [], [], []
+
     print(f"--- [Tool] 검색된 장소 : {len(candidates)}개 ---")
 
-    #2. 일정 생성 (비동기)
+    #2. 일정에 넣을 장소 (하루 최대 5곳)
     max_places = duration_days *5
     selected_places = candidates[:max_places]
-    
-    # 예비 장소 (사용하지 않은 상위 장소들)
-    alternative_places = candidates[max_places:max_places + 20]  # 추가로 20개
 
-    itinerary = await itinerary_service.create_itinerary_async(
-        places = selected_places, 
-        duration_days=duration_days,
-        alternative_places=alternative_places,
-        include_debug_info=include_debug
-    )
+    # 예비 장소 (사용하지 않은 상위 장소들, 슬롯마다 이 중 가까운 같은 타입 장소를 제안)
+    alternative_places = candidates[max_places:max_places + ALTERNATIVE_POOL_SIZE]
+    return candidates, selected_places, alternative_places
 
-    # include_debug=True인 경우 클러스터링 정보 추출
-    clustering_info = None
-    final_itinerary = itinerary if not include_debug else itinerary.get("itinerary", itinerary)
-    
-    if include_debug and isinstance(final_itinerary, list) and len(final_itinerary) > 0:
-        # 첫 날에서 클러스터링 정보 추출
-        if "clustering_debug_info" in final_itinerary[0]:
-            clustering_info = final_itinerary[0].pop("clustering_debug_info")
-    
+
+def _build_response(
+    destination: str,
+    duration_days: int,
+    candidates: List[Dict],
+    selected_places: List[Dict],
+    alternative_places: List[Dict],
+    itinerary: List[Dict],
+    clustering_info: Optional[Dict],
+    include_debug: bool
+) -> Dict[str, Any]:
+    """일정 생성 응답 (include_debug면 선택/예비 장소와 클러스터링 정보 포함)"""
     response = {
         "destination" : destination,
         "duration_days": duration_days,
         "total_places": len(selected_places),
-        "itinerary": final_itinerary
+        "itinerary": itinerary
     }
     
     # include_debug=True인 경우 상세 정보 추가
@@ -361,6 +361,90 @@ async def _generate_travel_itinerary_async(
     return response
 
 
+async def generate_travel_itinerary_async(
+    destination: str,
+    travel_styles: List[str], 
+    duration_days: int, 
+    requirements: List[str] =[], 
+    budget_level: int = 2,
+    include_debug: bool = False
+) -> Dict[str,Any]:
+    """
+    비동기 여행 일정 생성 (거리 계산 병렬 처리)
+    """
+    print(f"--- [Tool] 일정 생성 시작 : {destination} ({duration_days}일) ---")
+
+    candidates, selected_places, alternative_places = await _select_places(
+        destination, travel_styles, duration_days, requirements, budget_level
+    )
+    if not candidates:
+        return {"error" : "조건에 맞는 장소를 찾을 수 없습니다."}
+
+    # 일정 생성 (비동기)
+    itinerary = await itinerary_service.create_itinerary_async(
+        places = selected_places, 
+        duration_days=duration_days,
+        alternative_places=alternative_places,
+        include_debug_info=include_debug
+    )
+
+    # include_debug=True인 경우 클러스터링 정보 추출
+    clustering_info = None
+    final_itinerary = itinerary if not include_debug else itinerary.get("itinerary", itinerary)
+    
+    if include_debug and isinstance(final_itinerary, list) and len(final_itinerary) > 0:
+        # 첫 날에서 클러스터링 정보 추출
+        if "clustering_debug_info" in final_itinerary[0]:
+            clustering_info = final_itinerary[0].pop("clustering_debug_info")
+    
+    return _build_response(
+        destination, duration_days, candidates, selected_places, alternative_places,
+        final_itinerary, clustering_info, include_debug
+    )
+
+
+async def stream_travel_itinerary(
+    destination: str,
+    travel_styles: List[str],
+    duration_days: int,
+    requirements: List[str] = [],
+    budget_level: int = 2,
+    include_debug: bool = False
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    여행 일정을 일자별로 생성하며 이벤트를 순서대로 반환 (스트리밍 응답용)
+
+    이벤트:
+        ("plan", 헤더)      - 여행지, 기간, 선택된 장소 수 (장소 선택 직후)
+        ("day", 하루 일정)   - 일자 순서대로, 준비되는 즉시
+        ("done", 전체 응답) - generate_travel_itinerary_async와 같은 형식 (저장용)
+        ("error", {"error"}) - 조건에 맞는 장소가 없을 때 (이후 이벤트 없음)
+    """
+    print(f"--- [Tool] 일정 스트리밍 시작 : {destination} ({duration_days}일) ---")
+
+    candidates, selected_places, alternative_places = await _select_places(
+        destination, travel_styles, duration_days, requirements, budget_level
+    )
+    if not candidates:
+        yield "error", {"error" : "조건에 맞는 장소를 찾을 수 없습니다."}
+        return
+
+    yield "plan", {
+        "destination": destination,
+        "duration_days": duration_days,
+        "total_places": len(selected_places)
+    }
+
+    context = itinerary_service.planning_context(selected_places, duration_days, alternative_places)
+    async for day_plan in itinerary_service.stream_days(context):
+        yield "day", day_plan
+
+    yield "done", _build_response(
+        destination, duration_days, candidates, selected_places, alternative_places,
+        context.itinerary, context.debug_info if include_debug else None, include_debug
+    )
+
+
 @tool
 def generate_travel_itinerary(
     destination: str,
@@ -390,11 +474,13 @@ def generate_travel_itinerary(
         asyncio.set_event_loop(new_loop)
         try:
             return new_loop.run_until_complete(
-                _generate_travel_itinerary_async(
+                generate_travel_itinerary_async(
                     destination, travel_styles, duration_days, requirements, budget_level, include_debug
                 )
             )
         finally:
+            # 루프별 자원(Azure Maps 비동기 클라이언트 등) 정리 후 종료
+            new_loop.run_until_complete(new_loop.shutdown_asyncgens())
             new_loop.close()
     
     try:
@@ -407,14 +493,14 @@ def generate_travel_itinerary(
         else:
             # 루프가 실행 중이 아니면 현재 루프 사용
             return loop.run_until_complete(
-                _generate_travel_itinerary_async(
+                generate_travel_itinerary_async(
                     destination, travel_styles, duration_days, requirements, budget_level, include_debug
                 )
             )
     except RuntimeError:
         # 루프가 없으면 새로 만들어서 실행
         return asyncio.run(
-            _generate_travel_itinerary_async(
+            generate_travel_itinerary_async(
                 destination, travel_styles, duration_days, requirements, budget_level, include_debug
             )
         )